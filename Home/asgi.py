@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Home.settings')
+# Serve the dashboards and results page with their async views.
+os.environ.setdefault('DJANGO_ROOT_URLCONF', 'Home.asgi_urls')
 
 application = get_asgi_application()
@@ -0,0 +1,26 @@
+"""
+URL configuration used under ASGI (see asgi.py).
+
+The same URLs as ``Home.urls``, except that the student dashboard, teacher
+dashboard and results page are served by their async views.
+"""
+
+from django.urls import path
+
+from student import views
+
+from .urls import urlpatterns as wsgi_urlpatterns
+
+urlpatterns = [
+    path(
+        "student/dashboard/",
+        views.student_dashboard_async,
+        name="student_dashboard",
+    ),
+    path(
+        "student/teacher/dashboard/",
+        views.teacher_dashboard_async,
+        name="teacher_dashboard",
+    ),
+    path("student/results/", views.student_results_async, name="student_results"),
+] + wsgi_urlpatterns
@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import os
 from pathlib import Path
 
+from .database import database_config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -31,6 +33,11 @@ ALLOWED_HOSTS = []
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Uploads above this size stream to a temporary file instead of memory.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+# Threads resizing uploaded photos (see home_auth/images.py).
+IMAGE_DERIVATIVE_WORKERS = int(os.environ.get("IMAGE_DERIVATIVE_WORKERS", 2))
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -51,11 +58,21 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "home_auth.usercontext.UserContextMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
-ROOT_URLCONF = "Home.urls"
+# Opt-in SQL query budgets (student/querybudget.py): set DJANGO_QUERY_BUDGETS
+# to "warn" to log views over their budget or "raise" to fail the request.
+QUERY_BUDGET_MODE = os.environ.get("DJANGO_QUERY_BUDGETS", "")
+if QUERY_BUDGET_MODE:
+    MIDDLEWARE.insert(0, "student.querybudget.QueryBudgetMiddleware")
+QUERY_BUDGET_MODULES = ["student.urls"]
+
+# Home/asgi.py switches to Home.asgi_urls, which routes the dashboards and
+# results page to their async views.
+ROOT_URLCONF = os.environ.get("DJANGO_ROOT_URLCONF", "Home.urls")
 
 TEMPLATES = [
     {
@@ -82,12 +99,81 @@ WSGI_APPLICATION = "Home.wsgi.application"
 
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite with WAL, busy timeout and persistent connections by default (see
+# Home/database.py); set DATABASE_URL to use a server database instead.
 DATABASES = {
+    "default": database_config(
+        os.environ.get("DATABASE_URL"), BASE_DIR / "db.sqlite3"
+    )
+}
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Local memory by default. Set DJANGO_CACHE_DIR to share cached results and
+# grids between worker processes through a file-based cache instead. Cache
+# invalidation only reaches every worker through a shared cache, so a system
+# check (student.E001) fails when WEB_CONCURRENCY asks for several workers
+# with local memory.
+WEB_WORKERS = int(os.environ.get("WEB_CONCURRENCY", 1))
+CACHES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "school",
+        "OPTIONS": {"MAX_ENTRIES": 5000},
     }
 }
+# Sessions get their own cache so culling cached pages never evicts them.
+CACHES["sessions"] = {
+    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    "LOCATION": "sessions",
+    "OPTIONS": {"MAX_ENTRIES": 20000},
+}
+if os.environ.get("DJANGO_CACHE_DIR"):
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ["DJANGO_CACHE_DIR"],
+        "OPTIONS": {"MAX_ENTRIES": 20000},
+    }
+    CACHES["sessions"] = {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.path.join(os.environ["DJANGO_CACHE_DIR"], "sessions"),
+        "OPTIONS": {"MAX_ENTRIES": 50000},
+    }
+
+# Sessions
+# https://docs.djangoproject.com/en/5.2/topics/http/sessions/
+
+# DJANGO_SESSIONS picks the engine: "cached_db" (the default), "db", "cache"
+# or "signed_cookies". cached_db serves reads from the sessions cache and
+# only writes django_session on login, logout and changes, so a request
+# reads its session without a query. The sessions cache is per process
+# unless DJANGO_CACHE_DIR is set, which is why several workers need a shared
+# cache (system check student.E001). signed_cookies keeps sessions out of
+# the server entirely, but a logged-out cookie stays valid until it expires.
+# Purge expired rows with manage.py purge_sessions.
+SESSION_ENGINE = "django.contrib.sessions.backends." + os.environ.get(
+    "DJANGO_SESSIONS", "cached_db"
+)
+SESSION_CACHE_ALIAS = "sessions"
+
+# Login throttling before password hashing (home_auth/ratelimit.py): scope ->
+# (burst, attempts per minute). The per-address limit leaves room for a
+# class logging in behind one school NAT address. The global bucket is per
+# process and bounds the hashing CPU to about one core. Attempts that would
+# wait longer than LOGIN_RATE_LIMIT_MAX_DELAY get a 429 with Retry-After.
+# A browser holding the signed trust cookie of a login within
+# LOGIN_RATE_LIMIT_TRUST seconds skips the address and global buckets for
+# that account. {} turns throttling off. Set the store to
+# "home_auth.ratelimit.CacheStore" to share buckets between workers through
+# LOGIN_RATE_LIMIT_CACHE.
+LOGIN_RATE_LIMITS = {"ip": (60, 30), "email": (5, 2), "global": (10, 120)}
+LOGIN_RATE_LIMIT_STORE = os.environ.get(
+    "DJANGO_LOGIN_RATE_LIMIT_STORE", "home_auth.ratelimit.LocalStore"
+)
+LOGIN_RATE_LIMIT_CACHE = "default"
+LOGIN_RATE_LIMIT_MAX_DELAY = 0.25
+LOGIN_RATE_LIMIT_TRUST = 7 * 24 * 60 * 60
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
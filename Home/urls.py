@@ -23,6 +23,7 @@ from django.views.generic import TemplateView, RedirectView
 from django.conf import settings
 from django.conf.urls.static import static
 
+from home_auth.views import image_derivative
 from student.views import view_student
 
 
@@ -66,5 +67,18 @@ if settings.DEBUG:
     from django.contrib.staticfiles.urls import staticfiles_urlpatterns
 
     urlpatterns += staticfiles_urlpatterns()
+    # Resized photos, content addressed and cached for a year. In production
+    # the front-end server serves MEDIA_ROOT/derived itself, e.g. for nginx:
+    #     location /media/derived/ {
+    #         alias /srv/sms/media/derived/;
+    #         add_header Cache-Control "public, max-age=31536000, immutable";
+    #     }
+    urlpatterns.append(
+        path(
+            settings.MEDIA_URL.lstrip("/") + "derived/<path:path>",
+            image_derivative,
+            name="image_derivative",
+        )
+    )
     # Serve uploaded media files during development (only when DEBUG=True)
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as DefaultUserAdmin
-from .models import CustomUser
+from .models import CustomUser, EmailOutbox
 from django.contrib import admin as dj_admin
 from django.apps import apps
 
@@ -120,3 +120,11 @@ class CustomUserAdmin(DefaultUserAdmin):
 
 # Register the CustomUser model with the custom admin
 admin.site.register(CustomUser, CustomUserAdmin)
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ("subject", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("subject", "recipients")
+    readonly_fields = ("created_at", "claimed_at", "sent_at", "last_error")
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class HomeAuthConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'home_auth'
+
+    def ready(self):
+        # Resized copies of uploaded photos (see images.py).
+        from . import signals  # noqa: F401
@@ -1,26 +1,10 @@
 def display_name(request):
-    """Provide a friendly display name for templates.
+    """Provide the display name and ``user_context`` to templates.
 
-    Preference order:
-    - If authenticated: first_name
-    - Else full name
-    - Else username
-    - Else 'Guest'
+    The display name is the user's first name, else full name, else
+    username, else 'Guest' (see home_auth/usercontext.py).
     """
-    user = getattr(request, "user", None)
-    name = "Guest"
-    if user and user.is_authenticated:
-        first = getattr(user, "first_name", "") or ""
-        full = ""
-        try:
-            full = user.get_full_name()
-        except Exception:
-            full = ""
-        username = getattr(user, "username", "") or ""
-        if first:
-            name = first
-        elif full:
-            name = full
-        elif username:
-            name = username
-    return {"display_name": name}
+    user_context = getattr(request, "user_context", None)
+    if user_context is None:
+        return {"display_name": "Guest"}
+    return {"display_name": user_context.display_name, "user_context": user_context}
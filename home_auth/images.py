@@ -0,0 +1,179 @@
+"""Resized derivatives of uploaded photos.
+
+Student, teacher and avatar photos are uploaded straight from phones, often
+several megabytes each, while the lists show them 40px wide. After an
+upload is saved, a background thread pool decodes it once and writes a
+re-encoded JPEG per size in :data:`SIZES` (list, card, detail). Templates
+use ``student.image_urls.list``, ``teacher.image_urls.card`` or
+``user.avatar_urls.list`` instead of the original file.
+
+Derivatives are content addressed: their names carry the SHA-256 of the
+source file, so identical uploads share them and a changed photo gets new
+URLs. They never change once written, so the front-end server should
+serve ``MEDIA_ROOT/derived`` with a one-year ``immutable`` cache header
+(``image_derivative`` does the same under ``DEBUG``, see Home/urls.py).
+The digest is stored next to the image field (``<field>_digest``) and is
+blank until the derivatives exist; until then ``image_urls`` falls back to
+the original upload.
+
+``manage.py build_image_derivatives`` backfills media uploaded before the
+pipeline existed.
+"""
+
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+DERIVED_DIR = "derived"
+# Size name -> (width, height, crop). Cropped sizes fill the box (square
+# avatars); the others fit inside it. Twice the CSS size, for HiDPI screens.
+SIZES = {
+    "list": (80, 80, True),
+    "card": (320, 320, True),
+    "detail": (800, 800, False),
+}
+JPEG_QUALITY = 82
+# (model label, image field, digest field) of every photo with derivatives.
+IMAGE_FIELDS = [
+    ("student.Student", "student_image", "student_image_digest"),
+    ("student.Teacher", "teacher_image", "teacher_image_digest"),
+    (settings.AUTH_USER_MODEL, "avatar", "avatar_digest"),
+]
+
+_executor = None
+_executor_lock = threading.Lock()
+_write_lock = threading.Lock()
+
+
+def derivative_name(digest, size):
+    return f"{DERIVED_DIR}/{digest[:2]}/{digest}-{size}.jpg"
+
+
+def image_urls(image, digest):
+    """Return ``{size: url}`` for an image field and its stored digest."""
+    if digest:
+        return {
+            size: default_storage.url(derivative_name(digest, size)) for size in SIZES
+        }
+    if image:
+        return {size: image.url for size in SIZES}
+    return {}
+
+
+def file_digest(image):
+    """SHA-256 of a stored file, read in chunks."""
+    sha = hashlib.sha256()
+    with image.storage.open(image.name, "rb") as source:
+        for chunk in iter(lambda: source.read(64 * 1024), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _encode(picture):
+    buffer = io.BytesIO()
+    picture.save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def _flatten(picture):
+    """Return ``picture`` as RGB, composing any transparency onto white."""
+    if picture.mode in ("RGBA", "LA") or "transparency" in picture.info:
+        picture = picture.convert("RGBA")
+        background = Image.new("RGB", picture.size, "white")
+        background.paste(picture, mask=picture.getchannel("A"))
+        return background
+    return picture.convert("RGB")
+
+
+def build_derivatives(image, digest=None):
+    """Write the missing derivatives of ``image``; return the source digest."""
+    digest = digest or file_digest(image)
+    storage = default_storage
+    missing = [
+        size for size in SIZES if not storage.exists(derivative_name(digest, size))
+    ]
+    if not missing:
+        return digest
+
+    largest = max(max(SIZES[size][:2]) for size in missing)
+    with image.storage.open(image.name, "rb") as source:
+        with Image.open(source) as picture:
+            # Let the JPEG decoder downscale while reading; a 12 megapixel
+            # photo then decodes at a fraction of its size.
+            picture.draft("RGB", (largest * 2, largest * 2))
+            picture = _flatten(ImageOps.exif_transpose(picture))
+
+    for size in missing:
+        width, height, crop = SIZES[size]
+        if crop:
+            resized = ImageOps.fit(picture, (width, height), Image.Resampling.LANCZOS)
+        else:
+            resized = picture.copy()
+            resized.thumbnail((width, height), Image.Resampling.LANCZOS)
+        content = ContentFile(_encode(resized))
+        name = derivative_name(digest, size)
+        # Two workers may render the same upload; only one file is kept.
+        with _write_lock:
+            if not storage.exists(name):
+                storage.save(name, content)
+    return digest
+
+
+def process_image(label, pk, field, digest_field):
+    """Build the derivatives of one object's photo and store its digest."""
+    model = apps.get_model(label)
+    obj = model.objects.filter(pk=pk).only(field, digest_field).first()
+    if obj is None:
+        return None
+    image = getattr(obj, field)
+    digest = ""
+    if image:
+        try:
+            digest = build_derivatives(image)
+        except (OSError, Image.DecompressionBombError, SyntaxError, ValueError):
+            logger.exception(
+                "Could not resize %s %s of %s %s", field, image.name, label, pk
+            )
+            return None
+    rows = model.objects.filter(pk=pk)
+    if image:
+        # Skip the update if another upload replaced the photo meanwhile.
+        rows = rows.filter(**{field: image.name})
+    rows.update(**{digest_field: digest})
+    return digest
+
+
+def _run(label, pk, field, digest_field):
+    try:
+        return process_image(label, pk, field, digest_field)
+    finally:
+        close_old_connections()
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "IMAGE_DERIVATIVE_WORKERS", 2),
+                thread_name_prefix="image-derivatives",
+            )
+        return _executor
+
+
+def schedule(label, pk, field, digest_field):
+    """Build derivatives in the background (inline if configured)."""
+    if getattr(settings, "IMAGE_DERIVATIVES_SYNC", False):
+        return process_image(label, pk, field, digest_field)
+    return _pool().submit(_run, label, pk, field, digest_field)
@@ -0,0 +1,54 @@
+"""
+Django management command to build thumbnails of uploaded photos.
+Usage: python manage.py build_image_derivatives [--all] [--workers 4]
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import Q
+
+from home_auth.images import IMAGE_FIELDS, process_image
+
+
+def _build(job):
+    try:
+        return process_image(*job)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = "Builds the resized copies of student, teacher and avatar photos"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Check every photo, not only the ones without thumbnails",
+        )
+        parser.add_argument("--workers", type=int, default=4)
+
+    def handle(self, *args, **options):
+        jobs = []
+        for label, field, digest_field in IMAGE_FIELDS:
+            rows = apps.get_model(label).objects.exclude(
+                Q(**{f"{field}__isnull": True}) | Q(**{field: ""})
+            )
+            if not options["all"]:
+                rows = rows.filter(**{digest_field: ""})
+            jobs.extend(
+                (label, pk, field, digest_field)
+                for pk in rows.values_list("pk", flat=True).iterator()
+            )
+
+        built = failed = 0
+        with ThreadPoolExecutor(max_workers=max(options["workers"], 1)) as pool:
+            for digest in pool.map(_build, jobs):
+                if digest:
+                    built += 1
+                else:
+                    failed += 1
+        self.stdout.write(f"Built thumbnails of {built} photos, {failed} failed.")
@@ -0,0 +1,32 @@
+"""
+Django management command to delete expired sessions in small batches.
+Usage: python manage.py purge_sessions [--batch-size 1000] [--pause 0.05]
+"""
+
+from django.core.management.base import BaseCommand
+
+from home_auth.sessions import PURGE_BATCH_SIZE, purge_expired_sessions
+
+
+class Command(BaseCommand):
+    help = "Deletes expired sessions from the database a batch at a time"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=PURGE_BATCH_SIZE,
+            help="Sessions deleted per transaction",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.05,
+            help="Seconds to wait between batches",
+        )
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_sessions(
+            batch_size=max(options["batch_size"], 1), pause=max(options["pause"], 0)
+        )
+        self.stdout.write(f"Deleted {deleted} expired sessions.")
@@ -0,0 +1,49 @@
+"""
+Django management command to deliver queued emails.
+Usage: python manage.py send_outbox [--once] [--workers 4] [--batch-size 50]
+       [--interval 5]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from home_auth.outbox import DEFAULT_BATCH_SIZE, DEFAULT_WORKERS, process_outbox
+
+
+class Command(BaseCommand):
+    help = "Sends pending outbox emails in batches, retrying failures with backoff"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once", action="store_true", help="Send what is due, then exit"
+        )
+        parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Emails sent per mail server connection",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5.0,
+            help="Seconds to wait when the outbox is empty",
+        )
+
+    def handle(self, *args, **options):
+        workers = max(options["workers"], 1)
+        batch_size = max(options["batch_size"], 1)
+        try:
+            while True:
+                sent, claimed = process_outbox(batch_size, workers)
+                if claimed:
+                    self.stdout.write(f"Sent {sent} of {claimed} emails.")
+                if options["once"]:
+                    break
+                if claimed < batch_size * workers:
+                    # Caught up; a full pass means more may be waiting.
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped.")
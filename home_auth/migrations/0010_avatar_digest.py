@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("home_auth", "0009_emailoutbox"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customuser",
+            name="avatar_digest",
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
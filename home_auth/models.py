@@ -1,10 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
-from django.core.mail import send_mail
 from django.conf import settings
 from django.utils.crypto import get_random_string
 from django.utils import timezone
 
+from .images import image_urls
+
 
 class CustomUser(AbstractUser):
     username = models.CharField(max_length=100, unique=True)
@@ -22,6 +23,8 @@ class CustomUser(AbstractUser):
 
     # Optional avatar for user profile
     avatar = models.ImageField(upload_to="avatars/", null=True, blank=True)
+    # SHA-256 of the avatar once its thumbnails exist (see images.py).
+    avatar_digest = models.CharField(max_length=64, blank=True, editable=False)
 
     # Override groups and user_permissions to avoid conflicts
     groups = models.ManyToManyField(
@@ -40,6 +43,11 @@ class CustomUser(AbstractUser):
     def __str__(self):
         return self.username
 
+    @property
+    def avatar_urls(self):
+        """Thumbnail URLs of the avatar by size (list, card, detail)."""
+        return image_urls(self.avatar, self.avatar_digest)
+
 
 class PasswordResetRequest(models.Model):
     user = models.ForeignKey("CustomUser", on_delete=models.CASCADE)
@@ -59,10 +67,56 @@ class PasswordResetRequest(models.Model):
         reset_link = (
             f"http://localhost:8000/authentication/reset-password/{self.token}/"
         )
-        send_mail(
+        # Queued, not sent: the send_outbox worker delivers it (see outbox.py).
+        return EmailOutbox.enqueue(
             "Password Reset Request",
             f"Click the following link to reset your password: {reset_link}",
-            settings.DEFAULT_FROM_EMAIL,
             [self.email],
-            fail_silently=False,
+        )
+
+
+class EmailOutbox(models.Model):
+    """An email waiting to be sent by the ``send_outbox`` worker."""
+
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (SENDING, "Sending"),
+        (SENT, "Sent"),
+        (FAILED, "Failed"),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255, blank=True)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Not picked up before this time; pushed back after each failed attempt.
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # When a worker claimed it, to recover rows left behind by a dead worker.
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["next_attempt_at", "id"]
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="outbox_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.status})"
+
+    @classmethod
+    def enqueue(cls, subject, body, recipients, from_email=None):
+        return cls.objects.create(
+            subject=subject,
+            body=body,
+            recipients=list(recipients),
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
         )
@@ -0,0 +1,180 @@
+"""Delivery of queued emails (:class:`~home_auth.models.EmailOutbox`).
+
+Views only insert rows with ``EmailOutbox.enqueue`` and return; the
+``send_outbox`` management command drains the table. Each pass claims the
+due rows, splits them into batches and sends every batch over a single
+connection to the mail server from a thread pool, so a slow SMTP server
+costs one handshake per batch instead of one per email and never holds up
+a request.
+
+A failed email is retried with exponential backoff (``OUTBOX_RETRY_DELAY``
+seconds, doubled per attempt, capped at ``OUTBOX_MAX_RETRY_DELAY``) and
+marked failed after ``OUTBOX_MAX_ATTEMPTS``. The backend is the usual
+``EMAIL_BACKEND``, so the locmem and file backends work for testing.
+"""
+
+import logging
+import smtplib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_WORKERS = 4
+# A row still "sending" after this long belonged to a worker that died.
+CLAIM_TIMEOUT = timedelta(minutes=10)
+# Errors meaning the mail server went away rather than refused a message.
+DISCONNECTED = (smtplib.SMTPServerDisconnected, ConnectionError)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def retry_delay(attempts):
+    """Seconds to wait before attempt number ``attempts + 1``."""
+    base = _setting("OUTBOX_RETRY_DELAY", 30)
+    cap = _setting("OUTBOX_MAX_RETRY_DELAY", 3600)
+    return min(base * 2 ** max(attempts - 1, 0), cap)
+
+
+def release_stale_claims(now=None):
+    """Put emails claimed by a crashed worker back in the queue."""
+    now = now or timezone.now()
+    return EmailOutbox.objects.filter(
+        status=EmailOutbox.SENDING, claimed_at__lt=now - CLAIM_TIMEOUT
+    ).update(status=EmailOutbox.PENDING, claimed_at=None)
+
+
+def claim_due(limit, now=None):
+    """Mark up to ``limit`` due emails as sending and return them.
+
+    The ``status`` filter on the update makes the claim safe when several
+    workers poll the same table: a row another worker got first is skipped.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        ids = list(
+            EmailOutbox.objects.filter(
+                status=EmailOutbox.PENDING, next_attempt_at__lte=now
+            ).values_list("pk", flat=True)[:limit]
+        )
+        EmailOutbox.objects.filter(pk__in=ids, status=EmailOutbox.PENDING).update(
+            status=EmailOutbox.SENDING, claimed_at=now
+        )
+    return list(EmailOutbox.objects.filter(pk__in=ids, claimed_at=now))
+
+
+def _record_failure(email, error, now):
+    email.attempts += 1
+    email.last_error = str(error)[:2000]
+    email.claimed_at = None
+    if email.attempts >= _setting("OUTBOX_MAX_ATTEMPTS", 5):
+        email.status = EmailOutbox.FAILED
+        logger.error("Giving up on outbox email %s: %s", email.pk, error)
+    else:
+        email.status = EmailOutbox.PENDING
+        email.next_attempt_at = now + timedelta(seconds=retry_delay(email.attempts))
+    email.save(
+        update_fields=[
+            "attempts",
+            "last_error",
+            "claimed_at",
+            "status",
+            "next_attempt_at",
+        ]
+    )
+
+
+def _send(email, mail_connection):
+    EmailMessage(
+        email.subject,
+        email.body,
+        email.from_email or settings.DEFAULT_FROM_EMAIL,
+        email.recipients,
+        connection=mail_connection,
+    ).send()
+
+
+def _record_sent(email):
+    email.status = EmailOutbox.SENT
+    email.sent_at = timezone.now()
+    email.attempts += 1
+    email.claimed_at = None
+    email.save(update_fields=["status", "sent_at", "attempts", "claimed_at"])
+
+
+def release_claims(emails):
+    """Put claimed ``emails`` back in the queue without counting an attempt."""
+    return EmailOutbox.objects.filter(
+        pk__in=[email.pk for email in emails], status=EmailOutbox.SENDING
+    ).update(status=EmailOutbox.PENDING, claimed_at=None)
+
+
+def send_batch(emails):
+    """Send ``emails`` over one connection; return how many went out.
+
+    If the server drops the connection partway through, it is reopened once
+    and the email is tried again. Should that fail too, the email counts as
+    a failed attempt and the rest of the batch, never tried, is released.
+    """
+    sent = 0
+    done = 0  # emails[:done] were sent or recorded as failed
+    reconnected = False
+    try:
+        with get_connection(fail_silently=False) as mail_connection:
+            while done < len(emails):
+                email = emails[done]
+                try:
+                    _send(email, mail_connection)
+                except DISCONNECTED:
+                    if reconnected:
+                        raise
+                    reconnected = True
+                    mail_connection.close()
+                    mail_connection.open()
+                    continue
+                except Exception as exc:
+                    _record_failure(email, exc, timezone.now())
+                else:
+                    _record_sent(email)
+                    sent += 1
+                done += 1
+    except Exception as exc:
+        now = timezone.now()
+        if not (done or reconnected):
+            # Could not connect: retry the whole batch later.
+            for email in emails:
+                _record_failure(email, exc, now)
+        elif done < len(emails):
+            # The connection dropped: only the email being sent was tried.
+            _record_failure(emails[done], exc, now)
+            release_claims(emails[done + 1 :])
+    finally:
+        # Each pool thread has its own database connection.
+        connection.close()
+    return sent
+
+
+def process_outbox(batch_size=DEFAULT_BATCH_SIZE, workers=DEFAULT_WORKERS):
+    """Send the emails that are due; return ``(sent, claimed)``."""
+    close_old_connections()
+    release_stale_claims()
+    emails = claim_due(batch_size * workers)
+    if not emails:
+        return 0, 0
+    batches = [
+        emails[start : start + batch_size]
+        for start in range(0, len(emails), batch_size)
+    ]
+    with ThreadPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+        sent = sum(pool.map(send_batch, batches))
+    return sent, len(emails)
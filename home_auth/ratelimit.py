@@ -0,0 +1,227 @@
+"""Token buckets that throttle login attempts before the password is hashed.
+
+Every login POST runs a full PBKDF2 hash (about half a second of CPU), so a
+burst of bad logins pins the workers. ``login_view`` asks
+:func:`check_login` first. Each attempt takes a token from three buckets:
+
+* ``ip``: the client address, against one source trying many accounts;
+* ``email``: the account, against many sources trying one account;
+* ``global``: the whole process, which bounds the hashing CPU whatever
+  the spread of addresses and accounts.
+
+``LOGIN_RATE_LIMITS`` maps each scope to ``(burst, attempts per minute)``;
+an empty dict turns the limiter off. An attempt that would wait up to
+``LOGIN_RATE_LIMIT_MAX_DELAY`` seconds for its tokens is delayed that
+long; anything longer is rejected with the seconds to wait, which the view
+answers with a 429 and ``Retry-After`` rather than holding the worker.
+
+A successful login refills its account's bucket, so typos do not lock a
+user out later, and sets a signed cookie (:data:`TRUST_COOKIE`) naming the
+account for ``LOGIN_RATE_LIMIT_TRUST`` seconds. Attempts for that account
+from a browser holding the cookie skip the ``ip`` and ``global`` buckets,
+so a class logging in from one school address, or in the middle of a
+flood, is only limited per account. Knowing a recently used email is not
+enough to skip them: the cookie is signed with ``SECRET_KEY``.
+
+Buckets live in ``LOGIN_RATE_LIMIT_STORE``: :class:`LocalStore` (the
+default) keeps them in an LRU dict per process; :class:`CacheStore` keeps
+them in a Django cache (``LOGIN_RATE_LIMIT_CACHE``) shared between workers.
+Its read-modify-write is not atomic, so a few racing attempts may slip
+through, which is fine for throttling.
+
+Behind a reverse proxy, set ``LOGIN_RATE_LIMIT_IP_HEADER`` to the META key
+carrying the client address (e.g. ``HTTP_X_REAL_IP``).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+# scope -> (burst, attempts per minute)
+DEFAULT_LIMITS = {"ip": (60, 30), "email": (5, 2), "global": (10, 120)}
+# Scopes a trusted browser (see TRUST_COOKIE) does not count against.
+TRUSTED_EXEMPT = ("ip", "global")
+# Signed cookie naming the account that last logged in from a browser.
+TRUST_COOKIE = "login_trust"
+TRUST_SALT = "home_auth.ratelimit.trust"
+DEFAULT_TRUST = 7 * 24 * 60 * 60
+DEFAULT_STORE = "home_auth.ratelimit.LocalStore"
+
+
+class LocalStore:
+    """Buckets in a per-process dict, evicting the least recently used."""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()
+        # Re-entrant: check_login holds it around get_many/set_many.
+        self._lock = threading.RLock()
+
+    def get_many(self, keys):
+        with self._lock:
+            found = {}
+            for key in keys:
+                if key in self._buckets:
+                    self._buckets.move_to_end(key)
+                    found[key] = self._buckets[key]
+            return found
+
+    def set_many(self, buckets, timeout):
+        with self._lock:
+            for key, bucket in buckets.items():
+                self._buckets[key] = bucket
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def lock(self):
+        return self._lock
+
+
+class CacheStore:
+    """Buckets in a Django cache shared between worker processes."""
+
+    def __init__(self, alias=None):
+        self.cache = caches[
+            alias or getattr(settings, "LOGIN_RATE_LIMIT_CACHE", "default")
+        ]
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        return self.cache.get_many(keys)
+
+    def set_many(self, buckets, timeout):
+        self.cache.set_many(buckets, timeout)
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+    def lock(self):
+        # Serialises this process only; see the module docstring.
+        return self._lock
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            path = getattr(settings, "LOGIN_RATE_LIMIT_STORE", DEFAULT_STORE)
+            _store = import_string(path)()
+        return _store
+
+
+def reset_store():
+    """Forget every bucket and re-read the store setting."""
+    global _store
+    with _store_lock:
+        _store = None
+
+
+def _limits():
+    return getattr(settings, "LOGIN_RATE_LIMITS", DEFAULT_LIMITS)
+
+
+def client_ip(request):
+    header = getattr(settings, "LOGIN_RATE_LIMIT_IP_HEADER", "REMOTE_ADDR")
+    return request.META.get(header) or request.META.get("REMOTE_ADDR", "")
+
+
+def _email_key(email):
+    return (email or "").strip().lower()
+
+
+def _keys(request, email):
+    values = {"ip": client_ip(request), "email": _email_key(email), "global": ""}
+    return {
+        f"login-bucket:{scope}:{values[scope]}": (scope, *limit)
+        for scope, limit in _limits().items()
+    }
+
+
+def _trust_age():
+    return getattr(settings, "LOGIN_RATE_LIMIT_TRUST", DEFAULT_TRUST)
+
+
+def _trusted(request, email):
+    """Whether the request carries a trust cookie for this account."""
+    if not _trust_age():
+        return False
+    account = request.get_signed_cookie(
+        TRUST_COOKIE, default=None, salt=TRUST_SALT, max_age=_trust_age()
+    )
+    return account is not None and account == _email_key(email)
+
+
+def check_login(request, email, now=None):
+    """Take a token per bucket for a login attempt.
+
+    Returns 0 when the attempt may go ahead, after sleeping at most
+    ``LOGIN_RATE_LIMIT_MAX_DELAY`` for its tokens, or the seconds to wait
+    before retrying when it is rejected (no tokens are taken then).
+    """
+    buckets = _keys(request, email)
+    if not buckets:
+        return 0
+    max_delay = getattr(settings, "LOGIN_RATE_LIMIT_MAX_DELAY", 0.25)
+    trusted = _trusted(request, email)
+    store = get_store()
+    with store.lock():
+        # Wall-clock time, so buckets in a shared cache mean the same everywhere.
+        now = time.time() if now is None else now
+        states = store.get_many(list(buckets))
+        updated = {}
+        wait = rejected = 0.0
+        for key, (scope, burst, per_minute) in buckets.items():
+            if trusted and scope in TRUSTED_EXEMPT:
+                continue
+            rate = per_minute / 60
+            tokens, updated_at = states.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated_at) * rate) - 1
+            if tokens < 0:
+                # A negative balance queues the attempt behind earlier ones.
+                needed = -tokens / rate
+                if needed > max_delay:
+                    rejected = max(rejected, needed - max_delay)
+                wait = max(wait, needed)
+            updated[key] = (tokens, now)
+        if rejected:
+            return rejected
+        if updated:
+            # Idle buckets refill completely within burst / rate seconds.
+            timeout = max(
+                burst * 60 / per_minute for _, burst, per_minute in buckets.values()
+            )
+            store.set_many(updated, int(timeout) + 1)
+    if wait:
+        time.sleep(wait)
+    return 0
+
+
+def login_succeeded(response, email):
+    """Refill the account's bucket and trust this browser for it."""
+    if not _limits():
+        return
+    if "email" in _limits():
+        get_store().delete(f"login-bucket:email:{_email_key(email)}")
+    if _trust_age():
+        response.set_signed_cookie(
+            TRUST_COOKIE,
+            _email_key(email),
+            salt=TRUST_SALT,
+            max_age=_trust_age(),
+            secure=settings.SESSION_COOKIE_SECURE,
+            httponly=True,
+            samesite="Lax",
+        )
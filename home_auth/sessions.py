@@ -0,0 +1,36 @@
+"""Housekeeping for database-backed sessions.
+
+Expired rows stay in ``django_session`` until something deletes them, and
+Django's ``clearsessions`` removes them all in one statement, holding the
+SQLite write lock for as long as that takes. :func:`purge_expired_sessions`
+deletes them in small batches, each in its own short transaction, so mark
+entry only ever waits for one batch. Run it from cron via
+``manage.py purge_sessions``.
+"""
+
+import time
+
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+
+PURGE_BATCH_SIZE = 1000
+
+
+def purge_expired_sessions(batch_size=PURGE_BATCH_SIZE, pause=0.0, now=None):
+    """Delete expired sessions ``batch_size`` rows at a time.
+
+    Sleeps ``pause`` seconds between batches to let other writers in.
+    Returns the number of sessions deleted.
+    """
+    now = now or timezone.now()
+    expired = Session.objects.filter(expire_date__lt=now)
+    deleted = 0
+    while True:
+        keys = list(expired.values_list("session_key", flat=True)[:batch_size])
+        if not keys:
+            return deleted
+        deleted += Session.objects.filter(session_key__in=keys).delete()[0]
+        if len(keys) < batch_size:
+            return deleted
+        if pause:
+            time.sleep(pause)
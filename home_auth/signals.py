@@ -0,0 +1,39 @@
+"""Signal handlers that schedule resized copies of uploaded photos."""
+
+from django.db import transaction
+from django.db.models.signals import post_init, post_save
+
+from .images import IMAGE_FIELDS, schedule
+
+
+def _stored_name(instance, field):
+    """Name of the stored file, read without loading a deferred field."""
+    value = instance.__dict__.get(field)
+    return getattr(value, "name", value) or ""
+
+
+def _connect(label, field, digest_field):
+    def image_loaded(sender, instance, **kwargs):
+        # Remember the stored file so a save can tell whether it changed.
+        instance._loaded_image = _stored_name(instance, field)
+
+    def image_saved(sender, instance, **kwargs):
+        if field not in instance.__dict__:
+            # Deferred, so this save did not write it.
+            return
+        name = _stored_name(instance, field)
+        changed = name != getattr(instance, "_loaded_image", "")
+        stale = bool(name) and not instance.__dict__.get(digest_field)
+        instance._loaded_image = name
+        if changed or stale:
+            transaction.on_commit(
+                lambda: schedule(label, instance.pk, field, digest_field)
+            )
+
+    uid = f"image-derivatives:{label}"
+    post_init.connect(image_loaded, sender=label, weak=False, dispatch_uid=uid)
+    post_save.connect(image_saved, sender=label, weak=False, dispatch_uid=uid)
+
+
+for _label, _field, _digest_field in IMAGE_FIELDS:
+    _connect(_label, _field, _digest_field)
@@ -1,3 +1,483 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from smtplib import SMTPException, SMTPServerDisconnected
+from time import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.sessions.backends.cache import SessionStore
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connection
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from student.models import Department, Student, Teacher
+
+from .images import DERIVED_DIR, SIZES, derivative_name, file_digest
+from .models import CustomUser, EmailOutbox
+from .outbox import process_outbox
+from .ratelimit import TRUST_COOKIE, check_login, login_succeeded, reset_store
+from .sessions import purge_expired_sessions
+from .usercontext import resolve_user_context
+
+
+class CountingBackend(EmailBackend):
+    """The locmem backend, counting the connections opened."""
+
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return super().open()
+
+
+class FailingBackend(EmailBackend):
+    """A mail server that refuses every message."""
+
+    def send_messages(self, messages):
+        raise SMTPException("451 try again later")
+
+
+class DroppingBackend(EmailBackend):
+    """A mail server that hangs up after ``limit`` messages per connection."""
+
+    limit = 2
+    reconnects = True
+    opened = 0
+
+    def open(self):
+        if DroppingBackend.opened and not DroppingBackend.reconnects:
+            raise ConnectionRefusedError("Connection refused")
+        DroppingBackend.opened += 1
+        self.sent_here = 0
+        return super().open()
+
+    def send_messages(self, messages):
+        if self.sent_here >= self.limit:
+            raise SMTPServerDisconnected("Connection unexpectedly closed")
+        self.sent_here += len(messages)
+        return super().send_messages(messages)
+
+
+class ForgotPasswordTests(TestCase):
+    def test_view_only_enqueues(self):
+        CustomUser.objects.create_user("pat", "pat@school.test", "pw")
+        response = self.client.post(
+            reverse("forgot-password"), {"email": "pat@school.test"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mail.outbox, [])
+        email = EmailOutbox.objects.get()
+        self.assertEqual(email.status, EmailOutbox.PENDING)
+        self.assertEqual(email.recipients, ["pat@school.test"])
+
+
+class UserContextTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name="Maths", code="MAT")
+        cls.teacher_user = CustomUser.objects.create_user(
+            "tess@school.test", "tess@school.test", "pw", is_teacher=True
+        )
+        cls.teacher = Teacher.objects.create(
+            user=cls.teacher_user,
+            first_name="Tess",
+            last_name="Teacher",
+            teacher_id="T1",
+            email="tess@school.test",
+            department=cls.department,
+        )
+        # Matched by admission number, not linked.
+        cls.student_user = CustomUser.objects.create_user(
+            "A100", "sam@school.test", "pw", is_student=True
+        )
+        cls.student = Student.objects.create(
+            first_name="Sam",
+            last_name="Student",
+            student_id="S1",
+            gender="Other",
+            student_class="7",
+            admission_number="A100",
+        )
+        cls.plain_user = CustomUser.objects.create_user(
+            "guest@school.test", "guest@school.test", "pw"
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def resolve(self, user):
+        request = RequestFactory().get("/")
+        request.user = user
+        request.session = SessionStore()
+        context = resolve_user_context(request)
+        self.assertFalse(request.session.modified)
+        return context
+
+    def test_profiles_are_resolved(self):
+        teacher = self.resolve(self.teacher_user)
+        self.assertEqual(teacher.teacher, self.teacher)
+        self.assertEqual(teacher.department, self.department)
+        self.assertTrue(teacher.is_teacher_or_admin)
+        self.assertEqual(self.resolve(self.student_user).student, self.student)
+        plain = self.resolve(self.plain_user)
+        self.assertEqual((plain.teacher, plain.student), (None, None))
+
+    def test_known_profiles_are_cached_not_stored_in_the_session(self):
+        for user in (self.teacher_user, self.student_user, self.plain_user):
+            self.resolve(user)
+
+        # Only the profile rows themselves are read again.
+        with self.assertNumQueries(1):
+            self.assertEqual(self.resolve(self.teacher_user).teacher, self.teacher)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.resolve(self.student_user).student, self.student)
+        with self.assertNumQueries(0):
+            self.resolve(self.plain_user)
+
+    def test_profile_change_resolves_only_its_user_again(self):
+        for user in (self.student_user, self.plain_user):
+            self.resolve(user)
+        self.student.admission_number = "A200"
+        self.student.save()
+
+        with self.assertNumQueries(0):
+            self.resolve(self.plain_user)
+        self.assertIsNone(self.resolve(self.student_user).student)
+
+
+class SessionTests(TestCase):
+    def test_requests_read_the_session_without_a_query(self):
+        user = CustomUser.objects.create_user(
+            "pat@school.test", "pat@school.test", "pw"
+        )
+        self.client.force_login(user)
+        self.client.get(reverse("profile"))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("profile"))
+        self.assertFalse(
+            [query for query in queries if "django_session" in query["sql"]]
+        )
+
+    def test_expired_sessions_are_purged_in_batches(self):
+        now = timezone.now()
+        for i in range(5):
+            Session.objects.create(
+                session_key=f"old{i}", session_data="", expire_date=now
+            )
+        Session.objects.create(
+            session_key="live",
+            session_data="",
+            expire_date=now + timedelta(days=1),
+        )
+
+        # Three batches of at most two: a SELECT and a DELETE each.
+        with self.assertNumQueries(6):
+            self.assertEqual(
+                purge_expired_sessions(batch_size=2, now=now + timedelta(seconds=1)),
+                5,
+            )
+        self.assertEqual(
+            list(Session.objects.values_list("session_key", flat=True)), ["live"]
+        )
+
+
+def picture(color, size=(1000, 600), mode="RGBA", name="photo.png"):
+    buffer = io.BytesIO()
+    Image.new(mode, size, color).save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        settings = self.settings(MEDIA_ROOT=media, IMAGE_DERIVATIVES_SYNC=True)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def user(self, name):
+        return CustomUser.objects.create_user(name, f"{name}@school.test", "pw")
+
+    def set_avatar(self, user, upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            user.avatar = upload
+            user.save()
+        user.refresh_from_db()
+        return user.avatar_digest
+
+    def derived(self):
+        root = Path(default_storage.path(DERIVED_DIR))
+        return sorted(path.name for path in root.rglob("*.jpg"))
+
+    def test_upload_builds_each_size(self):
+        user = self.user("pat")
+        self.assertEqual(user.avatar_urls, {})
+        digest = self.set_avatar(user, picture((0, 128, 0, 0)))
+
+        self.assertEqual(digest, file_digest(user.avatar))
+        self.assertEqual(self.derived(), sorted(f"{digest}-{s}.jpg" for s in SIZES))
+        self.assertEqual(
+            user.avatar_urls["list"],
+            default_storage.url(derivative_name(digest, "list")),
+        )
+        sizes = {}
+        for size in SIZES:
+            with default_storage.open(derivative_name(digest, size)) as stored:
+                with Image.open(stored) as image:
+                    sizes[size] = (image.format, image.mode, image.size)
+                    if size == "list":
+                        # Transparency is composed onto white.
+                        self.assertEqual(image.getpixel((40, 40)), (255, 255, 255))
+        self.assertEqual(
+            sizes,
+            {
+                "list": ("JPEG", "RGB", (80, 80)),
+                "card": ("JPEG", "RGB", (320, 320)),
+                "detail": ("JPEG", "RGB", (800, 480)),
+            },
+        )
+
+    def test_identical_uploads_share_derivatives(self):
+        first = self.set_avatar(self.user("pat"), picture("red", mode="RGB"))
+        built = self.derived()
+        with mock.patch.object(
+            default_storage, "save", wraps=default_storage.save
+        ) as save:
+            second = self.set_avatar(self.user("sam"), picture("red", mode="RGB"))
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.derived(), built)
+        saved = [call.args[0] for call in save.call_args_list]
+        self.assertEqual(saved, ["avatars/photo.png"])
+
+    def test_replacing_or_clearing_the_photo_updates_the_digest(self):
+        user = self.user("pat")
+        old = self.set_avatar(user, picture("red", mode="RGB"))
+        new = self.set_avatar(user, picture("blue", mode="RGB"))
+
+        self.assertNotEqual(old, new)
+        self.assertIn(new, user.avatar_urls["card"])
+        # Saving other fields leaves the photo alone.
+        with self.captureOnCommitCallbacks() as callbacks:
+            user.first_name = "Pat"
+            user.save()
+        self.assertEqual(callbacks, [])
+
+        self.assertEqual(self.set_avatar(user, None), "")
+        self.assertEqual(user.avatar_urls, {})
+
+    def test_unreadable_upload_keeps_the_original(self):
+        user = self.user("pat")
+        broken = SimpleUploadedFile("photo.jpg", b"not an image")
+        with self.assertLogs("home_auth.images", "ERROR"):
+            self.assertEqual(self.set_avatar(user, broken), "")
+        self.assertEqual(user.avatar_urls["list"], user.avatar.url)
+
+
+# The worker sends from a thread pool, whose connections cannot see the
+# rows of a TestCase transaction.
+class OutboxWorkerTests(TransactionTestCase):
+    def enqueue(self, count):
+        for i in range(count):
+            EmailOutbox.enqueue(f"Notice {i}", "Body", [f"parent{i}@school.test"])
+
+    @override_settings(EMAIL_BACKEND="home_auth.tests.CountingBackend")
+    def test_sends_in_batches_over_one_connection(self):
+        CountingBackend.opened = 0
+        self.enqueue(7)
+
+        self.assertEqual(process_outbox(batch_size=4, workers=2), (7, 7))
+
+        self.assertEqual(len(mail.outbox), 7)
+        self.assertEqual(CountingBackend.opened, 2)
+        self.assertFalse(EmailOutbox.objects.exclude(status=EmailOutbox.SENT).exists())
+
+    @override_settings(
+        EMAIL_BACKEND="home_auth.tests.FailingBackend",
+        OUTBOX_MAX_ATTEMPTS=3,
+        OUTBOX_RETRY_DELAY=30,
+    )
+    def test_failures_back_off_then_fail(self):
+        self.enqueue(1)
+        delays = []
+        with self.assertLogs("home_auth.outbox", "ERROR"):
+            for _ in range(3):
+                started = timezone.now()
+                self.assertEqual(process_outbox(), (0, 1))
+                email = EmailOutbox.objects.get()
+                if email.status == EmailOutbox.PENDING:
+                    delays.append(
+                        round((email.next_attempt_at - started).total_seconds())
+                    )
+                    # Not retried before its time.
+                    self.assertEqual(process_outbox(), (0, 0))
+                    email.next_attempt_at = timezone.now() - timedelta(seconds=1)
+                    email.save(update_fields=["next_attempt_at"])
+
+        self.assertEqual(delays, [30, 60])
+        self.assertEqual(email.status, EmailOutbox.FAILED)
+        self.assertEqual(email.attempts, 3)
+        self.assertIn("451", email.last_error)
+        self.assertEqual(mail.outbox, [])
+
+    def dropping(self, limit, reconnects):
+        DroppingBackend.limit = limit
+        DroppingBackend.reconnects = reconnects
+        DroppingBackend.opened = 0
+        return self.settings(EMAIL_BACKEND="home_auth.tests.DroppingBackend")
+
+    def test_reconnects_once_when_the_server_hangs_up(self):
+        self.enqueue(5)
+        with self.dropping(limit=3, reconnects=True):
+            self.assertEqual(process_outbox(), (5, 5))
+
+        self.assertEqual(DroppingBackend.opened, 2)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(
+            set(EmailOutbox.objects.values_list("status", "attempts")),
+            {(EmailOutbox.SENT, 1)},
+        )
+
+    def test_untried_emails_are_released_without_an_attempt(self):
+        self.enqueue(5)
+        with self.dropping(limit=2, reconnects=False):
+            self.assertEqual(process_outbox(), (2, 5))
+
+        rows = EmailOutbox.objects.order_by("pk")
+        self.assertEqual(
+            [(row.status, row.attempts) for row in rows],
+            [
+                (EmailOutbox.SENT, 1),
+                (EmailOutbox.SENT, 1),
+                (EmailOutbox.PENDING, 1),
+                (EmailOutbox.PENDING, 0),
+                (EmailOutbox.PENDING, 0),
+            ],
+        )
+        self.assertIn("Connection refused", rows[2].last_error)
+        self.assertTrue(all(row.claimed_at is None for row in rows))
+        # The released emails are due again at once; the tried one backs off.
+        with self.dropping(limit=5, reconnects=True):
+            self.assertEqual(process_outbox(), (2, 2))
+        self.assertEqual(
+            EmailOutbox.objects.exclude(status=EmailOutbox.SENT).get(), rows[2]
+        )
+
+
+@override_settings(
+    LOGIN_RATE_LIMITS={"ip": (3, 6), "email": (5, 2), "global": (2, 60)},
+    LOGIN_RATE_LIMIT_STORE="home_auth.ratelimit.LocalStore",
+    LOGIN_RATE_LIMIT_MAX_DELAY=0.25,
+)
+class LoginRateLimitTests(SimpleTestCase):
+    def setUp(self):
+        reset_store()
+        patcher = mock.patch("home_auth.ratelimit.time.sleep")
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(reset_store)
+
+    def attempt(self, email, ip="10.0.0.1", now=1000.0, cookies=None):
+        request = RequestFactory().post("/", REMOTE_ADDR=ip)
+        request.COOKIES.update(cookies or {})
+        return check_login(request, email, now=now)
+
+    def trust(self, email):
+        response = HttpResponse()
+        login_succeeded(response, email)
+        return {TRUST_COOKIE: response.cookies[TRUST_COOKIE].value}
+
+    def test_global_overflow_is_refused_without_waiting(self):
+        # One token per second after a burst of two, from many addresses.
+        results = [self.attempt(f"u{i}@school.test", f"10.0.1.{i}") for i in range(6)]
+
+        self.assertEqual(results[:2], [0, 0])
+        for retry_after in results[2:]:
+            self.assertAlmostEqual(retry_after, 1 - 0.25)
+        self.sleep.assert_not_called()
+
+    def test_ip_limit_refuses_beyond_the_short_delay(self):
+        with self.settings(LOGIN_RATE_LIMITS={"ip": (3, 6)}):
+            results = [self.attempt(f"u{i}@school.test") for i in range(4)]
+
+        self.assertEqual(results[:3], [0, 0, 0])
+        self.assertAlmostEqual(results[3], 10 - 0.25)
+
+    def test_trust_cookie_skips_the_address_and_global_buckets(self):
+        for i in range(8):
+            self.attempt(f"u{i}@school.test")
+        cookies = self.trust("Pat@school.test")
+
+        self.assertEqual(self.attempt("pat@school.test", cookies=cookies), 0)
+        # The cookie only vouches for its own account.
+        self.assertGreater(self.attempt("other@school.test", cookies=cookies), 0)
+
+    def test_knowing_the_email_is_not_enough(self):
+        self.trust("pat@school.test")
+        for i in range(8):
+            self.attempt(f"u{i}@school.test")
+
+        self.assertGreater(self.attempt("pat@school.test"), 0)
+        forged = {TRUST_COOKIE: "pat@school.test"}
+        self.assertGreater(self.attempt("pat@school.test", cookies=forged), 0)
+
+    @override_settings(LOGIN_RATE_LIMIT_TRUST=60)
+    def test_trust_expires(self):
+        cookies = self.trust("pat@school.test")
+        for i in range(8):
+            self.attempt(f"u{i}@school.test")
+
+        with mock.patch("django.core.signing.time.time", return_value=time() + 61):
+            self.assertGreater(self.attempt("pat@school.test", cookies=cookies), 0)
+
+
+@override_settings(
+    LOGIN_RATE_LIMITS={"email": (2, 2)},
+    LOGIN_RATE_LIMIT_STORE="home_auth.ratelimit.LocalStore",
+)
+class LoginViewThrottleTests(TestCase):
+    def setUp(self):
+        reset_store()
+        self.addCleanup(reset_store)
+        CustomUser.objects.create_user(
+            "pat@school.test", "pat@school.test", "pw", is_student=True
+        )
+
+    def post(self, password):
+        return self.client.post(
+            reverse("login"), {"email": "pat@school.test", "password": password}
+        )
+
+    def test_refused_attempts_get_retry_after(self):
+        self.post("wrong")
+        self.post("wrong")
+        response = self.post("wrong")
+
+        self.assertEqual(response.status_code, 429)
+        self.assertIn(int(response["Retry-After"]), range(1, 31))
+
+    def test_successful_login_sets_the_trust_cookie(self):
+        response = self.post("pw")
+
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.cookies[TRUST_COOKIE]["httponly"])
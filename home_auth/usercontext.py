@@ -0,0 +1,209 @@
+"""Who is making the request, resolved once per request.
+
+``UserContextMiddleware`` puts a lazy ``request.user_context`` on every
+request holding the user, their role flags, teacher or student profile,
+department and display name. Views, permission checks and templates (the
+``user_context`` and ``display_name`` context variables) read it instead of
+looking ``teacher_profile``/``student_profile`` up on their own.
+
+Both profiles and their departments are loaded with one joined query on
+the user row. Which profiles exist, including the student matched by
+``admission_number == username`` for accounts without a linked profile, is
+cached per user under version stamps, so users without a profile cost no
+query at all, and resolving again writes a cache entry rather than the
+session row. Saving or deleting a teacher or student bumps the stamps of
+the users it belongs to (by id, and by username for the admission number),
+so only they resolve again; bulk imports bump a school-wide stamp instead.
+"""
+
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+CONTEXT_CACHE_TIMEOUT = 60 * 60 * 24
+PROFILE_RELATIONS = ("teacher_profile__department", "student_profile__department")
+
+
+def is_admin(user):
+    """Superusers and users with the admin role."""
+    if not user.is_authenticated:
+        return False
+    return user.is_superuser or getattr(user, "is_admin", False)
+
+
+def is_teacher_or_admin(user):
+    """Teachers, plus admins, who may do everything a teacher can."""
+    if not user.is_authenticated:
+        return False
+    return getattr(user, "is_teacher", False) or is_admin(user)
+
+
+def _stamp_keys(user):
+    return [
+        "user-context-version:all",
+        f"user-context-version:user:{user.pk}",
+        f"user-context-version:username:{user.username}",
+    ]
+
+
+def context_version(user):
+    """The combined school-wide and per-user stamps of ``user``."""
+    keys = _stamp_keys(user)
+    stamps = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in stamps}
+    if missing:
+        cache.set_many(missing, None)
+        stamps.update(missing)
+    return "-".join(str(stamps[key]) for key in keys)
+
+
+def invalidate_user_context(user_ids=None, usernames=None):
+    """Make users resolve their profiles again.
+
+    Only the users with ``user_ids`` or ``usernames`` are affected; with
+    neither, every user is (for bulk imports).
+    """
+    if user_ids is None and usernames is None:
+        keys = ["user-context-version:all"]
+    else:
+        keys = [f"user-context-version:user:{pk}" for pk in user_ids or ()]
+        keys += [f"user-context-version:username:{name}" for name in usernames or ()]
+    if keys:
+        now = time.time_ns()
+        cache.set_many({key: now for key in keys}, None)
+
+
+def _display_name(user):
+    if not user.is_authenticated:
+        return "Guest"
+    return user.first_name or user.get_full_name() or user.username or "Guest"
+
+
+class UserContext:
+    """The requesting user with role flags, profiles and department."""
+
+    def __init__(self, user, teacher=None, student=None):
+        self.user = user
+        self.is_authenticated = user.is_authenticated
+        self.is_admin = is_admin(user)
+        self.is_teacher = self.is_authenticated and bool(
+            getattr(user, "is_teacher", False)
+        )
+        self.is_student = self.is_authenticated and bool(
+            getattr(user, "is_student", False)
+        )
+        self.is_teacher_or_admin = self.is_teacher or self.is_admin
+        self.teacher = teacher
+        self.student = student
+        self.display_name = _display_name(user)
+
+    @property
+    def department(self):
+        """The teacher's department, else the student's."""
+        profile = self.teacher or self.student
+        return profile.department if profile else None
+
+    def __repr__(self):
+        return (
+            f"<UserContext {self.user}: teacher={self.teacher} student={self.student}>"
+        )
+
+
+def _profiles(user_id):
+    """``(teacher, student)`` of a user from one joined query."""
+    user = (
+        get_user_model()
+        ._default_manager.select_related(*PROFILE_RELATIONS)
+        .filter(pk=user_id)
+        .first()
+    )
+    if user is None:
+        return None, None
+    # Reverse one-to-ones fetched by select_related; missing ones are None.
+    cached = user._state.fields_cache
+    return cached.get("teacher_profile"), cached.get("student_profile")
+
+
+def resolve_user_context(request):
+    """Build the :class:`UserContext` of ``request`` (see module docstring)."""
+    user = request.user
+    if not user.is_authenticated:
+        return UserContext(user)
+
+    Student = apps.get_model("student", "Student")
+    key = f"user-context:{user.pk}:{context_version(user)}"
+    known = cache.get(key)
+    if known:
+        teacher = student = None
+        if known["teacher_id"] or known["linked"]:
+            teacher, student = _profiles(user.pk)
+        elif known["student_id"]:
+            student = (
+                Student.objects.select_related("department")
+                .filter(pk=known["student_id"])
+                .first()
+            )
+        return UserContext(user, teacher, student)
+
+    teacher, student = _profiles(user.pk)
+    linked = student is not None
+    if not linked:
+        # Accounts without a linked profile: admission number == username.
+        student = (
+            Student.objects.select_related("department")
+            .filter(admission_number=user.username)
+            .first()
+        )
+    known = {
+        "teacher_id": teacher.pk if teacher else None,
+        "student_id": student.pk if student else None,
+        "linked": linked,
+    }
+    cache.set(key, known, CONTEXT_CACHE_TIMEOUT)
+    return UserContext(user, teacher, student)
+
+
+def get_user_context(request):
+    if not hasattr(request, "_cached_user_context"):
+        request._cached_user_context = resolve_user_context(request)
+    return request._cached_user_context
+
+
+async def aget_user_context(request):
+    """Async :func:`get_user_context` for async views."""
+    if not hasattr(request, "_cached_user_context"):
+        # The context processors read request.user synchronously later on.
+        request.user = await request.auser()
+        request._cached_user_context = await sync_to_async(resolve_user_context)(
+            request
+        )
+    return request._cached_user_context
+
+
+class UserContextMiddleware:
+    """Attach ``request.user_context`` (lazy) and ``request.auser_context``.
+
+    Goes after ``AuthenticationMiddleware``. Nothing is queried until a view
+    or template reads the context.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def _attach(self, request):
+        request.user_context = SimpleLazyObject(lambda: get_user_context(request))
+        request.auser_context = lambda: aget_user_context(request)
+
+    def __call__(self, request):
+        self._attach(request)
+        return self.get_response(request)
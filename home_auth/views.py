@@ -7,9 +7,17 @@ from django.contrib import messages
 from django.core.mail import send_mail
 from django.conf import settings
 from django.utils.crypto import get_random_string
+from django.utils.cache import patch_cache_control
+from django.views.static import serve
 from .forms import ProfileForm
+from .images import DERIVED_DIR
+from .ratelimit import check_login, login_succeeded
+import math
 import re
 
+# Derivative names change whenever the source photo does (see images.py).
+DERIVATIVE_MAX_AGE = 60 * 60 * 24 * 365
+
 
 def signup_view(request):
     if request.method == "POST":
@@ -119,6 +127,20 @@ def login_view(request):
         email = request.POST["email"]
         password = request.POST["password"]
 
+        # Throttled before authenticate(), which spends ~0.5s hashing.
+        retry_after = check_login(request, email)
+        if retry_after:
+            messages.error(
+                request,
+                "Too many login attempts. Please try again in "
+                f"{math.ceil(retry_after)} seconds.",
+            )
+            response = render(
+                request, "authentication/login.html", {"next": next_url}, status=429
+            )
+            response["Retry-After"] = str(math.ceil(retry_after))
+            return response
+
         user = authenticate(request, username=email, password=password)
         if user is not None:
             login(request, user)
@@ -126,18 +148,19 @@ def login_view(request):
 
             # Honor ?next=... first if provided
             if next_url:
-                return redirect(next_url)
-
+                response = redirect(next_url)
             # Redirect user based on their role to existing routes
-            if user.is_superuser or user.is_admin:
-                return redirect("admin:index")
+            elif user.is_superuser or user.is_admin:
+                response = redirect("admin:index")
             elif user.is_teacher:
-                return redirect("teacher_dashboard")
+                response = redirect("teacher_dashboard")
             elif user.is_student:
-                return redirect("student_dashboard")
+                response = redirect("student_dashboard")
             else:
                 messages.error(request, "Invalid user role")
-                return redirect("index")  # Redirect to index in case of error
+                response = redirect("index")  # Redirect to index in case of error
+            login_succeeded(response, email)
+            return response
 
         else:
             messages.error(request, "Invalid credentials")
@@ -217,13 +240,21 @@ def profile_view(request):
     else:
         form = ProfileForm(instance=user)
 
-    # Get teacher profile if user is a teacher
-    teacher_profile = None
-    if hasattr(user, "teacher_profile"):
-        teacher_profile = user.teacher_profile
-
     context = {
         "form": form,
-        "teacher_profile": teacher_profile,
+        "teacher_profile": request.user_context.teacher,
     }
     return render(request, "authentication/profile.html", context)
+
+
+def image_derivative(request, path):
+    """Serve a resized photo with a long-lived, immutable cache header.
+
+    Only routed when ``DEBUG`` is on; in production the front-end server
+    serves ``MEDIA_ROOT/derived`` with the same header (see Home/urls.py).
+    """
+    response = serve(request, path, document_root=settings.MEDIA_ROOT / DERIVED_DIR)
+    patch_cache_control(
+        response, public=True, max_age=DERIVATIVE_MAX_AGE, immutable=True
+    )
+    return response
@@ -1,5 +1,12 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from .forms import StudentImportUploadForm
+from .importers import import_students
 from .models import Parent, Student, Mark, Department, Subject, Course, Teacher
+from .models import AssignmentSubmission, Exam, GradeBand, GradingScale
 
 admin.site.register(Teacher)
 
@@ -29,6 +36,56 @@ class StudentAdmin(admin.ModelAdmin):
     search_fields = ("first_name", "last_name", "student_id", "mobile_number")
     list_filter = ("gender", "student_class", "section")
     readonly_fields = ("student_image",)
+    change_list_template = "admin/student/student/change_list.html"
+
+    # Number of row errors listed on the page after an upload.
+    import_errors_shown = 50
+
+    def get_urls(self):
+        urls = [
+            path(
+                "import/",
+                self.admin_site.admin_view(self.import_view),
+                name="student_student_import",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def import_view(self, request):
+        """Upload a CSV/XLSX admission file and import it in batches."""
+        if not self.has_add_permission(request):
+            return redirect("admin:student_student_changelist")
+
+        report = None
+        if request.method == "POST":
+            form = StudentImportUploadForm(request.POST, request.FILES)
+            if form.is_valid():
+                upload = form.cleaned_data["file"]
+                try:
+                    report = import_students(
+                        upload,
+                        name=upload.name,
+                        batch_size=form.cleaned_data["batch_size"],
+                    )
+                except ImportError as exc:
+                    messages.error(request, str(exc))
+                else:
+                    level = messages.WARNING if report.errors else messages.SUCCESS
+                    self.message_user(request, report.summary(), level)
+        else:
+            form = StudentImportUploadForm()
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Import students",
+            "form": form,
+            "report": report,
+            "errors": report.errors[: self.import_errors_shown] if report else [],
+        }
+        return TemplateResponse(
+            request, "admin/student/student/import_students.html", context
+        )
 
 
 @admin.register(Mark)
@@ -36,21 +93,28 @@ class MarkAdmin(admin.ModelAdmin):
     list_display = (
         "student",
         "subject",
-        "exam_name",
+        "exam",
         "score",
         "max_score",
         "updated_at",
     )
-    list_filter = ("subject", "exam_name")
+    list_filter = ("subject", "exam")
+    list_select_related = ("student", "subject", "exam")
     search_fields = (
         "student__first_name",
         "student__last_name",
         "student__student_id",
-        "subject",
-        "exam_name",
+        "subject__name",
+        "exam__name",
     )
 
 
+@admin.register(Exam)
+class ExamAdmin(admin.ModelAdmin):
+    list_display = ("name", "date", "created_at")
+    search_fields = ("name",)
+
+
 @admin.register(Department)
 class DepartmentAdmin(admin.ModelAdmin):
     list_display = ("name", "code", "created_at")
@@ -71,3 +135,25 @@ class CourseAdmin(admin.ModelAdmin):
     search_fields = ("title", "code", "description")
     list_filter = ("is_active", "subjects", "created_at")
     filter_horizontal = ("subjects",)
+
+
+class GradeBandInline(admin.TabularInline):
+    model = GradeBand
+    extra = 0
+
+
+@admin.register(GradingScale)
+class GradingScaleAdmin(admin.ModelAdmin):
+    list_display = ("name", "is_default")
+    list_filter = ("is_default",)
+    inlines = [GradeBandInline]
+
+
+@admin.register(AssignmentSubmission)
+class AssignmentSubmissionAdmin(admin.ModelAdmin):
+    list_display = ("assignment", "student", "status", "grade", "submitted_at")
+    list_editable = ("status", "grade")
+    list_filter = ("status",)
+    search_fields = ("assignment__title", "student__first_name", "student__last_name")
+    raw_id_fields = ("assignment", "student")
+    list_select_related = ("assignment", "student")
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class StudentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'student'
+
+    def ready(self):
+        # Register signal handlers (cache invalidation, derived tables).
+        from . import signals  # noqa: F401
+        from . import checks  # noqa: F401
@@ -0,0 +1,81 @@
+"""Setting assignments for students.
+
+An assignment reaches a student either explicitly, through a row in the
+``assigned_students`` through table, or through an ``AssignmentTarget``
+(a department, optionally narrowed to a class and section) that is matched
+when assignments are read (``Assignment.objects.for_student``). A
+department-wide assignment is therefore one target row, however many
+students the department has.
+
+Explicit picks are written with chunked ``bulk_create`` on the through
+table; that skips the ``m2m_changed`` signal, so the caches it would have
+invalidated are dropped here.
+
+A student's inbox (``Assignment.objects.inbox``) carries the state of each
+assignment: pending, overdue, or the status of the student's
+``AssignmentSubmission``. The number of assignments in each state is cached
+per student under the dashboard's version, which every assignment, target
+and submission change bumps for the students it reaches: explicit picks by
+student, targets by department (``invalidate_department_dashboards``).
+"""
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .dashboard import dashboard_version, invalidate_dashboard
+from .metrics import invalidate_department_metrics
+from .models import Assignment, AssignmentSubmission, AssignmentTarget
+
+BATCH_SIZE = 1000
+COUNTS_CACHE_TIMEOUT = 60 * 60
+
+
+def assign_students(assignment, student_ids):
+    """Add explicit students to ``assignment`` in chunked bulk inserts."""
+    Through = Assignment.assigned_students.through
+    student_ids = list(dict.fromkeys(student_ids))
+    for start in range(0, len(student_ids), BATCH_SIZE):
+        Through.objects.bulk_create(
+            [
+                Through(assignment_id=assignment.pk, student_id=student_id)
+                for student_id in student_ids[start : start + BATCH_SIZE]
+            ],
+            ignore_conflicts=True,
+        )
+    invalidate_dashboard(student_ids)
+    invalidate_department_metrics(assignment.department_id)
+    return len(student_ids)
+
+
+def add_target(assignment, department=None, student_class="", section=""):
+    """Set ``assignment`` for a whole department, class or section."""
+    return AssignmentTarget.objects.create(
+        assignment=assignment,
+        department=department,
+        student_class=student_class,
+        section=section,
+    )
+
+
+def assignment_counts(student):
+    """Return the cached ``{status: count}`` of a student's inbox."""
+    key = f"assignment-counts:{student.pk}:{dashboard_version(student)}"
+    counts = cache.get(key)
+    if counts is None:
+        counts = Assignment.objects.inbox(student).status_counts()
+        cache.set(key, counts, COUNTS_CACHE_TIMEOUT)
+    return counts
+
+
+def submit_assignment(assignment, student):
+    """Record that ``student`` handed in ``assignment``; return the submission.
+
+    Handing in again updates the submission time, unless it was graded.
+    """
+    submission, created = AssignmentSubmission.objects.get_or_create(
+        assignment=assignment, student=student
+    )
+    if not created and submission.status != AssignmentSubmission.GRADED:
+        submission.submitted_at = timezone.now()
+        submission.save(update_fields=["submitted_at", "updated_at"])
+    return submission
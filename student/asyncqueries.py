@@ -0,0 +1,30 @@
+"""Helpers for the async views (served under ASGI, see Home/asgi.py).
+
+The dashboards and the results page each read a few independent querysets
+and hand them to :func:`fetch_all`. This does not make them overlap: the
+async ORM runs every query through ``sync_to_async`` on the one thread that
+owns the request's connection, so they still execute one after another.
+What the async path buys is that a request waiting on the database does
+not block the event loop. It pays a thread hop per query for that, and
+``manage.py benchmark_async`` measures less throughput than the sync views
+under WSGI, so only serve them where the event loop matters.
+"""
+
+import asyncio
+
+from django.db.models import QuerySet
+
+
+async def _evaluate(query):
+    if isinstance(query, QuerySet):
+        return [row async for row in query]
+    return await query
+
+
+async def fetch_all(*queries):
+    """Evaluate querysets (as lists) and ORM awaitables.
+
+    Returns the results in the order given, like ``asyncio.gather``. The
+    queries run one after another on the request's database thread.
+    """
+    return await asyncio.gather(*(_evaluate(query) for query in queries))
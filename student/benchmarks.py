@@ -0,0 +1,622 @@
+"""Request benchmarks for the main student/teacher pages.
+
+Each scenario is driven through Django's test client against the configured
+database (fill it with ``manage.py generate_school --users`` first) and is
+reported with p50/p95 latency, SQL query count and the peak Python memory
+allocated while serving one request, so runs can be compared as JSON.
+"""
+
+import asyncio
+import itertools
+import platform
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from .models import Mark, Student, Teacher
+from .querybudget import QueryRecorder
+from .synthetic import DEFAULT_PASSWORD
+
+# name -> (which user is logged in, URL name)
+SCENARIOS = {
+    "student_list": ("admin", "student_list"),
+    "teacher_marks": ("teacher", "teacher_marks"),
+    "student_dashboard": ("student", "student_dashboard"),
+    "student_results": ("student", "student_results"),
+    "login": (None, "login"),
+}
+
+
+def percentile(values, pct):
+    """Return the ``pct`` percentile of ``values`` (linear interpolation)."""
+    values = sorted(values)
+    if not values:
+        return None
+    index = (len(values) - 1) * pct / 100
+    lower = int(index)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (index - lower)
+
+
+def pick_users():
+    """Return ``{"admin", "teacher", "student"}`` users to benchmark as.
+
+    The teacher is the one whose department has the most students and the
+    student is one with marks, so the pages render real data.
+    """
+    User = get_user_model()
+    admin = User.objects.filter(is_superuser=True).order_by("pk").first()
+    if admin is None:
+        admin = User.objects.filter(username="bench-admin@school.test").first()
+    if admin is None:
+        admin = User.objects.create_superuser(
+            "bench-admin@school.test", "bench-admin@school.test", DEFAULT_PASSWORD
+        )
+    teacher = (
+        Teacher.objects.filter(user__isnull=False, department__isnull=False)
+        .select_related("user")
+        .annotate(department_size=Count("department__students"))
+        .order_by("-department_size", "pk")
+        .first()
+    )
+    student_id = (
+        Mark.objects.filter(student__user__isnull=False)
+        .values_list("student_id", flat=True)
+        .first()
+    )
+    student = (
+        Student.objects.select_related("user").filter(pk=student_id).first()
+        if student_id
+        else None
+    )
+    return {
+        "admin": admin,
+        "teacher": teacher.user if teacher else None,
+        "student": student.user if student else None,
+    }
+
+
+def _client_for(user):
+    client = Client()
+    if user is not None:
+        client.force_login(user)
+    return client
+
+
+def _request(name, user, url_name, password):
+    if name == "login":
+        # Full login: a fresh client posting credentials, like a browser.
+        client = Client()
+        return client.post(
+            reverse(url_name), {"email": user.username, "password": password}
+        )
+    return _client_for(user).get(reverse(url_name))
+
+
+def run_scenario(name, user, iterations=20, warmup=2, cold=False, password=None):
+    """Time ``iterations`` requests of one scenario and return its stats."""
+    url_name = SCENARIOS[name][1]
+    client = _client_for(user) if name != "login" else None
+
+    def once():
+        if cold:
+            cache.clear()
+        if client is None:
+            return _request(name, user, url_name, password)
+        return client.get(reverse(url_name))
+
+    for _ in range(warmup):
+        once()
+
+    timings, query_counts, statuses = [], [], set()
+    for _ in range(iterations):
+        with QueryRecorder() as recorder:
+            started = time.perf_counter()
+            response = once()
+            timings.append((time.perf_counter() - started) * 1000)
+        query_counts.append(recorder.count)
+        statuses.add(response.status_code)
+
+    # Memory is measured on a separate request: tracemalloc slows the
+    # interpreter down and would distort the timings above.
+    tracemalloc.start()
+    try:
+        once()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "p50_ms": round(percentile(timings, 50), 2),
+        "p95_ms": round(percentile(timings, 95), 2),
+        "mean_ms": round(statistics.fmean(timings), 2),
+        "max_ms": round(max(timings), 2),
+        "queries": max(query_counts),
+        "peak_memory_kb": round(peak / 1024, 1),
+        "status_codes": sorted(statuses),
+    }
+
+
+def run_benchmarks(
+    scenarios=None, iterations=20, warmup=2, cold=False, password=DEFAULT_PASSWORD
+):
+    """Run the benchmark scenarios and return a JSON-serialisable report."""
+    users = pick_users()
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "students": Student.objects.count(),
+            "teachers": Teacher.objects.count(),
+            "marks": Mark.objects.count(),
+            "iterations": iterations,
+            "cold_cache": cold,
+        },
+        "scenarios": {},
+    }
+    # The test client talks to "testserver", which ALLOWED_HOSTS rejects.
+    # Repeated logins from it would hit the login throttle, measured on its
+    # own by run_login_flood.
+    with override_settings(ALLOWED_HOSTS=["testserver"], LOGIN_RATE_LIMITS={}):
+        for name in scenarios or SCENARIOS:
+            role = SCENARIOS[name][0] or "student"
+            user = users.get(role)
+            if user is None:
+                report["scenarios"][name] = {
+                    "error": f"no {role} user found; run generate_school --users"
+                }
+                continue
+            report["scenarios"][name] = run_scenario(
+                name, user, iterations, warmup, cold, password
+            )
+    return report
+
+
+# Pages with an async variant routed by Home/asgi_urls.py.
+ASYNC_SCENARIOS = {
+    "student_dashboard": ("student", "student_dashboard"),
+    "teacher_dashboard": ("teacher", "teacher_dashboard"),
+    "student_results": ("student", "student_results"),
+}
+
+
+def _throughput(timings, statuses, elapsed, concurrency):
+    return {
+        "requests": len(timings),
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "per_second": round(len(timings) / elapsed, 1) if elapsed else None,
+        "p50_ms": round(percentile(timings, 50) or 0, 2),
+        "p95_ms": round(percentile(timings, 95) or 0, 2),
+        "max_ms": round(max(timings, default=0), 2),
+        "status_codes": sorted(set(statuses)),
+    }
+
+
+def _load_wsgi(user, url, concurrency, total, clients=None):
+    """``total`` GETs through the WSGI handler from ``concurrency`` threads.
+
+    Each thread has its own client and database connection, like the
+    workers of a threaded WSGI server. Pass logged-in, warmed up
+    ``clients`` to use those instead.
+    """
+    if clients is None:
+        clients = [_client_for(user) for _ in range(concurrency)]
+        for client in clients:
+            client.get(url)  # warm up
+    counter = itertools.count()
+
+    def worker(client):
+        timings, statuses = [], []
+        try:
+            while next(counter) < total:
+                started = time.perf_counter()
+                statuses.append(client.get(url).status_code)
+                timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            connection.close()
+        return timings, statuses
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(worker, clients))
+    elapsed = time.perf_counter() - started
+    timings = [value for result in results for value in result[0]]
+    statuses = [value for result in results for value in result[1]]
+    return _throughput(timings, statuses, elapsed, concurrency)
+
+
+async def _load_asgi(user, url, concurrency, total):
+    """``total`` GETs through the ASGI handler from ``concurrency`` tasks."""
+    clients = []
+    for _ in range(concurrency):
+        client = AsyncClient()
+        await client.aforce_login(user)
+        await client.get(url)  # warm up
+        clients.append(client)
+    counter = itertools.count()
+    timings, statuses = [], []
+
+    async def worker(client):
+        while next(counter) < total:
+            started = time.perf_counter()
+            statuses.append((await client.get(url)).status_code)
+            timings.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(client) for client in clients))
+    elapsed = time.perf_counter() - started
+    return _throughput(timings, statuses, elapsed, concurrency)
+
+
+def run_async_benchmark(scenarios=None, concurrency=16, total=200, cold=False):
+    """Compare WSGI and ASGI throughput of the pages with async views.
+
+    Both run in-process: the sync views through the WSGI handler from a pool
+    of threads, the async views (``Home.asgi_urls``) through the ASGI
+    handler from concurrent tasks on one event loop. ``cold`` clears the
+    cache first so the pages are built from the database.
+    """
+    users = pick_users()
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "students": Student.objects.count(),
+            "concurrency": concurrency,
+            "requests": total,
+            "cold_cache": cold,
+        },
+        "scenarios": {},
+    }
+    with override_settings(ALLOWED_HOSTS=["testserver"]):
+        for name in scenarios or ASYNC_SCENARIOS:
+            role, url_name = ASYNC_SCENARIOS[name]
+            user = users.get(role)
+            if user is None:
+                report["scenarios"][name] = {
+                    "error": f"no {role} user found; run generate_school --users"
+                }
+                continue
+            url = reverse(url_name)
+            if cold:
+                cache.clear()
+            wsgi = _load_wsgi(user, url, concurrency, total)
+            if cold:
+                cache.clear()
+            with override_settings(ROOT_URLCONF="Home.asgi_urls"):
+                asgi = asyncio.run(_load_asgi(user, url, concurrency, total))
+            report["scenarios"][name] = {
+                "wsgi": wsgi,
+                "asgi": asgi,
+                "asgi_vs_wsgi": (
+                    round(asgi["per_second"] / wsgi["per_second"], 2)
+                    if asgi["per_second"] and wsgi["per_second"]
+                    else None
+                ),
+            }
+    return report
+
+
+def _stress_worker(kind, mark_ids, deadline, results, stop=None):
+    """Run reads or mark saves until ``deadline`` (or ``stop`` is set).
+
+    Puts ``(kind, timings, errors, done)`` on ``results``.
+    """
+    import random
+
+    from django.db import OperationalError, transaction
+
+    rng = random.Random()
+    timings, errors, done = [], 0, 0
+    while time.perf_counter() < deadline and not (stop and stop.is_set()):
+        mark_id = rng.choice(mark_ids)
+        started = time.perf_counter()
+        try:
+            if kind == "writer":
+                with transaction.atomic():
+                    mark = Mark.objects.get(pk=mark_id)
+                    mark.score = rng.randint(0, mark.max_score)
+                    mark.save()  # also refreshes the summaries via signals
+            else:
+                student_id = (
+                    Mark.objects.filter(pk=mark_id)
+                    .values_list("student_id", flat=True)
+                    .first()
+                )
+                list(Mark.objects.filter(student_id=student_id).values())
+            done += 1
+        except OperationalError:
+            errors += 1
+        timings.append((time.perf_counter() - started) * 1000)
+    connection.close()
+    results.put((kind, timings, errors, done))
+
+
+def run_db_stress(writers=4, readers=8, duration=10.0, db_options=None):
+    """Hammer the database with concurrent mark saves and result reads.
+
+    Each worker is a separate process with its own connection, so the
+    database locks rather than the GIL decide who waits. ``db_options``
+    replaces the database ``OPTIONS`` for the run (e.g. SQLite's defaults as
+    a baseline). Returns per-kind throughput,
+    latency percentiles and the number of "database is locked" errors.
+    """
+    import multiprocessing
+
+    from django.db import connections
+
+    options = connections.settings[connection.alias].setdefault("OPTIONS", {})
+    saved = dict(options)
+    if db_options is not None:
+        options.clear()
+        options.update(db_options)
+    mark_ids = list(Mark.objects.values_list("pk", flat=True)[:5000])
+    if not mark_ids:
+        raise ValueError("No marks to work on; run generate_school first.")
+
+    journal_mode = None
+    stats = {}
+    try:
+        connections.close_all()
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA journal_mode")
+                journal_mode = cursor.fetchone()[0]
+        # Forked children must not share the parent's open connection.
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+        deadline = time.perf_counter() + duration
+        workers = [
+            context.Process(
+                target=_stress_worker, args=(kind, mark_ids, deadline, results)
+            )
+            for kind in ["writer"] * writers + ["reader"] * readers
+        ]
+        for worker in workers:
+            worker.start()
+        for _ in workers:
+            kind, timings, errors, done = results.get()
+            entry = stats.setdefault(kind, {"timings": [], "errors": 0, "done": 0})
+            entry["timings"].extend(timings)
+            entry["errors"] += errors
+            entry["done"] += done
+        for worker in workers:
+            worker.join()
+    finally:
+        options.clear()
+        options.update(saved)
+        connections.close_all()
+
+    report = {"journal_mode": journal_mode, "duration_s": duration}
+    for kind in ("writer", "reader"):
+        if kind not in stats:
+            continue
+        timings = stats[kind]["timings"]
+        report[f"{kind}s"] = {
+            "processes": writers if kind == "writer" else readers,
+            "ok": stats[kind]["done"],
+            "errors": stats[kind]["errors"],
+            "per_second": round(stats[kind]["done"] / duration, 1),
+            "p50_ms": round(percentile(timings, 50) or 0, 2),
+            "p95_ms": round(percentile(timings, 95) or 0, 2),
+            "max_ms": round(max(timings, default=0), 2),
+        }
+    return report
+
+
+# Session engines compared by run_session_benchmark, see Home/settings.py.
+SESSION_ENGINES = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+
+
+def _count_queries(client, url):
+    with QueryRecorder() as recorder:
+        client.get(url)
+    return recorder.count, sum("django_session" in sql for sql, _ in recorder.queries)
+
+
+def run_session_benchmark(
+    engines=None, scenarios=None, concurrency=8, total=200, writers=0
+):
+    """Compare page latency under each session engine in ``engines``.
+
+    Each scenario of :data:`ASYNC_SCENARIOS` (the dashboards and results
+    page) is loaded like ``run_async_benchmark`` loads the WSGI views, once
+    per engine, while ``writers`` separate processes keep saving marks as on
+    results day. Reports throughput, latency percentiles, SQL queries per
+    request (and how many of them touch ``django_session``) and the mark
+    writers' "database is locked" errors.
+    """
+    import multiprocessing
+
+    from django.db import connections
+
+    users = pick_users()
+    mark_ids = list(Mark.objects.values_list("pk", flat=True)[:5000])
+    if writers and not mark_ids:
+        raise ValueError("No marks to work on; run generate_school first.")
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "students": Student.objects.count(),
+            "concurrency": concurrency,
+            "requests": total,
+            "mark_writers": writers,
+        },
+        "engines": {},
+    }
+    context = multiprocessing.get_context("fork")
+    for engine in engines or SESSION_ENGINES:
+        results = {}
+        with override_settings(
+            ALLOWED_HOSTS=["testserver"], SESSION_ENGINE=SESSION_ENGINES[engine]
+        ):
+            for name in scenarios or ASYNC_SCENARIOS:
+                role, url_name = ASYNC_SCENARIOS[name]
+                user = users.get(role)
+                if user is None:
+                    results[name] = {
+                        "error": f"no {role} user found; run generate_school --users"
+                    }
+                    continue
+                url = reverse(url_name)
+                # Log in and warm up before the writers start. A request that
+                # still hits "database is locked" is reported as a 500.
+                clients = []
+                for _ in range(concurrency):
+                    client = Client(raise_request_exception=False)
+                    client.force_login(user)
+                    client.get(url)  # the first request may write the session
+                    clients.append(client)
+                queries, session_queries = _count_queries(clients[0], url)
+
+                # Forked children must not share the parent's open connection.
+                connections.close_all()
+                stop = context.Event()
+                queue = context.Queue()
+                processes = [
+                    context.Process(
+                        target=_stress_worker,
+                        args=("writer", mark_ids, float("inf"), queue, stop),
+                    )
+                    for _ in range(writers)
+                ]
+                for process in processes:
+                    process.start()
+                try:
+                    load = _load_wsgi(user, url, concurrency, total, clients)
+                finally:
+                    stop.set()
+                    writes = [queue.get() for _ in processes]
+                    for process in processes:
+                        process.join()
+                load["queries"] = queries
+                load["session_queries"] = session_queries
+                if writers:
+                    load["mark_writes"] = sum(write[3] for write in writes)
+                    load["mark_write_errors"] = sum(write[2] for write in writes)
+                results[name] = load
+        report["engines"][engine] = results
+    return report
+
+
+def run_login_flood(
+    duration=10.0, threads=8, rate=20.0, ips=50, emails=1000, limits=None
+):
+    """Flood the login form with bad credentials, with and without throttling.
+
+    ``threads`` clients post wrong passwords for ``duration`` seconds per
+    run, ``rate`` attempts per second between them (as fast as they can
+    once the server falls behind), spread over ``ips`` client addresses and
+    ``emails`` accounts like a credential-stuffing burst. Attempts beyond
+    what the server answers in time queue up, as on a real worker pool, and
+    show in the latency. The first run has the login throttle off,
+    the second uses ``limits`` (default: ``LOGIN_RATE_LIMITS``). Reports the
+    attempts that reached password hashing (200) or were refused (429) and
+    the CPU the process spent, as seconds of CPU per second of wall time.
+    """
+    import random
+    import threading
+
+    from django.conf import settings
+
+    from home_auth.ratelimit import reset_store
+
+    url = reverse("login")
+    runs = {
+        "unthrottled": {},
+        "throttled": limits if limits is not None else settings.LOGIN_RATE_LIMITS,
+    }
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "duration_s": duration,
+            "threads": threads,
+            "offered_per_second": rate,
+            "ips": ips,
+            "emails": emails,
+        },
+        "runs": {},
+    }
+    for name, run_limits in runs.items():
+        reset_store()
+        begin = time.perf_counter()
+        deadline = begin + duration
+        timings, statuses = [], []
+        lock = threading.Lock()
+        slots = itertools.count()
+
+        def worker():
+            client = Client()
+            rng = random.Random()
+            try:
+                while True:
+                    # The next attempt of the shared schedule.
+                    due = begin + next(slots) / rate
+                    if due >= deadline:
+                        break
+                    time.sleep(max(due - time.perf_counter(), 0))
+                    data = {
+                        "email": f"flood-{rng.randrange(emails)}@school.test",
+                        "password": "wrong-password",
+                    }
+                    ip = rng.randrange(ips)
+                    started = time.perf_counter()
+                    response = client.post(
+                        url, data, REMOTE_ADDR=f"10.0.{ip // 256}.{ip % 256}"
+                    )
+                    with lock:
+                        timings.append((time.perf_counter() - started) * 1000)
+                        statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        with override_settings(
+            ALLOWED_HOSTS=["testserver"], LOGIN_RATE_LIMITS=run_limits
+        ):
+            cpu_started = time.process_time()
+            pool = [threading.Thread(target=worker) for _ in range(threads)]
+            for thread in pool:
+                thread.start()
+            for thread in pool:
+                thread.join()
+            elapsed = time.perf_counter() - begin
+            cpu = time.process_time() - cpu_started
+        hashed = statuses.count(200)
+        report["runs"][name] = {
+            "attempts": len(statuses),
+            "hashed": hashed,
+            "refused": statuses.count(429),
+            "hashed_per_second": round(hashed / elapsed, 1),
+            "cpu_seconds": round(cpu, 2),
+            "cpu_per_second": round(cpu / elapsed, 2),
+            "p50_ms": round(percentile(timings, 50) or 0, 2),
+            "p95_ms": round(percentile(timings, 95) or 0, 2),
+            "status_codes": sorted(set(statuses)),
+        }
+    reset_store()
+    return report
@@ -0,0 +1,39 @@
+"""System checks for deployment settings the caching relies on."""
+
+from django.conf import settings
+from django.core.checks import Error, register
+
+LOCMEM_BACKEND = "django.core.cache.backends.locmem.LocMemCache"
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """Per-process caches must not be used with several worker processes.
+
+    Cached results, grids, dashboards and user contexts are invalidated by
+    bumping version stamps in the default cache. With a local memory cache
+    each worker has its own stamps, so the workers that did not handle the
+    edit keep serving the old data. The same goes for sessions kept in a
+    cache: another worker would still accept a session after logout.
+    """
+    workers = getattr(settings, "WEB_WORKERS", 1)
+    aliases = ["default"]
+    if settings.SESSION_ENGINE.endswith((".cache", ".cached_db")):
+        aliases.append(settings.SESSION_CACHE_ALIAS)
+    errors = []
+    for alias in dict.fromkeys(aliases):
+        backend = settings.CACHES.get(alias, {}).get("BACKEND")
+        if workers > 1 and backend == LOCMEM_BACKEND:
+            errors.append(
+                Error(
+                    f"The {alias} cache is local memory but WEB_WORKERS is "
+                    f"{workers}.",
+                    hint=(
+                        "Set DJANGO_CACHE_DIR (or configure a shared cache such "
+                        "as Redis or Memcached) so cache invalidation reaches "
+                        "every worker."
+                    ),
+                    id="student.E001",
+                )
+            )
+    return errors
@@ -0,0 +1,261 @@
+"""Precomputed student dashboard payload.
+
+Students land on the dashboard after every login, so everything it shows
+(cards, best subjects, performance trends, learning history, calendar and
+the monthly activity chart) is built by :func:`build_dashboard` from three
+queries (marks, assignments, department subjects) and cached per student
+as a JSON blob. :func:`aget_dashboard` is the same for the async view (its
+queries still run one after another, see student/asyncqueries.py).
+
+The cache key carries a version stamp per student, bumped by the mark,
+assignment and submission signals, one per department, bumped when an
+assignment targeting the department changes, and a school-wide stamp for
+subject and exam changes. It also carries the date, since assignment
+statuses depend on it. The view passes ``dashboard_version`` so the chart
+sections can be cached as fragments under the same key::
+
+    {% load cache %}
+    {% cache 3600 dashboard_trends student.pk dashboard_version %}...{% endcache %}
+"""
+
+import asyncio
+import json
+import time
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .asyncqueries import fetch_all
+from .models import Assignment, Subject
+
+DASHBOARD_CACHE_TIMEOUT = 60 * 60
+CALENDAR_PALETTE = ["blue", "violet", "red", "orange", "green", "indigo"]
+EMPTY_ACTIVITY = (["Jan", "Feb", "Mar", "Apr", "May", "Jun"], [0, 0, 0, 0, 0, 0])
+HISTORY_STATUS = {
+    Assignment.PENDING: "In Progress",
+    Assignment.OVERDUE: "Overdue",
+    Assignment.SUBMITTED: "Completed",
+    Assignment.GRADED: "Completed",
+}
+
+
+def _stamp(scope):
+    return cache.get_or_set(f"dashboard-version:{scope}", time.time_ns, None)
+
+
+async def _astamp(scope):
+    return await cache.aget_or_set(f"dashboard-version:{scope}", time.time_ns, None)
+
+
+def _scopes(student):
+    return ("all", f"department-{student.department_id}", student.pk)
+
+
+def dashboard_version(student):
+    """Return the version string of a student's cached dashboard."""
+    today = timezone.localdate().isoformat()
+    stamps = [_stamp(scope) for scope in _scopes(student)]
+    return "-".join(map(str, [*stamps, today]))
+
+
+async def adashboard_version(student):
+    """Async :func:`dashboard_version`."""
+    today = timezone.localdate().isoformat()
+    stamps = await asyncio.gather(*(_astamp(scope) for scope in _scopes(student)))
+    return "-".join(map(str, [*stamps, today]))
+
+
+def invalidate_dashboard(student_ids=None):
+    """Drop the cached dashboards of ``student_ids``, or of everyone if None."""
+    scopes = ["all"] if student_ids is None else set(student_ids)
+    now = time.time_ns()
+    cache.set_many({f"dashboard-version:{scope}": now for scope in scopes}, None)
+
+
+def invalidate_department_dashboards(department_ids):
+    """Drop the cached dashboards of every student in ``department_ids``.
+
+    A None department stands for all of them.
+    """
+    department_ids = set(department_ids)
+    if None in department_ids:
+        invalidate_dashboard()
+        return
+    now = time.time_ns()
+    cache.set_many(
+        {f"dashboard-version:department-{pk}": now for pk in department_ids}, None
+    )
+
+
+def subject_values(marks):
+    """``marks`` must be ordered by ``updated_at`` (oldest first)."""
+    trend = [
+        {
+            "label": mark.exam.name
+            or (mark.updated_at.strftime("%b %d") if mark.updated_at else "Exam"),
+            "score": round(mark.score / mark.max_score * 100, 2),
+        }
+        for mark in marks
+        if mark.max_score
+    ]
+    scores = [point["score"] for point in trend]
+    return {
+        "exam_count": len(scores),
+        "average_percent": round(sum(scores) / len(scores), 2) if scores else None,
+        "latest_percent": scores[-1] if scores else None,
+        "trend": trend,
+    }
+
+
+def _history(assignments, marks):
+    entries = [
+        {
+            "label": due_date.strftime("%b %d, %I%p") if due_date else "No due date",
+            "title": title,
+            "status": HISTORY_STATUS[status],
+        }
+        for title, due_date, status in assignments[:5]
+    ]
+    for mark in sorted(marks, key=lambda mark: mark.updated_at, reverse=True)[:5]:
+        entries.append(
+            {
+                "label": timezone.localtime(mark.updated_at).strftime(
+                    "%b %d, %I:%M %p"
+                ),
+                "title": f"{mark.subject.name} ({mark.exam.name})",
+                "status": f"{mark.score}/{mark.max_score}",
+            }
+        )
+    return entries[:5]
+
+
+def _monthly_activity(marks):
+    """Average mark percentage of the last six months with marks."""
+    months = defaultdict(list)
+    for mark in marks:
+        if mark.max_score:
+            month = timezone.localtime(mark.updated_at).date().replace(day=1)
+            months[month].append(mark.score * 100.0 / mark.max_score)
+    recent = sorted(months)[-6:]
+    if not recent:
+        return EMPTY_ACTIVITY
+    labels = [month.strftime("%b") for month in recent]
+    scores = [round(sum(months[m]) / len(months[m]), 2) for m in recent]
+    return labels, scores
+
+
+def _dashboard_queries(student):
+    """The three independent querysets a dashboard is built from."""
+    marks = student.marks.select_related("subject", "exam").order_by("updated_at", "pk")
+    assignments = (
+        Assignment.objects.inbox(student)
+        .order_by("due_key", "pk")
+        .values_list("title", "due_date", "status")
+    )
+    subjects = Subject.objects.filter(
+        department_id=student.department_id, is_approved=True
+    )
+    if not student.department_id:
+        subjects = subjects.none()
+    return marks, assignments, subjects
+
+
+def build_dashboard(student):
+    """Return the JSON-serialisable dashboard payload of a student."""
+    marks, assignments, subjects = _dashboard_queries(student)
+    return _payload(list(marks), list(assignments), subjects.count())
+
+
+async def abuild_dashboard(student):
+    """Async :func:`build_dashboard`."""
+    marks, assignments, subjects = _dashboard_queries(student)
+    return _payload(*await fetch_all(marks, assignments, subjects.acount()))
+
+
+def _payload(marks, assignments, subject_count):
+    counts = Counter(status for _, _, status in assignments)
+    open_assignments = [row for row in assignments if row[2] == Assignment.PENDING]
+
+    by_subject = defaultdict(list)
+    for mark in marks:
+        by_subject[mark.subject.name].append(mark)
+    subjects = [
+        {"subject": name, **subject_values(subject_marks)}
+        for name, subject_marks in sorted(by_subject.items())
+    ]
+    scored = [subject for subject in subjects if subject["exam_count"]]
+    best = sorted(scored, key=lambda s: s["average_percent"], reverse=True)[:2]
+    labels, scores = _monthly_activity(marks)
+
+    return {
+        "student_cards": {
+            "subjects": subject_count,
+            "assignments": len(assignments),
+            "assignments_pending": counts[Assignment.PENDING],
+            "assignments_overdue": counts[Assignment.OVERDUE],
+            "assignments_submitted": (
+                counts[Assignment.SUBMITTED] + counts[Assignment.GRADED]
+            ),
+            "tests_attended": len(marks),
+            "tests_passed": sum(
+                1
+                for mark in marks
+                if mark.max_score and mark.score >= 0.5 * mark.max_score
+            ),
+        },
+        # Best two subjects populate the "Today's Lesson" widgets
+        "lessons_today": [
+            {
+                "title": subject["subject"],
+                "progress": round(subject["average_percent"], 1),
+                "lessons": subject["exam_count"],
+                "minutes": subject["exam_count"] * 45,
+                "assignments": subject["exam_count"],
+            }
+            for subject in best
+        ],
+        "performance_trends": [
+            {
+                "subject": subject["subject"],
+                "labels": [point["label"] for point in subject["trend"]],
+                "scores": [point["score"] for point in subject["trend"]],
+                "latest_score": subject["latest_percent"] or 0,
+            }
+            for subject in scored
+        ],
+        "learning_history": _history(assignments, marks),
+        # Assignments still to hand in, soonest due first.
+        "calendar_events": [
+            {
+                "title": title,
+                "time_range": due_date.strftime("%b %d") if due_date else "TBD",
+                "color": CALENDAR_PALETTE[index % len(CALENDAR_PALETTE)],
+            }
+            for index, (title, due_date, _) in enumerate(open_assignments[:4])
+        ],
+        "learning_activity_labels": labels,
+        "learning_activity_scores": scores,
+    }
+
+
+def get_dashboard(student):
+    """Return ``(payload, version)``, building the payload on a cache miss."""
+    version = dashboard_version(student)
+    key = f"dashboard:{student.pk}:{version}"
+    blob = cache.get(key)
+    if blob is None:
+        blob = json.dumps(build_dashboard(student))
+        cache.set(key, blob, DASHBOARD_CACHE_TIMEOUT)
+    return json.loads(blob), version
+
+
+async def aget_dashboard(student):
+    """Async :func:`get_dashboard`."""
+    version = await adashboard_version(student)
+    key = f"dashboard:{student.pk}:{version}"
+    blob = await cache.aget(key)
+    if blob is None:
+        blob = json.dumps(await abuild_dashboard(student))
+        await cache.aset(key, blob, DASHBOARD_CACHE_TIMEOUT)
+    return json.loads(blob), version
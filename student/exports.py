@@ -0,0 +1,189 @@
+"""Streaming CSV and Excel exports of rosters, mark sheets and results.
+
+Rows are produced by generators over ``.iterator(chunk_size=...)`` querysets
+and written straight into a ``StreamingHttpResponse``, so an export holds one
+chunk of rows in memory however many students or marks it covers.
+
+An .xlsx file is a zip archive and cannot be sent before it is complete, so
+:func:`xlsx_response` writes the rows through an openpyxl write-only
+workbook, which spools each row to a temporary file as it arrives, and then
+streams the finished file from disk.
+
+Mark sheets are pivoted with one column per subject. The marks are read
+ordered by student (and exam), so each output row is complete as soon as the
+next student starts and only that student's marks are ever kept.
+"""
+
+import csv
+import tempfile
+from itertools import groupby
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .grading import get_grade_bands, letter_grade, percent
+from .models import Mark, Student, Subject
+
+# Rows fetched from the database per round trip.
+CHUNK_SIZE = 2000
+EXPORT_FORMATS = ("csv", "xlsx")
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+ROSTER_COLUMNS = [
+    ("Student ID", "student_id"),
+    ("Admission number", "admission_number"),
+    ("First name", "first_name"),
+    ("Last name", "last_name"),
+    ("Gender", "gender"),
+    ("Date of birth", "date_of_birth"),
+    ("Class", "student_class"),
+    ("Section", "section"),
+    ("Joining date", "joining_date"),
+    ("Mobile", "mobile_number"),
+    ("Department", "department__name"),
+    ("Father", "parent__father_name"),
+    ("Father mobile", "parent__father_mobile"),
+    ("Father email", "parent__father_email"),
+    ("Mother", "parent__mother_name"),
+    ("Mother mobile", "parent__mother_mobile"),
+    ("Mother email", "parent__mother_email"),
+    ("Address", "parent__present_address"),
+]
+
+
+class _Echo:
+    """File-like object whose ``write`` hands the line back to csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def csv_response(rows, filename):
+    """Stream ``rows`` (an iterable of lists) as a CSV attachment.
+
+    The file starts with a UTF-8 byte order mark so Excel detects the
+    encoding of non-ASCII names.
+    """
+    writer = csv.writer(_Echo())
+
+    def content():
+        yield "\ufeff"
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(content(), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{_name(filename)}.csv"'
+    return response
+
+
+def xlsx_response(rows, filename):
+    """Stream ``rows`` as a single-sheet .xlsx attachment (requires openpyxl)."""
+    try:
+        from openpyxl import Workbook
+    except ImportError as exc:
+        raise ImportError("Writing .xlsx files requires the openpyxl package.") from exc
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=(slugify(filename) or "export")[:31])
+    for row in rows:
+        sheet.append(row)
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    # FileResponse closes (and so deletes) the file once it has been sent.
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=f"{_name(filename)}.xlsx",
+        content_type=XLSX_CONTENT_TYPE,
+    )
+
+
+def export_response(rows, filename, file_format="csv"):
+    """Stream ``rows`` as ``file_format``, one of :data:`EXPORT_FORMATS`."""
+    if file_format == "xlsx":
+        return xlsx_response(rows, filename)
+    return csv_response(rows, filename)
+
+
+def _name(filename):
+    return f"{slugify(filename) or 'export'}-{timezone.localdate().isoformat()}"
+
+
+def roster_rows(students=None):
+    """Header plus one row per student, with parent and department."""
+    students = Student.objects.all() if students is None else students
+    yield [title for title, _ in ROSTER_COLUMNS]
+    fields = [field for _, field in ROSTER_COLUMNS]
+    rows = students.order_by("last_name", "first_name", "id").values_list(*fields)
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield ["" if value is None else value for value in row]
+
+
+def mark_sheet_rows(marks, subjects=None, by_exam=False):
+    """Header plus one row per student (per exam if ``by_exam``).
+
+    ``marks`` is a ``Mark`` queryset; each row has one score column per
+    subject followed by the total, percentage and grade of the row. The
+    subject columns default to the subjects present in ``marks``.
+    """
+    if subjects is None:
+        subjects = Subject.objects.filter(
+            pk__in=marks.order_by().values("subject_id")
+        ).order_by("name")
+    subjects = list(subjects.values_list("pk", "name"))
+    column = {pk: index for index, (pk, _) in enumerate(subjects)}
+    bands = get_grade_bands()
+
+    header = ["Student ID", "First name", "Last name", "Class", "Section"]
+    if by_exam:
+        header.append("Exam")
+    yield header + [name for _, name in subjects] + ["Total", "Max", "%", "Grade"]
+
+    order = ["student_id", "exam_id"] if by_exam else ["student_id"]
+    rows = marks.order_by(*order).values_list(
+        "student_id",
+        "exam_id",
+        "student__student_id",
+        "student__first_name",
+        "student__last_name",
+        "student__student_class",
+        "student__section",
+        "exam__name",
+        "subject_id",
+        "score",
+        "max_score",
+    )
+    key = (lambda row: (row[0], row[1])) if by_exam else (lambda row: row[0])
+    for _, group in groupby(rows.iterator(chunk_size=CHUNK_SIZE), key=key):
+        scores = [""] * len(subjects)
+        total = max_total = 0
+        for row in group:
+            index = column.get(row[8])
+            if index is None:
+                continue
+            scores[index] = row[9]
+            total += row[9]
+            max_total += row[10]
+        line = list(row[2:7])
+        if by_exam:
+            line.append(row[7])
+        value = percent(total, max_total)
+        grade = letter_grade(value, bands) or ""
+        yield line + scores + [total, max_total, "" if value is None else value, grade]
+
+
+def exam_mark_sheet(exam, department=None):
+    """Rows of the mark sheet of one exam, optionally for one department."""
+    marks = Mark.objects.filter(exam=exam)
+    if department is not None:
+        marks = marks.filter(student__department=department)
+    return mark_sheet_rows(marks)
+
+
+def department_results(department):
+    """Rows of every exam result of the students in ``department``."""
+    return mark_sheet_rows(
+        Mark.objects.filter(student__department=department), by_exam=True
+    )
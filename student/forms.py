@@ -1,12 +1,12 @@
 from django import forms
 from .models import Mark
-from .models import Assignment, Student
+from .models import Assignment, Parent, Student
 
 
 class MarkForm(forms.ModelForm):
     class Meta:
         model = Mark
-        fields = ["subject", "exam_name", "score", "max_score"]
+        fields = ["subject", "exam", "score", "max_score"]
 
     def clean(self):
         cleaned = super().clean()
@@ -91,9 +91,102 @@ class AssignmentForm(forms.ModelForm):
 
 
 class AssignmentAssignForm(forms.Form):
+    """Who an assignment is for: picked students, or a whole group.
+
+    Groups are stored as an ``AssignmentTarget`` and matched when read, so
+    a department-wide assignment does not validate or write every student.
+    """
+
+    STUDENTS = "students"
+    DEPARTMENT = "department"
+    CLASS = "class"
+    TARGET_CHOICES = [
+        (STUDENTS, "Selected students"),
+        (DEPARTMENT, "The whole department"),
+        (CLASS, "A class (and section) of the department"),
+    ]
+
+    target = forms.ChoiceField(choices=TARGET_CHOICES, required=False)
+    student_class = forms.CharField(max_length=100, required=False)
+    section = forms.CharField(max_length=15, required=False)
     students = forms.ModelMultipleChoiceField(
         queryset=Student.objects.none(),
         widget=forms.CheckboxSelectMultiple,
         required=False,
         label="Assign to students",
     )
+
+    def __init__(self, *args, department=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.department = department
+        if department is not None:
+            self.fields["students"].queryset = Student.objects.filter(
+                department=department
+            )
+
+    def clean(self):
+        cleaned = super().clean()
+        # Forms posted without a target only pick students.
+        target = cleaned.get("target") or self.STUDENTS
+        cleaned["target"] = target
+        if target != self.STUDENTS and self.department is None:
+            self.add_error("target", "You are not assigned to a department.")
+        if target == self.CLASS and not cleaned.get("student_class"):
+            self.add_error("student_class", "Choose the class to assign.")
+        return cleaned
+
+
+class StudentImportForm(forms.ModelForm):
+    """Validates the student columns of one admission import row."""
+
+    class Meta:
+        model = Student
+        fields = [
+            "first_name",
+            "last_name",
+            "student_id",
+            "gender",
+            "date_of_birth",
+            "student_class",
+            "religion",
+            "joining_date",
+            "mobile_number",
+            "admission_number",
+            "section",
+        ]
+
+    def validate_unique(self):
+        # Duplicates are checked once per chunk by the importer.
+        pass
+
+
+class ParentImportForm(forms.ModelForm):
+    """Validates the parent columns of one admission import row.
+
+    Only the parents' names are mandatory; imports from older registers
+    rarely carry occupations or e-mail addresses.
+    """
+
+    class Meta:
+        model = Parent
+        fields = [
+            "father_name",
+            "father_occupation",
+            "father_mobile",
+            "father_email",
+            "mother_name",
+            "mother_occupation",
+            "mother_mobile",
+            "mother_email",
+            "present_address",
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name, field in self.fields.items():
+            field.required = name in ("father_name", "mother_name")
+
+
+class StudentImportUploadForm(forms.Form):
+    file = forms.FileField(help_text="CSV or XLSX file with one student per row.")
+    batch_size = forms.IntegerField(min_value=1, max_value=5000, initial=500)
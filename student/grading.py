@@ -0,0 +1,103 @@
+"""Percentages and letter grades shared by results pages and summaries.
+
+Grade ladders are configured as ``GradingScale``/``GradeBand`` rows (admin
+editable); the scale marked ``is_default`` is used unless another one is
+named. ``GRADE_BOUNDARIES`` is only the fallback when no scale exists.
+
+Grades can be computed in Python (:func:`letter_grade`) or in SQL with
+:func:`grade_expression`, which ``Mark.objects.with_grades()`` uses so that
+graded rows come back from a single query.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.db.models import Case, CharField, F, FloatField, Value, When
+from django.db.models.functions import Cast, Round
+
+# (minimum percent, letter) from the top band down.
+GRADE_BOUNDARIES = [
+    (90, "A+"),
+    (80, "A"),
+    (70, "B"),
+    (60, "C"),
+    (50, "D"),
+    (0, "F"),
+]
+
+BANDS_CACHE_TIMEOUT = 60 * 60
+
+
+def invalidate_grade_bands():
+    cache.set("grading-bands-version", time.time_ns(), None)
+
+
+def get_grade_bands(scale_name=None):
+    """Return ``[(minimum percent, letter), ...]`` for a scale, top band first.
+
+    ``scale_name`` picks a scale by name; by default the ``is_default`` scale
+    is used. Results are cached until a scale or band changes.
+    """
+    version = cache.get_or_set("grading-bands-version", time.time_ns, None)
+    key = f"grading-bands:{version}:{scale_name or ''}"
+    bands = cache.get(key)
+    if bands is None:
+        from .models import GradeBand
+
+        rows = GradeBand.objects.order_by("-min_percent")
+        if scale_name:
+            rows = rows.filter(scale__name=scale_name)
+        else:
+            rows = rows.filter(scale__is_default=True)
+        bands = [(band.min_percent, band.letter) for band in rows] or list(
+            GRADE_BOUNDARIES
+        )
+        cache.set(key, bands, BANDS_CACHE_TIMEOUT)
+    return bands
+
+
+def percent(score, max_score):
+    """Return ``score`` as a percentage of ``max_score`` rounded to 2 places."""
+    if not max_score:
+        return None
+    return round(score * 100.0 / max_score, 2)
+
+
+def letter_grade(value, bands=None):
+    """Return the letter grade for a percentage, or None when unknown.
+
+    A percentage below every band gets the lowest band's letter.
+    """
+    if value is None:
+        return None
+    bands = bands if bands is not None else get_grade_bands()
+    for minimum, letter in bands:
+        if value >= minimum:
+            return letter
+    return bands[-1][1] if bands else None
+
+
+def percent_expression(score="score", max_score="max_score"):
+    """SQL equivalent of :func:`percent` (NULL when ``max_score`` is 0)."""
+    return Case(
+        When(**{max_score: 0}, then=Value(None, output_field=FloatField())),
+        default=Round(
+            Cast(F(score), FloatField()) * 100.0 / F(max_score), precision=2
+        ),
+        output_field=FloatField(),
+    )
+
+
+def grade_expression(percent_field, bands=None, default=None):
+    """SQL equivalent of :func:`letter_grade` for the percentage in
+    ``percent_field``; ``default`` is the value when it is NULL."""
+    bands = bands if bands is not None else get_grade_bands()
+    return Case(
+        When(**{f"{percent_field}__isnull": True}, then=Value(default)),
+        *[
+            When(**{f"{percent_field}__gte": minimum}, then=Value(letter))
+            for minimum, letter in bands
+        ],
+        default=Value(bands[-1][1] if bands else default),
+        output_field=CharField(),
+    )
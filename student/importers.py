@@ -0,0 +1,317 @@
+"""Bulk student admission import.
+
+Rows are read lazily from a CSV or XLSX file and processed in chunks: each
+chunk is validated with the import forms, parents are de-duplicated against
+the file and the database, slugs are worked out in memory and the new
+``Parent``/``Student`` rows are written with ``bulk_create`` inside one
+transaction per chunk. A failing chunk is rolled back on its own, earlier
+chunks stay committed.
+
+Column names follow the fields of the add-student form (``first_name``,
+``student_id``, ``father_name``, ...). ``department`` may hold a department
+name or code.
+"""
+
+import csv
+import io
+import time
+
+from django.db import DatabaseError, transaction
+
+from home_auth.usercontext import invalidate_user_context
+
+from .forms import ParentImportForm, StudentImportForm
+from .marks import invalidate_mark_grid
+from .models import Department, Parent, Student
+from .search import index_objects
+from .slugs import allocate_slugs, slug_base
+
+DEFAULT_BATCH_SIZE = 500
+
+PARENT_FIELDS = ParentImportForm._meta.fields
+STUDENT_FIELDS = StudentImportForm._meta.fields
+
+
+class ImportReport:
+    """Outcome of an import: counts, per-row errors and throughput."""
+
+    def __init__(self):
+        self.rows = 0
+        self.students_created = 0
+        self.parents_created = 0
+        self.parents_reused = 0  # rows linked to an already known parent
+        self.batches = 0
+        self.errors = []  # (row number, message)
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def add_error(self, row_number, message):
+        self.errors.append((row_number, message))
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return (
+            f"{self.rows} rows in {self.elapsed:.2f}s "
+            f"({self.rows_per_second:.0f} rows/s): "
+            f"{self.students_created} students created, "
+            f"{self.parents_created} parents created, "
+            f"{self.parents_reused} rows linked to existing parents, "
+            f"{len(self.errors)} rows rejected."
+        )
+
+
+def _clean(value):
+    if value is None:
+        return ""
+    return str(value).strip()
+
+
+def read_csv(fileobj):
+    """Yield one dict per CSV row; ``fileobj`` may be binary or text."""
+    if not isinstance(fileobj, io.TextIOBase):
+        fileobj = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    for row in csv.DictReader(fileobj):
+        yield {_clean(key).lower(): _clean(value) for key, value in row.items() if key}
+
+
+def read_xlsx(fileobj):
+    """Yield one dict per row of the first worksheet (requires openpyxl)."""
+    try:
+        from openpyxl import load_workbook
+    except ImportError as exc:
+        raise ImportError("Reading .xlsx files requires the openpyxl package.") from exc
+
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [_clean(cell).lower() for cell in next(rows, ())]
+        for values in rows:
+            if not any(value not in (None, "") for value in values):
+                continue
+            yield {
+                key: (
+                    value.date().isoformat()
+                    if hasattr(value, "date") and callable(value.date)
+                    else _clean(value)
+                )
+                for key, value in zip(header, values)
+                if key
+            }
+    finally:
+        workbook.close()
+
+
+def read_rows(fileobj, name=""):
+    """Pick a reader from the file name (``.xlsx`` or anything else as CSV)."""
+    if name.lower().endswith((".xlsx", ".xlsm")):
+        return read_xlsx(fileobj)
+    return read_csv(fileobj)
+
+
+def _parent_key(data):
+    return (
+        data["father_name"].lower(),
+        data["mother_name"].lower(),
+        data["father_mobile"],
+        data["mother_mobile"],
+    )
+
+
+class StudentImporter:
+    """Import students from an iterable of row dicts.
+
+    ``import_rows`` returns an :class:`ImportReport`. With ``dry_run`` rows
+    are validated and de-duplicated but nothing is written.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+        self.batch_size = max(int(batch_size), 1)
+        self.dry_run = dry_run
+        self.report = ImportReport()
+        self._parents = {}  # parent key -> Parent (saved or pending)
+        self._student_ids = set()
+        self._departments = {}
+        for department in Department.objects.all():
+            self._departments[department.name.lower()] = department
+            if department.code:
+                self._departments[department.code.lower()] = department
+
+    def import_rows(self, rows):
+        chunk = []
+        for row_number, row in enumerate(rows, start=2):  # row 1 is the header
+            self.report.rows += 1
+            chunk.append((row_number, row))
+            if len(chunk) >= self.batch_size:
+                self._process_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._process_chunk(chunk)
+        if self.report.students_created:
+            # bulk_create skips post_save, so refresh cached grids by hand.
+            invalidate_mark_grid(structure=True)
+            invalidate_user_context()
+        self.report.finish()
+        return self.report
+
+    def _validate(self, chunk):
+        valid = []
+        for row_number, row in chunk:
+            student_form = StudentImportForm(
+                {field: row.get(field, "") for field in STUDENT_FIELDS}
+            )
+            parent_data = {field: row.get(field, "") for field in PARENT_FIELDS}
+            parent_form = None
+            if any(parent_data.values()):
+                parent_form = ParentImportForm(parent_data)
+
+            errors = []
+            for form in (student_form, parent_form):
+                if form is not None and not form.is_valid():
+                    for field, messages in form.errors.items():
+                        errors.extend(f"{field}: {message}" for message in messages)
+
+            department = None
+            department_value = row.get("department", "")
+            if department_value:
+                department = self._departments.get(department_value.lower())
+                if department is None:
+                    errors.append(
+                        f"department: unknown department '{department_value}'"
+                    )
+
+            if errors:
+                self.report.add_error(row_number, "; ".join(errors))
+                continue
+            valid.append(
+                (
+                    row_number,
+                    student_form.cleaned_data,
+                    parent_form.cleaned_data if parent_form else None,
+                    department,
+                )
+            )
+        return valid
+
+    def _drop_duplicates(self, valid):
+        """Reject student IDs already present in the file or the database."""
+        ids = {data["student_id"] for _, data, _, _ in valid}
+        existing = set(
+            Student.objects.filter(student_id__in=ids).values_list(
+                "student_id", flat=True
+            )
+        )
+        kept = []
+        for entry in valid:
+            row_number, data = entry[0], entry[1]
+            student_id = data["student_id"]
+            if student_id in existing:
+                self.report.add_error(
+                    row_number, f"student_id: '{student_id}' already exists."
+                )
+            elif student_id in self._student_ids:
+                self.report.add_error(
+                    row_number, f"student_id: '{student_id}' repeated in the file."
+                )
+            else:
+                self._student_ids.add(student_id)
+                kept.append(entry)
+        return kept
+
+    def _resolve_parents(self, valid):
+        """Map each row to a Parent, reusing matches from the file or database.
+
+        Returns the parents that still have to be inserted.
+        """
+        unknown = {}
+        for _, _, parent_data, _ in valid:
+            if parent_data and _parent_key(parent_data) not in self._parents:
+                # The first row naming a parent supplies its details.
+                unknown.setdefault(_parent_key(parent_data), parent_data)
+        if unknown:
+            candidates = Parent.objects.filter(
+                father_mobile__in={key[2] for key in unknown},
+                mother_mobile__in={key[3] for key in unknown},
+            )
+            for parent in candidates:
+                key = (
+                    parent.father_name.lower(),
+                    parent.mother_name.lower(),
+                    parent.father_mobile,
+                    parent.mother_mobile,
+                )
+                if key in unknown and key not in self._parents:
+                    self._parents[key] = parent
+
+        new_parents = []
+        for key, parent_data in unknown.items():
+            if key not in self._parents:
+                parent = Parent(**parent_data)
+                self._parents[key] = parent
+                new_parents.append(parent)
+        return new_parents
+
+    def _process_chunk(self, chunk):
+        self.report.batches += 1
+        valid = self._drop_duplicates(self._validate(chunk))
+        if not valid:
+            return
+
+        parents_before = len(self._parents)
+        new_parents = self._resolve_parents(valid)
+        # Rows linked to a parent that existed before their row was read.
+        reused = sum(1 for *_, parent_data, _ in valid if parent_data) - len(
+            new_parents
+        )
+
+        students = []
+        for _, data, parent_data, department in valid:
+            student = Student(**data, department=department)
+            if parent_data:
+                student.parent = self._parents[_parent_key(parent_data)]
+            students.append(student)
+        bases = [
+            slug_base(student.first_name, student.student_id, "student")
+            for student in students
+        ]
+        for student, slug in zip(students, allocate_slugs(Student, bases)):
+            student.slug = slug
+
+        if self.dry_run:
+            self.report.parents_created += len(new_parents)
+            self.report.parents_reused += reused
+            self.report.students_created += len(students)
+            return
+
+        try:
+            with transaction.atomic():
+                Parent.objects.bulk_create(new_parents, batch_size=self.batch_size)
+                # parent_id is filled from the now-saved Parent instances.
+                Student.objects.bulk_create(students, batch_size=self.batch_size)
+                # bulk_create skips post_save, index the new rows here.
+                index_objects("student", students)
+        except DatabaseError as exc:
+            # Forget parents that were never committed so later chunks
+            # insert them again instead of linking to a missing row.
+            for key in list(self._parents)[parents_before:]:
+                del self._parents[key]
+            for student in students:
+                self._student_ids.discard(student.student_id)
+            for row_number, *_ in valid:
+                self.report.add_error(row_number, f"batch rolled back: {exc}")
+            return
+
+        self.report.parents_created += len(new_parents)
+        self.report.parents_reused += reused
+        self.report.students_created += len(students)
+
+
+def import_students(fileobj, name="", batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    """Import students from an uploaded or opened file and return the report."""
+    importer = StudentImporter(batch_size=batch_size, dry_run=dry_run)
+    return importer.import_rows(read_rows(fileobj, name))
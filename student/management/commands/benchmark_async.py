@@ -0,0 +1,59 @@
+"""
+Django management command to compare WSGI and ASGI throughput of the pages
+with async views under concurrent load.
+Usage: python manage.py benchmark_async [--concurrency 16] [--requests 200]
+       [--scenario student_dashboard] [--cold] [--output async.json]
+"""
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from student.benchmarks import ASYNC_SCENARIOS, run_async_benchmark
+
+
+class Command(BaseCommand):
+    help = "Reports requests per second and latency of the sync and async views"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int, default=16, help="Requests in flight"
+        )
+        parser.add_argument(
+            "--requests", type=int, default=200, help="Requests per scenario and server"
+        )
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=sorted(ASYNC_SCENARIOS),
+            help="Only run this scenario (may be repeated)",
+        )
+        parser.add_argument(
+            "--cold", action="store_true", help="Clear the cache before each run"
+        )
+        parser.add_argument("--output", help="Write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        report = run_async_benchmark(
+            scenarios=options["scenario"],
+            concurrency=max(options["concurrency"], 1),
+            total=max(options["requests"], 1),
+            cold=options["cold"],
+        )
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                fh.write(output + "\n")
+            for name, stats in report["scenarios"].items():
+                if "error" in stats:
+                    self.stdout.write(f"{name}: {stats['error']}")
+                    continue
+                self.stdout.write(
+                    f"{name}: WSGI {stats['wsgi']['per_second']}/s, "
+                    f"ASGI {stats['asgi']['per_second']}/s"
+                )
+            self.stdout.write(
+                self.style.SUCCESS(f"✓ Report written to {options['output']}")
+            )
+        else:
+            self.stdout.write(output)
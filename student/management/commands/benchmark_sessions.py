@@ -0,0 +1,74 @@
+"""
+Django management command to compare page latency under each session engine.
+Usage: python manage.py benchmark_sessions [--engine db] [--writers 2]
+       [--concurrency 8] [--requests 200] [--scenario student_dashboard]
+       [--output sessions.json]
+"""
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from student.benchmarks import (
+    ASYNC_SCENARIOS,
+    SESSION_ENGINES,
+    run_session_benchmark,
+)
+
+
+class Command(BaseCommand):
+    help = "Reports request latency with database, cached and cookie sessions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--engine",
+            action="append",
+            choices=sorted(SESSION_ENGINES),
+            help="Only use this session engine (may be repeated)",
+        )
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=sorted(ASYNC_SCENARIOS),
+            help="Only run this scenario (may be repeated)",
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=8, help="Requests in flight"
+        )
+        parser.add_argument(
+            "--requests", type=int, default=200, help="Requests per scenario and engine"
+        )
+        parser.add_argument(
+            "--writers",
+            type=int,
+            default=0,
+            help="Processes saving marks during the run",
+        )
+        parser.add_argument("--output", help="Write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        report = run_session_benchmark(
+            engines=options["engine"],
+            scenarios=options["scenario"],
+            concurrency=max(options["concurrency"], 1),
+            total=max(options["requests"], 1),
+            writers=max(options["writers"], 0),
+        )
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                fh.write(output + "\n")
+            for engine, scenarios in report["engines"].items():
+                for name, stats in scenarios.items():
+                    if "error" in stats:
+                        self.stdout.write(f"{engine} {name}: {stats['error']}")
+                        continue
+                    self.stdout.write(
+                        f"{engine} {name}: p50 {stats['p50_ms']}ms, "
+                        f"p95 {stats['p95_ms']}ms, {stats['per_second']}/s"
+                    )
+            self.stdout.write(
+                self.style.SUCCESS(f"✓ Report written to {options['output']}")
+            )
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,59 @@
+"""
+Django management command to fill the database with a synthetic school.
+Usage: python manage.py generate_school [--students 2000] [--teachers 40]
+       [--departments 4] [--subjects 6] [--exams 3] [--assignments 10]
+       [--users] [--password ...] [--prefix GEN] [--seed 0]
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from student.models import Department
+from student.synthetic import DEFAULT_PASSWORD, generate_school
+
+
+class Command(BaseCommand):
+    help = "Creates synthetic departments, teachers, students, marks and assignments"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--prefix", default="GEN", help="Prefix of every identifier"
+        )
+        parser.add_argument("--departments", type=int, default=4)
+        parser.add_argument(
+            "--subjects", type=int, default=6, help="Subjects per department"
+        )
+        parser.add_argument("--exams", type=int, default=3)
+        parser.add_argument("--teachers", type=int, default=40)
+        parser.add_argument("--students", type=int, default=2000)
+        parser.add_argument(
+            "--assignments", type=int, default=10, help="Assignments per department"
+        )
+        parser.add_argument(
+            "--users",
+            action="store_true",
+            help="Create a login for every teacher and student",
+        )
+        parser.add_argument("--password", default=DEFAULT_PASSWORD)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        prefix = options["prefix"]
+        if Department.objects.filter(code__startswith=f"{prefix}-").exists():
+            raise CommandError(
+                f"A school with prefix '{prefix}' already exists; pick another --prefix."
+            )
+        counts = generate_school(
+            prefix=prefix,
+            departments=max(options["departments"], 1),
+            subjects_per_department=max(options["subjects"], 0),
+            exams=max(options["exams"], 0),
+            teachers=max(options["teachers"], 0),
+            students=max(options["students"], 0),
+            assignments_per_department=max(options["assignments"], 0),
+            with_users=options["users"],
+            password=options["password"],
+            seed=options["seed"],
+            log=self.stdout.write,
+        )
+        summary = ", ".join(f"{count} {name}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"✓ Created {summary}."))
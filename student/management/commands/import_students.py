@@ -0,0 +1,58 @@
+"""
+Django management command to admit students in bulk from a CSV or XLSX file.
+Usage: python manage.py import_students admissions.csv [--batch-size 500] [--dry-run]
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from student.importers import DEFAULT_BATCH_SIZE, import_students
+
+
+class Command(BaseCommand):
+    help = "Imports students (and their parents) from a CSV or XLSX file in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or XLSX file with a header row")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Rows validated and committed per transaction",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Validate the file without writing anything",
+        )
+        parser.add_argument(
+            "--max-errors",
+            type=int,
+            default=50,
+            help="Number of row errors to print",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        try:
+            with open(path, "rb") as fileobj:
+                report = import_students(
+                    fileobj,
+                    name=path,
+                    batch_size=options["batch_size"],
+                    dry_run=options["dry_run"],
+                )
+        except (OSError, ImportError) as exc:
+            raise CommandError(str(exc)) from exc
+
+        for row_number, message in report.errors[: options["max_errors"]]:
+            self.stdout.write(self.style.WARNING(f"  Row {row_number}: {message}"))
+        if len(report.errors) > options["max_errors"]:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"  ... {len(report.errors) - options['max_errors']} more errors"
+                )
+            )
+
+        prefix = "Dry run: " if options["dry_run"] else ""
+        style = self.style.WARNING if report.errors else self.style.SUCCESS
+        self.stdout.write(style(prefix + report.summary()))
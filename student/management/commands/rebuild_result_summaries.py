@@ -0,0 +1,40 @@
+"""
+Django management command to rebuild the materialized result summaries.
+Usage: python manage.py rebuild_result_summaries [--batch-size 500]
+"""
+
+from django.core.management.base import BaseCommand
+
+from student.models import Student
+from student.rankings import deferred_refresh
+from student.summaries import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = "Recomputes the per-exam result summaries from marks"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of students rebuilt per transaction",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(options["batch_size"], 1)
+        student_ids = Student.objects.order_by("pk").values_list("pk", flat=True)
+        batch = []
+        done = 0
+        # Rankings are rebuilt once at the end, not after every batch.
+        with deferred_refresh():
+            for student_id in student_ids.iterator(chunk_size=batch_size):
+                batch.append(student_id)
+                if len(batch) >= batch_size:
+                    rebuild_summaries(batch)
+                    done += len(batch)
+                    batch = []
+            if batch:
+                rebuild_summaries(batch)
+                done += len(batch)
+        self.stdout.write(self.style.SUCCESS(f"✓ Rebuilt summaries for {done} students."))
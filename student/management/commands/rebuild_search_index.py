@@ -0,0 +1,36 @@
+"""
+Django management command to rebuild the student/teacher search index.
+Usage: python manage.py rebuild_search_index [--kind student|teacher]
+"""
+
+from django.core.management.base import BaseCommand
+
+from student.search import SEARCH_KINDS, fts_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Re-indexes students and teachers for the list and API searches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--kind",
+            choices=sorted(SEARCH_KINDS),
+            action="append",
+            help="Only rebuild this kind (may be repeated)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of records indexed per batch",
+        )
+
+    def handle(self, *args, **options):
+        counts = rebuild_index(
+            options["kind"], batch_size=max(options["batch_size"], 1)
+        )
+        backend = "FTS5" if fts_available() else "token table"
+        for kind, count in counts.items():
+            self.stdout.write(
+                self.style.SUCCESS(f"✓ Indexed {count} {kind} records ({backend}).")
+            )
@@ -0,0 +1,65 @@
+"""
+Django management command to rebuild the exam ranking snapshots.
+Usage: python manage.py refresh_rankings [--all] [--exam "Midterm"]
+       [--min-age 60] [--every 60]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from student.models import Exam
+from student.rankings import refresh_exam_rankings, refresh_stale_rankings
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes ranks and cohort statistics of exams a refresh after "
+        "commit left stale"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all", action="store_true", help="Rebuild every exam, stale or not"
+        )
+        parser.add_argument(
+            "--exam", action="append", help="Only this exam (may be repeated)"
+        )
+        parser.add_argument(
+            "--min-age",
+            type=float,
+            default=60,
+            help="Skip exams whose results changed less than this many seconds ago",
+        )
+        parser.add_argument(
+            "--every",
+            type=float,
+            help="Keep running, refreshing every this many seconds",
+        )
+
+    def handle(self, *args, **options):
+        exam_ids = None
+        if options["exam"]:
+            exams = Exam.objects.filter(name__in=options["exam"])
+            exam_ids = list(exams.values_list("pk", flat=True))
+            if len(exam_ids) != len(set(options["exam"])):
+                raise CommandError("Unknown exam name.")
+        if options["all"]:
+            exam_ids = exam_ids or list(Exam.objects.values_list("pk", flat=True))
+            for exam_id in exam_ids:
+                refresh_exam_rankings(exam_id)
+            self.stdout.write(
+                self.style.SUCCESS(f"✓ Refreshed rankings of {len(exam_ids)} exams.")
+            )
+            return
+        min_age = max(options["min_age"], 0)
+        while True:
+            refreshed = refresh_stale_rankings(exam_ids, min_age=min_age)
+            self.stdout.write(
+                self.style.SUCCESS(f"✓ Refreshed rankings of {len(refreshed)} exams.")
+            )
+            if not options["every"]:
+                return
+            close_old_connections()
+            time.sleep(max(options["every"], 1))
@@ -0,0 +1,60 @@
+"""
+Django management command to benchmark the main pages.
+Usage: python manage.py run_benchmarks [--iterations 20] [--scenario student_list]
+       [--cold] [--output bench.json]
+"""
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from student.benchmarks import SCENARIOS, run_benchmarks
+from student.synthetic import DEFAULT_PASSWORD
+
+
+class Command(BaseCommand):
+    help = "Reports p50/p95 latency, query counts and peak memory as JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=sorted(SCENARIOS),
+            help="Only run this scenario (may be repeated)",
+        )
+        parser.add_argument(
+            "--cold", action="store_true", help="Clear the cache before every request"
+        )
+        parser.add_argument(
+            "--password",
+            default=DEFAULT_PASSWORD,
+            help="Password of the generated users, for the login scenario",
+        )
+        parser.add_argument("--output", help="Write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        report = run_benchmarks(
+            scenarios=options["scenario"],
+            iterations=max(options["iterations"], 1),
+            warmup=max(options["warmup"], 0),
+            cold=options["cold"],
+            password=options["password"],
+        )
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                fh.write(output + "\n")
+            for name, stats in report["scenarios"].items():
+                line = (
+                    stats.get("error")
+                    or f"p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms, "
+                    f"{stats['queries']} queries, {stats['peak_memory_kb']} KB"
+                )
+                self.stdout.write(f"{name}: {line}")
+            self.stdout.write(
+                self.style.SUCCESS(f"✓ Report written to {options['output']}")
+            )
+        else:
+            self.stdout.write(output)
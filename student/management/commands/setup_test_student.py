@@ -5,7 +5,8 @@ Usage: python manage.py setup_test_student
 
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
-from student.models import Student, Mark
+from django.utils.text import slugify
+from student.models import Exam, Mark, Student, Subject
 
 # Get the user model (will be CustomUser based on AUTH_USER_MODEL setting)
 User = get_user_model()
@@ -115,10 +116,15 @@ class Command(BaseCommand):
 
         marks_created = 0
         for mark_data in marks_data:
+            subject, _ = Subject.objects.get_or_create(
+                name=mark_data["subject"],
+                defaults={"code": slugify(mark_data["subject"])[:20].upper()},
+            )
+            exam, _ = Exam.objects.get_or_create(name=mark_data["exam_name"])
             mark, created = Mark.objects.get_or_create(
                 student=student,
-                subject=mark_data["subject"],
-                exam_name=mark_data["exam_name"],
+                subject=subject,
+                exam=exam,
                 defaults={
                     "score": mark_data["score"],
                     "max_score": mark_data["max_score"],
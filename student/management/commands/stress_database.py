@@ -0,0 +1,49 @@
+"""
+Django management command to stress the database with concurrent writers
+and readers.
+Usage: python manage.py stress_database [--writers 4] [--readers 8]
+       [--duration 10] [--baseline]
+"""
+
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from student.benchmarks import run_db_stress
+
+# Django's SQLite defaults before the tuning profile: rollback journal, full
+# sync, deferred transactions and only the driver's 5 second lock timeout.
+BASELINE_OPTIONS = {
+    "init_command": "PRAGMA journal_mode=DELETE;PRAGMA synchronous=FULL"
+}
+
+
+class Command(BaseCommand):
+    help = "Runs concurrent mark saves and result reads and reports lock errors"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=4)
+        parser.add_argument("--readers", type=int, default=8)
+        parser.add_argument(
+            "--duration", type=float, default=10.0, help="Seconds per run"
+        )
+        parser.add_argument(
+            "--baseline",
+            action="store_true",
+            help="First run with Django's default SQLite setup for comparison",
+        )
+
+    def handle(self, *args, **options):
+        runs = {}
+        if options["baseline"] and connection.vendor == "sqlite":
+            runs["baseline"] = run_db_stress(
+                options["writers"],
+                options["readers"],
+                options["duration"],
+                db_options=BASELINE_OPTIONS,
+            )
+        runs["configured"] = run_db_stress(
+            options["writers"], options["readers"], options["duration"]
+        )
+        self.stdout.write(json.dumps(runs, indent=2))
@@ -0,0 +1,175 @@
+"""Mark-matrix helpers used by the teacher marks grid.
+
+The grid shows one row per student and one cell per approved subject. Marks
+are grouped once by ``(student_pk, subject_pk)`` so building a page is linear in
+the number of students, subjects and marks on that page. Built pages are kept
+in the cache per department and dropped whenever a mark, student or subject
+changes (see ``student.signals``).
+"""
+
+import time
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import transaction
+
+from .dashboard import invalidate_dashboard
+from .metrics import invalidate_department_metrics
+from .models import Mark, Student, Subject
+from .results import invalidate_results
+from .summaries import rebuild_summaries
+
+# Number of students shown per page of the marks grid.
+GRID_PAGE_SIZE = 50
+# Cached pages are also invalidated by signals, this is only an upper bound.
+GRID_CACHE_TIMEOUT = 60 * 15
+# Rows per INSERT statement when saving a whole matrix of marks.
+BULK_BATCH_SIZE = 500
+
+
+def _grid_version(scope):
+    return cache.get_or_set(f"mark-grid-version:{scope}", time.time_ns, None)
+
+
+def invalidate_mark_grid(department_id=None, structure=False):
+    """Drop cached grid pages affected by a change.
+
+    Mark changes only touch their department's grid and the school-wide one.
+    Pass ``structure=True`` when students or subjects change, since a student
+    moving between departments affects grids we can no longer identify.
+    """
+    scopes = ["all"]
+    if department_id is not None:
+        scopes.append(department_id)
+    if structure:
+        scopes.append("structure")
+    now = time.time_ns()
+    cache.set_many({f"mark-grid-version:{scope}": now for scope in scopes}, None)
+
+
+def build_mark_matrix(students, subjects, marks):
+    """Return grid rows for ``students`` x ``subjects`` from ``marks``.
+
+    Each row is ``{"student": ..., "subjects": [{"subject", "marks"}]}`` with
+    the marks of a cell ordered by exam name, matching what the
+    ``Teachers/teacher-marks.html`` template expects.
+    """
+    students = list(students)
+    subjects = list(subjects)
+    by_pk = {student.pk: student for student in students}
+
+    cells = defaultdict(list)
+    for mark in marks:
+        # Reuse the already loaded student instead of joining it per mark.
+        if mark.student_id in by_pk:
+            mark.student = by_pk[mark.student_id]
+        cells[(mark.student_id, mark.subject_id)].append(mark)
+
+    rows = []
+    for student in students:
+        student_subjects = []
+        for subject in subjects:
+            subject_marks = cells.get((student.pk, subject.pk), [])
+            subject_marks.sort(key=lambda mark: mark.exam.name)
+            student_subjects.append({"subject": subject, "marks": subject_marks})
+        rows.append({"student": student, "subjects": student_subjects})
+    return rows
+
+
+def grid_querysets(department=None, all_departments=False):
+    """Return the (students, subjects) querysets shown in the marks grid.
+
+    Admins pass ``all_departments=True`` to see the whole school; teachers
+    pass their department. Anything else yields an empty grid.
+    """
+    if all_departments:
+        students = Student.objects.select_related("department")
+        subjects = Subject.objects.filter(is_approved=True)
+    elif department is not None:
+        students = Student.objects.select_related("department").filter(
+            department=department
+        )
+        subjects = Subject.objects.filter(department=department, is_approved=True)
+    else:
+        return Student.objects.none(), Subject.objects.none()
+    return (
+        students.order_by("first_name", "last_name", "pk"),
+        subjects.order_by("name"),
+    )
+
+
+def get_mark_grid(department=None, all_departments=False, page_number=None):
+    """Return ``(page_obj, rows)`` for one page of the marks grid.
+
+    Only the marks of the students on the requested page are loaded, and the
+    built rows are cached per department and page until invalidated.
+    """
+    students, subjects = grid_querysets(department, all_departments)
+    page_obj = Paginator(students, GRID_PAGE_SIZE).get_page(page_number)
+    if not page_obj.paginator.count:
+        return page_obj, []
+
+    scope = "all" if all_departments else department.pk
+    cache_key = "mark-grid:{}:{}:{}:{}".format(
+        scope, _grid_version("structure"), _grid_version(scope), page_obj.number
+    )
+    rows = cache.get(cache_key)
+    if rows is None:
+        page_students = list(page_obj.object_list)
+        subjects = list(subjects)
+        marks = (
+            Mark.objects.filter(student__in=page_students, subject__in=subjects)
+            .select_related("exam", "updated_by")
+            .order_by("student", "subject", "exam__name")
+        )
+        rows = build_mark_matrix(page_students, subjects, marks)
+        cache.set(cache_key, rows, GRID_CACHE_TIMEOUT)
+    return page_obj, rows
+
+
+def save_mark_matrix(students, cells, exam, user):
+    """Insert or update a matrix of validated scores for one ``Exam``.
+
+    ``students`` maps student pk to ``Student``; ``cells`` is an iterable of
+    ``(student_pk, subject_pk, score, max_score)``. All rows are written by
+    ``bulk_create(update_conflicts=True)`` against the (student, subject,
+    exam) unique constraint inside one transaction, so either the whole
+    matrix is saved or nothing is. Returns the number of marks written.
+
+    Raises ``ValueError`` if a (student, subject) cell appears twice, since
+    one insert cannot update the same row twice.
+    """
+    marks = [
+        Mark(
+            student_id=student_pk,
+            subject_id=subject_pk,
+            exam=exam,
+            score=score,
+            max_score=max_score,
+            updated_by=user,
+        )
+        for student_pk, subject_pk, score, max_score in cells
+    ]
+    if not marks:
+        return 0
+    if len({(mark.student_id, mark.subject_id) for mark in marks}) < len(marks):
+        raise ValueError("Duplicate (student, subject) cells in the mark matrix.")
+
+    touched = {mark.student_id for mark in marks}
+    with transaction.atomic():
+        Mark.objects.bulk_create(
+            marks,
+            batch_size=BULK_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["student", "subject", "exam"],
+            update_fields=["score", "max_score", "updated_by", "updated_at"],
+        )
+        # bulk_create bypasses the Mark signals: refresh derived data here.
+        rebuild_summaries(touched)
+    invalidate_results(touched)
+    invalidate_dashboard(touched)
+    for department_id in {students[pk].department_id for pk in touched}:
+        invalidate_mark_grid(department_id)
+        invalidate_department_metrics(department_id)
+    return len(marks)
@@ -0,0 +1,221 @@
+"""Department metrics for the teacher dashboard.
+
+:func:`department_metrics` summarises a department (or the whole school)
+with a handful of grouped aggregate queries: student counts per class and
+section, marks entered and missing per subject and exam, class averages per
+exam, upcoming assignments and the latest mark edits with who made them.
+Teachers get this without loading the marks grid. The async view reads
+them through the async ORM (:func:`adepartment_metrics`); they still run
+one after another, see student/asyncqueries.py.
+
+Results are cached per department. The key carries a stamp per department,
+a school-wide stamp and the date (for "upcoming"). Mark and assignment
+changes bump their department's stamp; student, subject and exam changes
+bump the school-wide one, since a student moving between departments
+affects two departments we cannot identify afterwards.
+"""
+
+import asyncio
+import time
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db.models import Avg, Count, Q
+from django.utils import timezone
+
+from .asyncqueries import fetch_all
+from .grading import percent_expression
+from .models import Assignment, Exam, Mark, Student, StudentResultSummary, Subject
+
+METRICS_CACHE_TIMEOUT = 60 * 15
+UPCOMING_ASSIGNMENTS = 10
+RECENT_EDITS = 10
+
+
+def _stamp(scope):
+    return cache.get_or_set(f"metrics-version:{scope}", time.time_ns, None)
+
+
+async def _astamp(scope):
+    return await cache.aget_or_set(f"metrics-version:{scope}", time.time_ns, None)
+
+
+def invalidate_department_metrics(department_id=None, structure=False):
+    """Drop cached metrics of a department and of the school-wide view.
+
+    Pass ``structure=True`` when students, subjects or exams change.
+    """
+    scopes = ["all"]
+    if department_id is not None:
+        scopes.append(department_id)
+    if structure:
+        scopes.append("structure")
+    now = time.time_ns()
+    cache.set_many({f"metrics-version:{scope}": now for scope in scopes}, None)
+
+
+def _metrics_queries(department):
+    """The independent queries behind the metrics of ``department``."""
+    students = Student.objects.all()
+    marks = Mark.objects.all()
+    summaries = StudentResultSummary.objects.all()
+    assignments = Assignment.objects.all()
+    subjects = Subject.objects.filter(is_approved=True)
+    if department is not None:
+        students = students.filter(department=department)
+        marks = marks.filter(student__department=department)
+        summaries = summaries.filter(student__department=department)
+        assignments = assignments.filter(department=department)
+        subjects = subjects.filter(department=department)
+
+    return {
+        "classes": students.values("student_class", "section")
+        .annotate(students=Count("pk"))
+        .order_by("student_class", "section"),
+        "entered": marks.values("subject_id", "exam_id").annotate(
+            entered=Count("pk"), average=Avg(percent_expression())
+        ),
+        "exams": Exam.objects.filter(pk__in=marks.values("exam_id"))
+        .order_by("date", "name")
+        .values_list("pk", "name"),
+        # The department's subjects, plus any other subject it has marks in.
+        "subjects": Subject.objects.filter(
+            Q(pk__in=subjects) | Q(pk__in=marks.values("subject_id"))
+        )
+        .order_by("name")
+        .values_list("pk", "name"),
+        "class_averages": summaries.values(
+            "exam__name", "student__student_class", "student__section"
+        )
+        .annotate(average=Avg("percent"), students=Count("pk"))
+        .order_by("exam__name", "student__student_class", "student__section"),
+        "upcoming": assignments.filter(due_date__gte=timezone.localdate())
+        .with_student_counts()
+        .order_by("due_date", "pk")
+        .values("pk", "title", "due_date", "students")[:UPCOMING_ASSIGNMENTS],
+        "recent_edits": marks.order_by("-updated_at", "-pk").values(
+            "student__first_name",
+            "student__last_name",
+            "subject__name",
+            "exam__name",
+            "score",
+            "max_score",
+            "updated_by__username",
+            "updated_at",
+        )[:RECENT_EDITS],
+    }
+
+
+def build_department_metrics(department=None):
+    """Return the metrics dict of ``department`` (None: the whole school)."""
+    queries = _metrics_queries(department)
+    return _metrics(department, {name: list(query) for name, query in queries.items()})
+
+
+async def abuild_department_metrics(department=None):
+    """Async :func:`build_department_metrics`."""
+    queries = _metrics_queries(department)
+    return _metrics(department, dict(zip(queries, await fetch_all(*queries.values()))))
+
+
+def _metrics(department, rows):
+    classes = rows["classes"]
+    student_count = sum(row["students"] for row in classes)
+
+    # Marks entered per subject and exam. Every subject is reported for
+    # every exam with marks, so a subject nobody has entered yet shows up
+    # as fully missing.
+    entered = {(row["subject_id"], row["exam_id"]): row for row in rows["entered"]}
+    mark_coverage = []
+    for subject_id, subject_name in rows["subjects"]:
+        for exam_id, exam_name in rows["exams"]:
+            row = entered.get((subject_id, exam_id), {})
+            count = row.get("entered", 0)
+            average = row.get("average")
+            mark_coverage.append(
+                {
+                    "subject": subject_name,
+                    "exam": exam_name,
+                    "entered": count,
+                    "missing": max(student_count - count, 0),
+                    "average_percent": (
+                        round(average, 2) if average is not None else None
+                    ),
+                }
+            )
+
+    class_averages = defaultdict(list)
+    for row in rows["class_averages"]:
+        class_averages[row["exam__name"]].append(
+            {
+                "student_class": row["student__student_class"],
+                "section": row["student__section"],
+                "students": row["students"],
+                "average_percent": (
+                    round(row["average"], 2) if row["average"] is not None else None
+                ),
+            }
+        )
+
+    upcoming = [
+        {
+            "id": row["pk"],
+            "title": row["title"],
+            "due_date": row["due_date"].isoformat(),
+            "students": row["students"],
+        }
+        for row in rows["upcoming"]
+    ]
+
+    recent_edits = [
+        {
+            "student": f"{row['student__first_name']} {row['student__last_name']}",
+            "subject": row["subject__name"],
+            "exam": row["exam__name"],
+            "score": row["score"],
+            "max_score": row["max_score"],
+            "updated_by": row["updated_by__username"],
+            "updated_at": row["updated_at"].isoformat(),
+        }
+        for row in rows["recent_edits"]
+    ]
+
+    return {
+        "department": department.name if department is not None else None,
+        "students": student_count,
+        "classes": classes,
+        "mark_coverage": mark_coverage,
+        "class_averages": dict(class_averages),
+        "upcoming_assignments": upcoming,
+        "recent_edits": recent_edits,
+    }
+
+
+def department_metrics(department=None):
+    """Return the cached metrics of ``department`` (None: the whole school)."""
+    scope = department.pk if department is not None else "all"
+    key = "department-metrics:{}:{}:{}:{}".format(
+        scope,
+        _stamp("structure"),
+        _stamp(scope),
+        timezone.localdate().isoformat(),
+    )
+    metrics = cache.get(key)
+    if metrics is None:
+        metrics = build_department_metrics(department)
+        cache.set(key, metrics, METRICS_CACHE_TIMEOUT)
+    return metrics
+
+
+async def adepartment_metrics(department=None):
+    """Async :func:`department_metrics`."""
+    scope = department.pk if department is not None else "all"
+    structure, own = await asyncio.gather(_astamp("structure"), _astamp(scope))
+    key = "department-metrics:{}:{}:{}:{}".format(
+        scope, structure, own, timezone.localdate().isoformat()
+    )
+    metrics = await cache.aget(key)
+    if metrics is None:
+        metrics = await abuild_department_metrics(department)
+        await cache.aset(key, metrics, METRICS_CACHE_TIMEOUT)
+    return metrics
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0007_student_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentResultSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('exam_name', models.CharField(max_length=100)),
+                ('subject_count', models.PositiveIntegerField(default=0)),
+                ('passed_count', models.PositiveIntegerField(default=0)),
+                ('total_score', models.PositiveIntegerField(default=0)),
+                ('max_total', models.PositiveIntegerField(default=0)),
+                ('percent', models.FloatField(blank=True, null=True)),
+                ('grade', models.CharField(blank=True, max_length=5)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='result_summaries', to='student.student')),
+            ],
+            options={
+                'ordering': ['student', 'exam_name'],
+                'unique_together': {('student', 'exam_name')},
+            },
+        ),
+        migrations.CreateModel(
+            name='StudentSubjectSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=100)),
+                ('exam_count', models.PositiveIntegerField(default=0)),
+                ('average_percent', models.FloatField(blank=True, null=True)),
+                ('latest_percent', models.FloatField(blank=True, null=True)),
+                ('trend', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subject_summaries', to='student.student')),
+            ],
+            options={
+                'ordering': ['student', 'subject'],
+                'unique_together': {('student', 'subject')},
+            },
+        ),
+    ]
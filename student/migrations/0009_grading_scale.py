@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+STANDARD_BANDS = [
+    ("A+", 90),
+    ("A", 80),
+    ("B", 70),
+    ("C", 60),
+    ("D", 50),
+    ("F", 0),
+]
+
+
+def create_standard_scale(apps, schema_editor):
+    GradingScale = apps.get_model("student", "GradingScale")
+    GradeBand = apps.get_model("student", "GradeBand")
+    scale = GradingScale.objects.create(
+        name="Standard",
+        description="A+ from 90%, then one letter per 10% down to F below 50%.",
+        is_default=True,
+    )
+    GradeBand.objects.bulk_create(
+        GradeBand(scale=scale, letter=letter, min_percent=minimum)
+        for letter, minimum in STANDARD_BANDS
+    )
+
+
+def delete_standard_scale(apps, schema_editor):
+    apps.get_model("student", "GradingScale").objects.filter(name="Standard").delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0008_result_summaries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradingScale',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('description', models.TextField(blank=True)),
+                ('is_default', models.BooleanField(default=False)),
+            ],
+            options={
+                'ordering': ['name'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('is_default', True)), fields=('is_default',), name='single_default_grading_scale')],
+            },
+        ),
+        migrations.CreateModel(
+            name='GradeBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('letter', models.CharField(max_length=5)),
+                ('min_percent', models.FloatField()),
+                ('scale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bands', to='student.gradingscale')),
+            ],
+            options={
+                'ordering': ['scale', '-min_percent'],
+                'unique_together': {('scale', 'letter')},
+            },
+        ),
+        migrations.RunPython(create_standard_scale, delete_standard_scale),
+    ]
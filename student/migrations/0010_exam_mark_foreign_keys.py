@@ -0,0 +1,117 @@
+# Schema step 1 of 3 for normalizing Mark.subject/exam_name into foreign keys:
+# add the Exam model and nullable FK columns next to the old strings.
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def clear_summaries(apps, schema_editor):
+    # Summaries are derived data keyed by the old strings; they are rebuilt
+    # from the marks (rebuild_result_summaries) once the FKs are in place.
+    apps.get_model("student", "StudentResultSummary").objects.all().delete()
+    apps.get_model("student", "StudentSubjectSummary").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("student", "0009_grading_scale"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Exam",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100, unique=True)),
+                ("date", models.DateField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "ordering": ["name"],
+            },
+        ),
+        # Dropped here rather than in step 3 so that unapplying only restores
+        # it after step 2 has copied the names back.
+        migrations.AlterUniqueTogether(
+            name="mark",
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name="mark",
+            name="subject_ref",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="marks",
+                to="student.subject",
+            ),
+        ),
+        migrations.AddField(
+            model_name="mark",
+            name="exam",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="marks",
+                to="student.exam",
+            ),
+        ),
+        migrations.RunPython(clear_summaries, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name="studentresultsummary",
+            unique_together=set(),
+        ),
+        migrations.RemoveField(
+            model_name="studentresultsummary",
+            name="exam_name",
+        ),
+        migrations.AddField(
+            model_name="studentresultsummary",
+            name="exam",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="result_summaries",
+                to="student.exam",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AlterModelOptions(
+            name="studentresultsummary",
+            options={"ordering": ["student", "exam"]},
+        ),
+        migrations.AlterUniqueTogether(
+            name="studentresultsummary",
+            unique_together={("student", "exam")},
+        ),
+        migrations.AlterUniqueTogether(
+            name="studentsubjectsummary",
+            unique_together=set(),
+        ),
+        migrations.RemoveField(
+            model_name="studentsubjectsummary",
+            name="subject",
+        ),
+        migrations.AddField(
+            model_name="studentsubjectsummary",
+            name="subject",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="student_summaries",
+                to="student.subject",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AlterUniqueTogether(
+            name="studentsubjectsummary",
+            unique_together={("student", "subject")},
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Data step 2 of 3: create Subject/Exam rows for the strings stored on marks
+# and point every mark at them, one primary-key range per UPDATE.
+
+from django.db import migrations
+from django.db.models import Max, OuterRef, Subquery
+from django.utils.text import slugify
+
+BATCH_SIZE = 5000
+
+
+def _unique_code(name, taken):
+    base = (slugify(name).replace("-", "").upper() or "SUBJECT")[:16]
+    code, counter = base, 1
+    while code in taken:
+        code = f"{base}{counter}"
+        counter += 1
+    taken.add(code)
+    return code
+
+
+def forwards(apps, schema_editor):
+    Mark = apps.get_model("student", "Mark")
+    Subject = apps.get_model("student", "Subject")
+    Exam = apps.get_model("student", "Exam")
+
+    subject_names = set(Mark.objects.values_list("subject", flat=True).distinct())
+    known = set(
+        Subject.objects.filter(name__in=subject_names).values_list("name", flat=True)
+    )
+    codes = set(Subject.objects.values_list("code", flat=True))
+    # Subjects only ever typed into marks were not part of the marks grid;
+    # leave them unapproved so the grid does not change.
+    Subject.objects.bulk_create(
+        Subject(name=name, code=_unique_code(name, codes), is_approved=False)
+        for name in sorted(subject_names - known)
+    )
+
+    exam_names = set(Mark.objects.values_list("exam_name", flat=True).distinct())
+    known = set(Exam.objects.filter(name__in=exam_names).values_list("name", flat=True))
+    Exam.objects.bulk_create(Exam(name=name) for name in sorted(exam_names - known))
+
+    last_pk = Mark.objects.aggregate(last=Max("pk"))["last"] or 0
+    for start in range(0, last_pk, BATCH_SIZE):
+        Mark.objects.filter(pk__gt=start, pk__lte=start + BATCH_SIZE).update(
+            subject_ref=Subquery(
+                Subject.objects.filter(name=OuterRef("subject")).values("pk")[:1]
+            ),
+            exam=Subquery(
+                Exam.objects.filter(name=OuterRef("exam_name")).values("pk")[:1]
+            ),
+        )
+
+
+def backwards(apps, schema_editor):
+    Mark = apps.get_model("student", "Mark")
+    Subject = apps.get_model("student", "Subject")
+    Exam = apps.get_model("student", "Exam")
+
+    last_pk = Mark.objects.aggregate(last=Max("pk"))["last"] or 0
+    for start in range(0, last_pk, BATCH_SIZE):
+        Mark.objects.filter(pk__gt=start, pk__lte=start + BATCH_SIZE).update(
+            subject=Subquery(
+                Subject.objects.filter(pk=OuterRef("subject_ref")).values("name")[:1]
+            ),
+            exam_name=Subquery(
+                Exam.objects.filter(pk=OuterRef("exam")).values("name")[:1]
+            ),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("student", "0010_exam_mark_foreign_keys"),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
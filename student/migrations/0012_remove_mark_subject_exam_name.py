@@ -0,0 +1,78 @@
+# Schema step 3 of 3: drop the old strings, make the FKs required and add the
+# composite indexes used by per-exam reports.
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("student", "0011_convert_mark_subject_exam"),
+    ]
+
+    operations = [
+        # Give the old columns a default so unapplying can re-add them before
+        # step 2 copies the names back.
+        migrations.AlterField(
+            model_name="mark",
+            name="subject",
+            field=models.CharField(default="", max_length=100),
+        ),
+        migrations.AlterField(
+            model_name="mark",
+            name="exam_name",
+            field=models.CharField(default="", max_length=100),
+        ),
+        migrations.RemoveField(
+            model_name="mark",
+            name="subject",
+        ),
+        migrations.RemoveField(
+            model_name="mark",
+            name="exam_name",
+        ),
+        migrations.RenameField(
+            model_name="mark",
+            old_name="subject_ref",
+            new_name="subject",
+        ),
+        migrations.AlterField(
+            model_name="mark",
+            name="subject",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="marks",
+                to="student.subject",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="mark",
+            name="exam",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="marks",
+                to="student.exam",
+            ),
+        ),
+        migrations.AlterModelOptions(
+            name="mark",
+            options={"ordering": ["student", "subject", "exam"]},
+        ),
+        migrations.AlterUniqueTogether(
+            name="mark",
+            unique_together={("student", "subject", "exam")},
+        ),
+        migrations.AddIndex(
+            model_name="mark",
+            index=models.Index(
+                fields=["student", "exam"], name="mark_student_exam_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="mark",
+            index=models.Index(
+                fields=["subject", "exam"], name="mark_subject_exam_idx"
+            ),
+        ),
+    ]
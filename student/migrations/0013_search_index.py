@@ -0,0 +1,144 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:03
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+FTS_TABLE = "student_search_fts"
+
+
+def create_fts_table(apps, schema_editor):
+    # Only SQLite builds with FTS5 get the virtual table; everything else
+    # searches the SearchToken rows (see student/search.py).
+    connection = schema_editor.connection
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        if not cursor.fetchone()[0]:
+            return
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "kind, body, object_id UNINDEXED, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+
+# kind -> (model, indexed fields); the order gives the FTS rowid offset.
+SEARCH_KINDS = {
+    "student": (
+        "Student",
+        ("first_name", "last_name", "student_id", "admission_number"),
+    ),
+    "teacher": ("Teacher", ("first_name", "last_name", "teacher_id", "email")),
+}
+BATCH_SIZE = 1000
+MAX_TOKEN_LENGTH = 64
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+# A frozen copy of the tokenizer in student/search.py as of this migration,
+# so later changes there do not change what it writes.
+def _normalize(value):
+    value = unicodedata.normalize("NFKD", str(value or ""))
+    value = "".join(char for char in value if not unicodedata.combining(char))
+    return _WORD_RE.findall(value.lower())
+
+
+def _tokens_for(obj, fields):
+    tokens = set()
+    for field in fields:
+        words = _normalize(getattr(obj, field))
+        for start in range(len(words)):
+            tokens.add("".join(words[start:])[:MAX_TOKEN_LENGTH])
+            tokens.add(words[start][:MAX_TOKEN_LENGTH])
+    return tokens
+
+
+def populate_index(apps, schema_editor):
+    # Index the records that exist already; the signals only see new saves.
+    connection = schema_editor.connection
+    fts = FTS_TABLE in connection.introspection.table_names()
+    SearchToken = apps.get_model("student", "SearchToken")
+    for offset, (kind, (model_name, fields)) in enumerate(SEARCH_KINDS.items()):
+        model = apps.get_model("student", model_name)
+        rows = model.objects.only("pk", *fields).order_by("pk")
+        batch = []
+        for obj in rows.iterator(chunk_size=BATCH_SIZE):
+            batch.append(obj)
+            if len(batch) >= BATCH_SIZE:
+                _index(connection, SearchToken, fts, kind, offset, fields, batch)
+                batch = []
+        _index(connection, SearchToken, fts, kind, offset, fields, batch)
+
+
+def _index(connection, SearchToken, fts, kind, offset, fields, objects):
+    if not objects:
+        return
+    if fts:
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, kind, body, object_id) "
+                "VALUES (%s, %s, %s, %s)",
+                [
+                    (
+                        obj.pk * len(SEARCH_KINDS) + offset,
+                        kind,
+                        " ".join(sorted(_tokens_for(obj, fields))),
+                        obj.pk,
+                    )
+                    for obj in objects
+                ],
+            )
+    else:
+        SearchToken.objects.bulk_create(
+            (
+                SearchToken(kind=kind, object_id=obj.pk, token=token)
+                for obj in objects
+                for token in _tokens_for(obj, fields)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("student", "0012_remove_mark_subject_exam_name"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchToken",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("kind", models.CharField(max_length=10)),
+                ("object_id", models.PositiveBigIntegerField()),
+                ("token", models.CharField(max_length=64)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["kind", "token"], name="search_token_idx"),
+                    models.Index(
+                        fields=["kind", "object_id"], name="search_object_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+        migrations.RunPython(populate_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,140 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("student", "0013_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="exam",
+            name="rankings_stale",
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.CreateModel(
+            name="CohortStatistics",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "scope",
+                    models.CharField(
+                        choices=[
+                            ("school", "School"),
+                            ("class", "Class and section"),
+                            ("department", "Department"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("student_class", models.CharField(blank=True, max_length=100)),
+                ("section", models.CharField(blank=True, max_length=15)),
+                ("count", models.PositiveIntegerField()),
+                ("mean", models.FloatField()),
+                ("median", models.FloatField()),
+                ("stddev", models.FloatField()),
+                ("minimum", models.FloatField()),
+                ("maximum", models.FloatField()),
+                ("pass_rate", models.FloatField()),
+                (
+                    "department",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="student.department",
+                    ),
+                ),
+                (
+                    "exam",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="cohort_statistics",
+                        to="student.exam",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["exam", "scope", "student_class", "section", "department"],
+                "indexes": [
+                    models.Index(fields=["exam", "scope"], name="cohort_stats_exam_idx")
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="ExamRanking",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("student_class", models.CharField(blank=True, max_length=100)),
+                ("section", models.CharField(blank=True, max_length=15)),
+                ("percent", models.FloatField()),
+                ("school_rank", models.PositiveIntegerField()),
+                ("school_percentile", models.FloatField()),
+                ("class_rank", models.PositiveIntegerField()),
+                ("class_percentile", models.FloatField()),
+                ("department_rank", models.PositiveIntegerField(blank=True, null=True)),
+                ("department_percentile", models.FloatField(blank=True, null=True)),
+                (
+                    "department",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="student.department",
+                    ),
+                ),
+                (
+                    "exam",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rankings",
+                        to="student.exam",
+                    ),
+                ),
+                (
+                    "student",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rankings",
+                        to="student.student",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["exam", "school_rank"], name="ranking_school_idx"
+                    ),
+                    models.Index(
+                        fields=["exam", "student_class", "section", "class_rank"],
+                        name="ranking_class_idx",
+                    ),
+                    models.Index(
+                        fields=["exam", "department", "department_rank"],
+                        name="ranking_department_idx",
+                    ),
+                ],
+                "unique_together": {("exam", "student")},
+            },
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("student", "0015_assignment_targets"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AssignmentSubmission",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("submitted", "Submitted"), ("graded", "Graded")],
+                        default="submitted",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "submitted_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("grade", models.CharField(blank=True, max_length=10)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["-submitted_at"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="assignment",
+            index=models.Index(fields=["due_date", "id"], name="assignment_due_idx"),
+        ),
+        migrations.AddField(
+            model_name="assignmentsubmission",
+            name="assignment",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="submissions",
+                to="student.assignment",
+            ),
+        ),
+        migrations.AddField(
+            model_name="assignmentsubmission",
+            name="student",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="submissions",
+                to="student.student",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="assignmentsubmission",
+            index=models.Index(
+                fields=["student", "status"], name="submission_student_idx"
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="assignmentsubmission",
+            unique_together={("assignment", "student")},
+        ),
+    ]
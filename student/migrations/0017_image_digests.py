@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("student", "0016_assignment_submissions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="student",
+            name="student_image_digest",
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="teacher",
+            name="teacher_image_digest",
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("student", "0017_image_digests"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="exam",
+            name="rankings_refreshed_at",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="exam",
+            name="rankings_stale_since",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+    ]
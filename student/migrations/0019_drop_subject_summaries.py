@@ -0,0 +1,16 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:21
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("student", "0018_ranking_refresh_times"),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name="StudentSubjectSummary",
+        ),
+    ]
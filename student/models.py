@@ -1,7 +1,39 @@
 from pyclbr import Class
+import datetime
+
 from django.db import models
-from django.utils.text import slugify
 from django.conf import settings
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from home_auth.images import image_urls
+
+from .grading import grade_expression, percent_expression
+from .slugs import allocate_slug, slug_base
+
+
+def _save_with_slug(instance, identifier_field, default, save, args, kwargs):
+    """Save ``instance``, allocating its slug first if it has none.
+
+    The slug is ``<first name>-<identifier>`` and is normally written by the
+    INSERT itself. Only records without an identifier fall back to their
+    primary key, which needs a second save once the row exists.
+    """
+    model = type(instance)
+    allocated = False
+    identifier = getattr(instance, identifier_field) or instance.pk
+    if not instance.slug and identifier:
+        base = slug_base(instance.first_name, identifier, default)
+        instance.slug = allocate_slug(model, base, exclude_pk=instance.pk)
+        allocated = True
+    if allocated and kwargs.get("update_fields") is not None:
+        kwargs["update_fields"] = {*kwargs["update_fields"], "slug"}
+    save(*args, **kwargs)
+
+    if not instance.slug:
+        base = slug_base(instance.first_name, instance.pk, default)
+        instance.slug = allocate_slug(model, base, exclude_pk=instance.pk)
+        model._default_manager.filter(pk=instance.pk).update(slug=instance.slug)
 
 
 # Create your models here.
@@ -46,6 +78,8 @@ class Student(models.Model):
     admission_number = models.CharField(max_length=15, blank=True)
     section = models.CharField(max_length=15, blank=True)
     student_image = models.ImageField(upload_to="student/", blank=True, null=True)
+    # SHA-256 of student_image once its thumbnails exist (home_auth.images).
+    student_image_digest = models.CharField(max_length=64, blank=True, editable=False)
 
     # Link student to a Department so teachers can filter students by department.
     department = models.ForeignKey(
@@ -61,38 +95,47 @@ class Student(models.Model):
     )
     slug = models.SlugField(max_length=255, unique=True, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the student list (see student/pagination.py).
+            models.Index(
+                fields=["last_name", "first_name", "id"], name="student_name_seek_idx"
+            ),
+            models.Index(
+                fields=["student_class", "section"], name="student_class_section_idx"
+            ),
+        ]
+
     def save(self, *args, **kwargs):
-        created = self.pk is None
-
-        # For new objects, save first to get a PK
-        if created:
-            super().save(*args, **kwargs)
-
-        # Generate slug if missing
-        if not self.slug:
-            identifier = self.student_id or str(self.pk)
-            base = slugify(f"{self.first_name}-{identifier}") or "student"
-            slug = base
-            counter = 1
-
-            while Student.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-                slug = f"{base}-{counter}"
-                counter += 1
-            self.slug = slug
-            # If slug was missing, save again with just the slug field
-            super().save(update_fields=["slug"])
-        else:
-            # For existing objects, always save to persist all field changes
-            super().save(*args, **kwargs)
+        _save_with_slug(self, "student_id", "student", super().save, args, kwargs)
+
+    @property
+    def image_urls(self):
+        """Thumbnail URLs of the photo by size (list, card, detail)."""
+        return image_urls(self.student_image, self.student_image_digest)
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
 
+class MarkQuerySet(models.QuerySet):
+    def with_grades(self, bands=None, percent_name="percent", grade_name="grade"):
+        """Annotate each mark with its percentage and letter grade in SQL.
+
+        ``bands`` defaults to the default ``GradingScale``; the annotation
+        names can be changed to match what a template expects.
+        """
+        return self.annotate(**{percent_name: percent_expression()}).annotate(
+            **{grade_name: grade_expression(percent_name, bands)}
+        )
+
+
 class Mark(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="marks")
-    subject = models.CharField(max_length=100)
-    exam_name = models.CharField(max_length=100)
+    subject = models.ForeignKey(
+        "Subject", on_delete=models.PROTECT, related_name="marks"
+    )
+    exam = models.ForeignKey("Exam", on_delete=models.PROTECT, related_name="marks")
     score = models.PositiveIntegerField()
     max_score = models.PositiveIntegerField(default=100)
     updated_by = models.ForeignKey(
@@ -104,12 +147,100 @@ class Mark(models.Model):
     )
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = MarkQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ("student", "subject", "exam")
+        ordering = ["student", "subject", "exam"]
+        indexes = [
+            # Per-exam class reports and per-subject exam averages.
+            models.Index(fields=["student", "exam"], name="mark_student_exam_idx"),
+            models.Index(fields=["subject", "exam"], name="mark_subject_exam_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded exam so its summary can be refreshed when an
+        # edit moves the mark to another exam (see signals.py).
+        instance._loaded_exam = instance.__dict__.get("exam_id")
+        return instance
+
+    @property
+    def exam_name(self):
+        # Kept for templates written before exams became their own model.
+        return self.exam.name
+
+    def __str__(self):
+        return f"{self.student} - {self.subject.name} ({self.exam.name})"
+
+
+class GradingScale(models.Model):
+    """A named letter-grade ladder, e.g. the school's standard A+ to F scale."""
+
+    name = models.CharField(max_length=100, unique=True)
+    description = models.TextField(blank=True)
+    # The scale used by results pages when no scale is named explicitly.
+    is_default = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ["name"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["is_default"],
+                condition=models.Q(is_default=True),
+                name="single_default_grading_scale",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.name} (default)" if self.is_default else self.name
+
+
+class GradeBand(models.Model):
+    """Percentages at or above ``min_percent`` get ``letter`` (highest band wins)."""
+
+    scale = models.ForeignKey(
+        GradingScale, on_delete=models.CASCADE, related_name="bands"
+    )
+    letter = models.CharField(max_length=5)
+    min_percent = models.FloatField()
+
+    class Meta:
+        unique_together = ("scale", "letter")
+        ordering = ["scale", "-min_percent"]
+
+    def __str__(self):
+        return f"{self.letter} >= {self.min_percent}%"
+
+
+class StudentResultSummary(models.Model):
+    """Totals of one student's marks in one exam.
+
+    Derived from ``Mark`` rows and kept up to date by ``student.summaries``;
+    never edit these rows by hand.
+    """
+
+    student = models.ForeignKey(
+        Student, on_delete=models.CASCADE, related_name="result_summaries"
+    )
+    exam = models.ForeignKey(
+        "Exam", on_delete=models.CASCADE, related_name="result_summaries"
+    )
+    subject_count = models.PositiveIntegerField(default=0)
+    passed_count = models.PositiveIntegerField(default=0)
+    total_score = models.PositiveIntegerField(default=0)
+    max_total = models.PositiveIntegerField(default=0)
+    percent = models.FloatField(null=True, blank=True)
+    grade = models.CharField(max_length=5, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
     class Meta:
-        unique_together = ("student", "subject", "exam_name")
-        ordering = ["student", "subject", "exam_name"]
+        unique_together = ("student", "exam")
+        ordering = ["student", "exam"]
 
     def __str__(self):
-        return f"{self.student} - {self.subject} ({self.exam_name})"
+        return f"{self.student} - {self.exam.name}: {self.percent}%"
 
 
 class Department(models.Model):
@@ -151,6 +282,111 @@ class Subject(models.Model):
         return f"{self.name} ({self.code})" if self.code else self.name
 
 
+class Exam(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    # Optional sitting date, used to order exams chronologically.
+    date = models.DateField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Set when a result of this exam changes and cleared when the ranking
+    # snapshot is rebuilt after the commit (see student/rankings.py). Pages
+    # show the last snapshot meanwhile.
+    rankings_stale = models.BooleanField(default=True, editable=False)
+    rankings_stale_since = models.DateTimeField(null=True, editable=False)
+    rankings_refreshed_at = models.DateTimeField(null=True, editable=False)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+
+class ExamRanking(models.Model):
+    """A student's rank in one exam, school-wide and within their cohorts.
+
+    Snapshot rows written by ``student.rankings`` from the result summaries;
+    class, section and department are copied as they were at refresh time.
+    Percentiles are the share of the cohort scoring lower (0-100).
+    """
+
+    exam = models.ForeignKey("Exam", on_delete=models.CASCADE, related_name="rankings")
+    student = models.ForeignKey(
+        Student, on_delete=models.CASCADE, related_name="rankings"
+    )
+    student_class = models.CharField(max_length=100, blank=True)
+    section = models.CharField(max_length=15, blank=True)
+    department = models.ForeignKey(
+        "Department", on_delete=models.SET_NULL, null=True, blank=True
+    )
+    percent = models.FloatField()
+    school_rank = models.PositiveIntegerField()
+    school_percentile = models.FloatField()
+    class_rank = models.PositiveIntegerField()
+    class_percentile = models.FloatField()
+    department_rank = models.PositiveIntegerField(null=True, blank=True)
+    department_percentile = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ("exam", "student")
+        indexes = [
+            models.Index(fields=["exam", "school_rank"], name="ranking_school_idx"),
+            models.Index(
+                fields=["exam", "student_class", "section", "class_rank"],
+                name="ranking_class_idx",
+            ),
+            models.Index(
+                fields=["exam", "department", "department_rank"],
+                name="ranking_department_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.student} - {self.exam.name}: #{self.school_rank}"
+
+
+class CohortStatistics(models.Model):
+    """Score statistics of one exam for the school, a class or a department.
+
+    Percent-based, like ``StudentResultSummary.percent``. Maintained by
+    ``student.rankings`` together with ``ExamRanking``.
+    """
+
+    SCHOOL = "school"
+    CLASS = "class"
+    DEPARTMENT = "department"
+    SCOPE_CHOICES = [
+        (SCHOOL, "School"),
+        (CLASS, "Class and section"),
+        (DEPARTMENT, "Department"),
+    ]
+
+    exam = models.ForeignKey(
+        "Exam", on_delete=models.CASCADE, related_name="cohort_statistics"
+    )
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    student_class = models.CharField(max_length=100, blank=True)
+    section = models.CharField(max_length=15, blank=True)
+    department = models.ForeignKey(
+        "Department", on_delete=models.CASCADE, null=True, blank=True
+    )
+    count = models.PositiveIntegerField()
+    mean = models.FloatField()
+    median = models.FloatField()
+    stddev = models.FloatField()
+    minimum = models.FloatField()
+    maximum = models.FloatField()
+    pass_rate = models.FloatField()
+
+    class Meta:
+        ordering = ["exam", "scope", "student_class", "section", "department"]
+        indexes = [
+            models.Index(fields=["exam", "scope"], name="cohort_stats_exam_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.exam.name} {self.scope}: mean {self.mean}%"
+
+
 class Course(models.Model):
     title = models.CharField(max_length=150, unique=True)
     code = models.CharField(max_length=30, unique=True)
@@ -198,31 +434,19 @@ class Teacher(models.Model):
     )
     subjects = models.ManyToManyField(Subject, related_name="teachers", blank=True)
     teacher_image = models.ImageField(upload_to="teacher/", blank=True, null=True)
+    # SHA-256 of teacher_image once its thumbnails exist (home_auth.images).
+    teacher_image_digest = models.CharField(max_length=64, blank=True, editable=False)
     slug = models.SlugField(max_length=255, unique=True, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
-        created = self.pk is None
-
-        # For new objects, save first to get a PK
-        if created:
-            super().save(*args, **kwargs)
-
-        # Generate slug if missing
-        if not self.slug:
-            identifier = self.teacher_id or str(self.pk)
-            base = slugify(f"{self.first_name}-{identifier}") or "teacher"
-            slug = base
-            counter = 1
-
-            while Teacher.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-                slug = f"{base}-{counter}"
-                counter += 1
-            self.slug = slug
-            super().save(update_fields=["slug"])
-        else:
-            super().save(*args, **kwargs)
+        _save_with_slug(self, "teacher_id", "teacher", super().save, args, kwargs)
+
+    @property
+    def image_urls(self):
+        """Thumbnail URLs of the photo by size (list, card, detail)."""
+        return image_urls(self.teacher_image, self.teacher_image_digest)
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
@@ -231,7 +455,107 @@ class Teacher(models.Model):
         ordering = ["first_name", "last_name"]
 
 
+def _matching_targets(department_id, student_class, section):
+    """Assignment targets matching a student with these values (or OuterRefs)."""
+    return AssignmentTarget.objects.filter(
+        models.Q(department__isnull=True) | models.Q(department_id=department_id),
+        models.Q(student_class="") | models.Q(student_class=student_class),
+        models.Q(section="") | models.Q(section=section),
+    )
+
+
+def _targeted_students(assignment_id):
+    """Students an assignment (id or OuterRef) is set for, by either route."""
+    explicit = Assignment.assigned_students.through.objects.filter(
+        student_id=models.OuterRef("pk"), assignment_id=assignment_id
+    )
+    by_rule = _matching_targets(
+        models.OuterRef("department_id"),
+        models.OuterRef("student_class"),
+        models.OuterRef("section"),
+    ).filter(assignment_id=assignment_id)
+    return Student.objects.filter(models.Exists(explicit) | models.Exists(by_rule))
+
+
+class AssignmentQuerySet(models.QuerySet):
+    def for_student(self, student):
+        """Assignments set for ``student`` explicitly or by a target rule."""
+        explicit = Assignment.assigned_students.through.objects.filter(
+            assignment_id=models.OuterRef("pk"), student_id=student.pk
+        )
+        by_rule = _matching_targets(
+            student.department_id, student.student_class, student.section
+        ).filter(assignment_id=models.OuterRef("pk"))
+        return self.filter(models.Exists(explicit) | models.Exists(by_rule))
+
+    def with_student_counts(self, name="students"):
+        """Annotate how many students each assignment is set for."""
+        count = (
+            _targeted_students(models.OuterRef(models.OuterRef("pk")))
+            .order_by()
+            # A plain COUNT(*) function, so the subquery is not grouped.
+            .annotate(total=models.Func(models.Value(1), function="COUNT"))
+            .values("total")
+        )
+        return self.annotate(**{name: models.Subquery(count)})
+
+    def inbox(self, student, today=None):
+        """Assignments of ``student`` annotated with their submission state.
+
+        ``status`` is the submission's status if there is one, otherwise
+        ``overdue`` past the due date and ``pending`` before it; ``due_key``
+        sorts undated assignments last.
+        """
+        today = today or timezone.localdate()
+        submission = AssignmentSubmission.objects.filter(
+            assignment_id=models.OuterRef("pk"), student_id=student.pk
+        )
+        return (
+            self.for_student(student)
+            .annotate(
+                submission_status=models.Subquery(submission.values("status")[:1]),
+                submitted_at=models.Subquery(submission.values("submitted_at")[:1]),
+                grade=models.Subquery(submission.values("grade")[:1]),
+            )
+            .annotate(
+                status=models.Case(
+                    models.When(
+                        submission_status__isnull=False,
+                        then=models.F("submission_status"),
+                    ),
+                    models.When(
+                        due_date__lt=today, then=models.Value(Assignment.OVERDUE)
+                    ),
+                    default=models.Value(Assignment.PENDING),
+                    output_field=models.CharField(),
+                ),
+                due_key=Coalesce(
+                    "due_date",
+                    models.Value(datetime.date.max),
+                    output_field=models.DateField(),
+                ),
+            )
+        )
+
+    def status_counts(self):
+        """Count ``inbox()`` rows per status in one aggregate query."""
+        counts = self.order_by().aggregate(
+            **{
+                status: models.Count("pk", filter=models.Q(status=status))
+                for status in Assignment.STATUSES
+            }
+        )
+        return {status: counts[status] or 0 for status in Assignment.STATUSES}
+
+
 class Assignment(models.Model):
+    # Statuses of an assignment in a student's inbox (see ``inbox``).
+    PENDING = "pending"
+    OVERDUE = "overdue"
+    SUBMITTED = "submitted"
+    GRADED = "graded"
+    STATUSES = (PENDING, OVERDUE, SUBMITTED, GRADED)
+
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     created_by = models.ForeignKey(
@@ -257,8 +581,109 @@ class Assignment(models.Model):
     due_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = AssignmentQuerySet.as_manager()
+
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["due_date", "id"], name="assignment_due_idx"),
+        ]
 
     def __str__(self):
         return self.title
+
+    def target_students(self):
+        """Students this assignment is set for, explicitly or by a target."""
+        return _targeted_students(self.pk)
+
+
+class AssignmentTarget(models.Model):
+    """A group of students an assignment is set for, matched when read.
+
+    Blank fields match any value, so ``department`` alone targets a whole
+    department and adding ``student_class``/``section`` narrows it to a
+    class. Students who join the group later see the assignment too.
+    """
+
+    assignment = models.ForeignKey(
+        Assignment, on_delete=models.CASCADE, related_name="targets"
+    )
+    department = models.ForeignKey(
+        Department, on_delete=models.CASCADE, null=True, blank=True
+    )
+    student_class = models.CharField(max_length=100, blank=True)
+    section = models.CharField(max_length=15, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["department", "student_class", "section"],
+                name="assignment_target_idx",
+            ),
+        ]
+
+    def __str__(self):
+        parts = [str(self.department) if self.department else "All departments"]
+        if self.student_class:
+            parts.append(f"class {self.student_class}")
+        if self.section:
+            parts.append(f"section {self.section}")
+        return ", ".join(parts)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded department so the students it reached stop
+        # seeing the assignment when an edit retargets it (see signals.py).
+        instance._loaded_department = instance.__dict__.get("department_id")
+        return instance
+
+
+class AssignmentSubmission(models.Model):
+    """A student's hand-in of an assignment, and its grade once marked."""
+
+    SUBMITTED = Assignment.SUBMITTED
+    GRADED = Assignment.GRADED
+    STATUS_CHOICES = [(SUBMITTED, "Submitted"), (GRADED, "Graded")]
+
+    assignment = models.ForeignKey(
+        Assignment, on_delete=models.CASCADE, related_name="submissions"
+    )
+    student = models.ForeignKey(
+        Student, on_delete=models.CASCADE, related_name="submissions"
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=SUBMITTED)
+    submitted_at = models.DateTimeField(default=timezone.now)
+    grade = models.CharField(max_length=10, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-submitted_at"]
+        unique_together = ("assignment", "student")
+        indexes = [
+            models.Index(fields=["student", "status"], name="submission_student_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.student} - {self.assignment} ({self.status})"
+
+
+class SearchToken(models.Model):
+    """One normalized search token of a student or teacher.
+
+    Used by ``student.search`` when SQLite's FTS5 table is not available:
+    prefix lookups become index range scans on (kind, token).
+    """
+
+    kind = models.CharField(max_length=10)
+    object_id = models.PositiveBigIntegerField()
+    token = models.CharField(max_length=64)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["kind", "token"], name="search_token_idx"),
+            models.Index(fields=["kind", "object_id"], name="search_object_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id} {self.token}"
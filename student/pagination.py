@@ -0,0 +1,166 @@
+"""Keyset (seek) pagination for large listings.
+
+Offset pagination makes the database walk past every skipped row, so deep
+pages get slower as the table grows. A keyset page instead remembers the
+sort key of its last row and asks for rows strictly after it, which an index
+on the sort columns answers directly. The ordering must end with a unique
+column (usually ``pk``) so the position is unambiguous.
+"""
+
+import base64
+import json
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor cannot be decoded for the requested ordering."""
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, length):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor("Malformed cursor.") from exc
+    if not isinstance(values, list) or len(values) != length:
+        raise InvalidCursor("Cursor does not match the ordering.")
+    return values
+
+
+def _split(field):
+    return (field[1:], True) if field.startswith("-") else (field, False)
+
+
+def _seek_filter(ordering, values, forward=True):
+    """Return a ``Q`` selecting rows after (or before) ``values``."""
+    condition = Q()
+    for index, field in enumerate(ordering):
+        name, descending = _split(field)
+        lookup = "gt" if descending != forward else "lt"
+        prefix = {_split(f)[0]: v for f, v in zip(ordering[:index], values)}
+        condition |= Q(**prefix, **{f"{name}__{lookup}": values[index]})
+    return condition
+
+
+def _reverse(field):
+    return field[1:] if field.startswith("-") else f"-{field}"
+
+
+class KeysetPage:
+    """One page of results plus the cursors to its neighbours."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _key(obj, ordering):
+    return [getattr(obj, _split(field)[0]) for field in ordering]
+
+
+def paginate_keyset(queryset, ordering, after=None, before=None, page_size=None):
+    """Return a :class:`KeysetPage` of ``queryset`` ordered by ``ordering``.
+
+    ``after``/``before`` are cursors taken from a previous page. Only
+    ``page_size + 1`` rows are fetched whatever page is requested.
+    """
+    ordering = list(ordering)
+    page_size = min(max(int(page_size or DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+
+    if before:
+        values = decode_cursor(before, len(ordering))
+        rows = list(
+            queryset.filter(_seek_filter(ordering, values, forward=False)).order_by(
+                *[_reverse(field) for field in ordering]
+            )[: page_size + 1]
+        )
+        has_more = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        previous_cursor = encode_cursor(_key(rows[0], ordering)) if has_more else None
+        next_cursor = encode_cursor(_key(rows[-1], ordering)) if rows else None
+        return KeysetPage(rows, next_cursor, previous_cursor)
+
+    qs = queryset.order_by(*ordering)
+    if after:
+        values = decode_cursor(after, len(ordering))
+        qs = qs.filter(_seek_filter(ordering, values))
+    rows = list(qs[: page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = encode_cursor(_key(rows[-1], ordering)) if has_more else None
+    previous_cursor = encode_cursor(_key(rows[0], ordering)) if after and rows else None
+    return KeysetPage(rows, next_cursor, previous_cursor)
+
+
+def paginate_keyset_nulls_last(
+    queryset, field, after=None, before=None, page_size=None
+):
+    """Like :func:`paginate_keyset` ordered by ``(field, pk)``, NULLs last.
+
+    Sorting on ``COALESCE(field, ...)`` would defeat an index on
+    ``(field, pk)``, so the rows with a value and the rows without one are
+    read as two segments, each in index order, and a page may span both.
+    Cursors are ``[value, pk]``, with a null value in the second segment.
+    """
+    page_size = min(max(int(page_size or DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+    segments = [
+        (queryset.filter(**{f"{field}__isnull": False}), [field, "pk"]),
+        (queryset.filter(**{f"{field}__isnull": True}), ["pk"]),
+    ]
+    forward = not before
+    cursor = after or before
+    start, key = 0, None
+    if cursor:
+        values = decode_cursor(cursor, 2)
+        start, key = (1, values[1:]) if values[0] is None else (0, values)
+    order = range(start, len(segments)) if forward else range(start, -1, -1)
+
+    rows = []
+    for index in order:
+        qs, ordering = segments[index]
+        if key is not None:
+            qs = qs.filter(_seek_filter(ordering, key, forward))
+            key = None
+        if not forward:
+            ordering = [_reverse(name) for name in ordering]
+        rows += list(qs.order_by(*ordering)[: page_size + 1 - len(rows)])
+        if len(rows) > page_size:
+            break
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    def cursor_of(obj):
+        return encode_cursor([getattr(obj, field), obj.pk])
+
+    if forward:
+        next_cursor = cursor_of(rows[-1]) if has_more else None
+        previous_cursor = cursor_of(rows[0]) if after and rows else None
+    else:
+        rows.reverse()
+        previous_cursor = cursor_of(rows[0]) if has_more else None
+        next_cursor = cursor_of(rows[-1]) if rows else None
+    return KeysetPage(rows, next_cursor, previous_cursor)
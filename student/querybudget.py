@@ -0,0 +1,185 @@
+"""SQL query budgets per view, to catch N+1 regressions.
+
+:class:`QueryRecorder` records every query run on a connection with its
+duration and a fingerprint (the SQL with literals and ``IN`` lists
+collapsed), so a query repeated once per row shows up as one fingerprint
+with a high count.
+
+Budgets are declared per URL name in ``QUERY_BUDGETS`` next to the URL
+patterns (see ``student/urls.py``); an entry is either the maximum number of
+queries or a dict with ``queries`` and ``repeats`` (how often one
+fingerprint may run). Two ways to enforce them:
+
+* :class:`QueryBudgetMiddleware`, opt-in through ``MIDDLEWARE``. It logs a
+  warning for each request over budget, or raises when the
+  ``QUERY_BUDGET_MODE`` setting is ``"raise"`` (useful in test settings).
+* :func:`query_budget` in tests::
+
+      with query_budget("student_list"):
+          client.get(reverse("student_list"))
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from importlib import import_module
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Fingerprints run more often than this in one request are reported even
+# for views without a budget.
+DEFAULT_MAX_REPEATS = 5
+DEFAULT_BUDGET_MODULES = ["student.urls"]
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bIN \((?:\s*(?:%s|\?)\s*,?)+\)", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a view runs more queries than its budget allows."""
+
+
+def fingerprint(sql):
+    """Return ``sql`` with literal values replaced, for grouping repeats."""
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _SPACE_RE.sub(" ", sql.replace("%s", "?"))
+    return _IN_LIST_RE.sub("IN (...)", sql).strip()
+
+
+class QueryRecorder:
+    """Context manager recording the queries run on database ``using``."""
+
+    def __init__(self, using="default"):
+        self.using = using
+        self.queries = []  # (sql, seconds)
+        self._wrapper = None
+        self._started = None
+        self.elapsed = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    def __enter__(self):
+        self._wrapper = connections[self.using].execute_wrapper(self)
+        self._wrapper.__enter__()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self._started
+        self._wrapper.__exit__(*exc_info)
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def sql_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    def repeats(self, minimum=2):
+        """Return ``[(fingerprint, count), ...]`` run at least ``minimum`` times."""
+        counts = Counter(fingerprint(sql) for sql, _ in self.queries)
+        return [(sql, n) for sql, n in counts.most_common() if n >= minimum]
+
+    def report(self):
+        lines = [
+            f"{self.count} queries, {self.sql_time * 1000:.1f} ms in SQL, "
+            f"{self.elapsed * 1000:.1f} ms total"
+        ]
+        for sql, n in self.repeats():
+            lines.append(f"  {n}x {sql[:200]}")
+        return "\n".join(lines)
+
+
+def get_budgets():
+    """Merge ``QUERY_BUDGETS`` from the modules in ``QUERY_BUDGET_MODULES``."""
+    budgets = {}
+    for path in getattr(settings, "QUERY_BUDGET_MODULES", DEFAULT_BUDGET_MODULES):
+        budgets.update(getattr(import_module(path), "QUERY_BUDGETS", {}))
+    return budgets
+
+
+def _limits(budget):
+    if budget is None:
+        return None, DEFAULT_MAX_REPEATS
+    if isinstance(budget, int):
+        return budget, DEFAULT_MAX_REPEATS
+    return budget.get("queries"), budget.get("repeats", DEFAULT_MAX_REPEATS)
+
+
+def check_budget(recorder, name, budget):
+    """Return a list of problems of ``recorder`` against ``budget``."""
+    max_queries, max_repeats = _limits(budget)
+    problems = []
+    if max_queries is not None and recorder.count > max_queries:
+        problems.append(f"{name}: {recorder.count} queries (budget {max_queries})")
+    for sql, n in recorder.repeats(max_repeats + 1):
+        problems.append(f"{name}: query repeated {n}x (max {max_repeats}): {sql[:200]}")
+    return problems
+
+
+@contextmanager
+def query_budget(name_or_limit, repeats=None, using="default"):
+    """Fail with :class:`QueryBudgetExceeded` if the block exceeds a budget.
+
+    ``name_or_limit`` is a URL name looked up in the declared budgets, or a
+    plain maximum number of queries.
+    """
+    if isinstance(name_or_limit, int):
+        name, budget = "block", {"queries": name_or_limit}
+    else:
+        name, budget = name_or_limit, get_budgets().get(name_or_limit)
+        if budget is None:
+            raise KeyError(f"No query budget declared for '{name_or_limit}'.")
+        if isinstance(budget, int):
+            budget = {"queries": budget}
+    if repeats is not None:
+        budget = {**budget, "repeats": repeats}
+    with QueryRecorder(using) as recorder:
+        yield recorder
+    problems = check_budget(recorder, name, budget)
+    if problems:
+        raise QueryBudgetExceeded("\n".join(problems) + "\n" + recorder.report())
+
+
+class QueryBudgetMiddleware:
+    """Record queries per request and check them against the URL budgets.
+
+    Adds a ``Server-Timing`` header with the query count and SQL time so the
+    numbers show up in the browser's network panel.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.mode = getattr(settings, "QUERY_BUDGET_MODE", "warn")
+        self.budgets = get_budgets()
+
+    def __call__(self, request):
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+
+        match = getattr(request, "resolver_match", None)
+        name = match.view_name if match else request.path
+        response["Server-Timing"] = (
+            f'db;dur={recorder.sql_time * 1000:.1f};desc="{recorder.count} queries"'
+        )
+        problems = check_budget(recorder, name, self.budgets.get(name))
+        if problems:
+            message = "\n".join(problems) + "\n" + recorder.report()
+            if self.mode == "raise":
+                raise QueryBudgetExceeded(message)
+            logger.warning("Query budget exceeded for %s\n%s", request.path, message)
+        return response
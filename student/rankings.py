@@ -0,0 +1,277 @@
+"""Exam rankings and cohort statistics.
+
+Ranks and percentiles come from SQL window functions over the per-exam
+result summaries (``RANK() OVER (PARTITION BY ... ORDER BY percent DESC)``),
+school-wide, per class and section, and per department. Mean, median,
+standard deviation, extremes and pass rate of each cohort are computed in
+the same pass over those rows.
+
+Both are stored as a snapshot (``ExamRanking`` and ``CohortStatistics``)
+per exam. Whenever a result summary of an exam changes, or a student moves
+to another class or department, the exam is flagged with
+``Exam.rankings_stale`` (and ``rankings_stale_since``) and its snapshot is
+rebuilt once the transaction commits: one rebuild per transaction however
+many marks it saved, so a mark sheet saved in bulk costs one rebuild per
+exam. Reads never rebuild; ranking pages show the last snapshot and its
+``rankings_refreshed_at``. Batch jobs saving many transactions wrap them
+in :func:`deferred_refresh` to rebuild once at the end. ``manage.py
+refresh_rankings`` rebuilds exams a failed or skipped refresh left stale (from cron, or as a worker with
+``--every``), and every exam with ``--all``.
+"""
+
+import statistics
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Case, F, Q, When, Window
+from django.db.models.functions import PercentRank, Rank, Round
+from django.utils import timezone
+
+from .models import (
+    CohortStatistics,
+    Exam,
+    ExamRanking,
+    StudentResultSummary,
+)
+
+# A result counts as passed from this percentage (as in student.summaries).
+PASS_PERCENT = 50
+BATCH_SIZE = 2000
+
+_deferred = threading.local()
+
+
+def mark_rankings_stale(exam_ids=None):
+    """Flag the snapshots of ``exam_ids`` (all exams if None) for rebuild.
+
+    The rebuild runs when the current transaction commits (right away in
+    autocommit mode).
+
+    ``exam_ids`` may be a list or a ``values("exam_id")`` queryset.
+    """
+    # New exams start stale without a time; stamp them on their first result.
+    exams = Exam.objects.filter(
+        Q(rankings_stale=False) | Q(rankings_stale_since__isnull=True)
+    )
+    if exam_ids is not None:
+        exams = exams.filter(pk__in=exam_ids)
+    if not exams.update(rankings_stale=True, rankings_stale_since=timezone.now()):
+        return
+    if not getattr(_deferred, "depth", 0):
+        _refresh_on_commit()
+
+
+def _refresh_on_commit():
+    """Rebuild the stale snapshots after the commit, once per transaction."""
+    connection = transaction.get_connection()
+    # The callback of this transaction, unless it already ran or was rolled
+    # back (then it is no longer pending).
+    scheduled = getattr(connection, "_rankings_refresh", None)
+    if any(func is scheduled for _, func, _ in connection.run_on_commit):
+        return
+
+    def refresh():
+        connection._rankings_refresh = None
+        refresh_stale_rankings()
+
+    connection._rankings_refresh = refresh
+    transaction.on_commit(refresh)
+
+
+def _ranked(partition):
+    """``(rank, percentile)`` window expressions over ``partition``."""
+    rank = Window(Rank(), partition_by=partition, order_by=F("percent").desc())
+    percentile = Round(
+        Window(PercentRank(), partition_by=partition, order_by="percent") * 100,
+        2,
+    )
+    return rank, percentile
+
+
+def _ranking_query(exam_id):
+    """SELECT producing the ``ExamRanking`` rows of one exam, in column order."""
+    school_rank, school_pct = _ranked([])
+    class_rank, class_pct = _ranked(
+        [F("student__student_class"), F("student__section")]
+    )
+    department_rank, department_pct = _ranked([F("student__department_id")])
+    no_department = Q(student__department_id__isnull=True)
+    columns = {
+        "exam_id": F("exam_id"),
+        "student_id": F("student_id"),
+        "student_class": F("student__student_class"),
+        "section": F("student__section"),
+        "department_id": F("student__department_id"),
+        "percent": F("percent"),
+        "school_rank": school_rank,
+        "school_percentile": school_pct,
+        "class_rank": class_rank,
+        "class_percentile": class_pct,
+        "department_rank": Case(
+            When(no_department, then=None), default=department_rank
+        ),
+        "department_percentile": Case(
+            When(no_department, then=None), default=department_pct
+        ),
+    }
+    # Annotation names must not clash with the summary's own fields.
+    aliases = {f"ranking_{name}": value for name, value in columns.items()}
+    query = (
+        StudentResultSummary.objects.filter(exam_id=exam_id, percent__isnull=False)
+        .annotate(**aliases)
+        .values(*aliases)
+        .order_by()
+    )
+    return list(columns), query
+
+
+def _statistics(percents):
+    passed = sum(1 for value in percents if value >= PASS_PERCENT)
+    return {
+        "count": len(percents),
+        "mean": round(statistics.fmean(percents), 2),
+        "median": round(statistics.median(percents), 2),
+        "stddev": round(statistics.pstdev(percents), 2),
+        "minimum": min(percents),
+        "maximum": max(percents),
+        "pass_rate": round(100.0 * passed / len(percents), 2),
+    }
+
+
+def _cohort_statistics(exam_id):
+    cohorts = defaultdict(list)
+    rows = StudentResultSummary.objects.filter(
+        exam_id=exam_id, percent__isnull=False
+    ).values_list(
+        "student__student_class",
+        "student__section",
+        "student__department_id",
+        "percent",
+    )
+    for student_class, section, department_id, value in rows.iterator(
+        chunk_size=BATCH_SIZE
+    ):
+        cohorts[(CohortStatistics.SCHOOL, "", "", None)].append(value)
+        cohorts[(CohortStatistics.CLASS, student_class, section, None)].append(value)
+        if department_id is not None:
+            cohorts[(CohortStatistics.DEPARTMENT, "", "", department_id)].append(value)
+    return [
+        CohortStatistics(
+            exam_id=exam_id,
+            scope=scope,
+            student_class=student_class,
+            section=section,
+            department_id=department_id,
+            **_statistics(percents),
+        )
+        for (scope, student_class, section, department_id), percents in cohorts.items()
+    ]
+
+
+def refresh_exam_rankings(exam_id):
+    """Rebuild the ranking snapshot of one exam; return the rows ranked.
+
+    The ranks are written with a single ``INSERT ... SELECT``, so the
+    database sorts and numbers the cohort without the rows passing through
+    Python.
+    """
+    columns, query = _ranking_query(exam_id)
+    select_sql, params = query.query.sql_with_params()
+    quote = connection.ops.quote_name
+    insert_sql = "INSERT INTO {} ({}) {}".format(
+        quote(ExamRanking._meta.db_table),
+        ", ".join(quote(ExamRanking._meta.get_field(name).column) for name in columns),
+        select_sql,
+    )
+    with transaction.atomic():
+        # Clear the flag first: a result changing while we rebuild sets it
+        # again, and the next refresh rebuilds once more.
+        Exam.objects.filter(pk=exam_id).update(
+            rankings_stale=False,
+            rankings_stale_since=None,
+            rankings_refreshed_at=timezone.now(),
+        )
+        ExamRanking.objects.filter(exam_id=exam_id).delete()
+        CohortStatistics.objects.filter(exam_id=exam_id).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(insert_sql, params)
+            ranked = cursor.rowcount
+        CohortStatistics.objects.bulk_create(
+            _cohort_statistics(exam_id), batch_size=BATCH_SIZE
+        )
+    return ranked
+
+
+@contextmanager
+def deferred_refresh():
+    """Only flag exams stale inside the block; rebuild them once it ends."""
+    depth = getattr(_deferred, "depth", 0)
+    _deferred.depth = depth + 1
+    try:
+        yield
+    finally:
+        _deferred.depth = depth
+    if not depth:
+        refresh_stale_rankings()
+
+
+def refresh_stale_rankings(exam_ids=None, min_age=0):
+    """Rebuild the stale snapshots among ``exam_ids`` (all exams if None).
+
+    Exams flagged less than ``min_age`` seconds ago are left for a later
+    run, while their results are likely still being entered.
+    """
+    exams = Exam.objects.filter(rankings_stale=True)
+    if exam_ids is not None:
+        exams = exams.filter(pk__in=exam_ids)
+    if min_age:
+        settled = timezone.now() - timedelta(seconds=min_age)
+        exams = exams.filter(
+            Q(rankings_stale_since__isnull=True) | Q(rankings_stale_since__lte=settled)
+        )
+    stale = list(exams.values_list("pk", flat=True))
+    for exam_id in stale:
+        refresh_exam_rankings(exam_id)
+    return stale
+
+
+def exam_rankings(exam, scope=CohortStatistics.SCHOOL, cohort=None):
+    """Return ``(statistics, rankings queryset)`` of one exam and cohort.
+
+    ``cohort`` is ``{"student_class", "section"}`` for the class scope and
+    ``{"department"}`` for the department scope; rankings are ordered by the
+    rank within that cohort. Reads the last snapshot, even when stale.
+    """
+    cohort = cohort or {}
+    stats = CohortStatistics.objects.filter(exam=exam, scope=scope)
+    rankings = ExamRanking.objects.filter(exam=exam).select_related("student")
+    if scope == CohortStatistics.CLASS:
+        keys = {
+            "student_class": cohort.get("student_class", ""),
+            "section": cohort.get("section", ""),
+        }
+        stats = stats.filter(**keys)
+        rankings = rankings.filter(**keys).order_by("class_rank", "student_id")
+    elif scope == CohortStatistics.DEPARTMENT:
+        stats = stats.filter(department=cohort.get("department"))
+        rankings = rankings.filter(department=cohort.get("department")).order_by(
+            "department_rank", "student_id"
+        )
+    else:
+        rankings = rankings.order_by("school_rank", "student_id")
+    return stats.first(), rankings
+
+
+def student_rankings(student):
+    """Return ``{exam name: ExamRanking}`` for one student.
+
+    From the last snapshot; ``ranking.exam.rankings_refreshed_at`` says when
+    it was taken.
+    """
+    return {
+        ranking.exam.name: ranking
+        for ranking in student.rankings.select_related("exam")
+    }
@@ -0,0 +1,133 @@
+"""Cached exam results for the student results page.
+
+During result publication every student opens ``/student/results/`` within
+a short window, so the per-exam dict built for ``Students/results.html`` is
+cached per student. The cache key carries a version stamp per student that
+is bumped whenever one of their marks changes, plus a school-wide stamp for
+changes that affect everyone (grading scales, subject and exam names).
+
+The view also passes ``results_version`` to the template so the rendered
+table can be cached as a fragment under the same key::
+
+    {% load cache %}
+    {% cache 3600 student_results student.pk results_version %}...{% endcache %}
+
+The ``a``-prefixed functions are the same for the async view.
+"""
+
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from .asyncqueries import fetch_all
+from .summaries import rebuild_summaries
+
+RESULTS_CACHE_TIMEOUT = 60 * 60
+
+
+def _stamp(scope):
+    return cache.get_or_set(f"results-version:{scope}", time.time_ns, None)
+
+
+def results_version(student_id):
+    """Return the version string of a student's cached results."""
+    return f"{_stamp('all')}-{_stamp(student_id)}"
+
+
+async def _astamp(scope):
+    return await cache.aget_or_set(f"results-version:{scope}", time.time_ns, None)
+
+
+async def aresults_version(student_id):
+    """Async :func:`results_version`."""
+    everyone, own = await asyncio.gather(_astamp("all"), _astamp(student_id))
+    return f"{everyone}-{own}"
+
+
+def invalidate_results(student_ids=None):
+    """Drop the cached results of ``student_ids``, or of everyone if None."""
+    scopes = ["all"] if student_ids is None else set(student_ids)
+    now = time.time_ns()
+    cache.set_many({f"results-version:{scope}": now for scope in scopes}, None)
+
+
+def _result_queries(student):
+    marks = (
+        student.marks.with_grades(
+            percent_name="subject_percent", grade_name="subject_grade"
+        )
+        .select_related("subject", "exam")
+        .order_by("exam__name", "subject__name")
+    )
+    summaries = student.result_summaries.select_related("exam")
+    return marks, summaries
+
+
+def _summaries_stale(marks, summaries):
+    # Summaries missing or stale (e.g. marks imported before they existed).
+    return {m.exam_id for m in marks} != {summary.exam_id for summary in summaries}
+
+
+def build_exam_results(student):
+    """Return ``{exam name: {"marks", "total_score", ...}}`` for a student.
+
+    Exam totals, percentages and grades come from the materialized
+    summaries; only the marks themselves are read for the subject rows.
+    """
+    marks, summaries = _result_queries(student)
+    marks, summaries = list(marks), list(summaries)
+    if _summaries_stale(marks, summaries):
+        rebuild_summaries([student.pk])
+        summaries = list(_result_queries(student)[1])
+    return _exams(marks, summaries)
+
+
+async def abuild_exam_results(student):
+    """Async :func:`build_exam_results`."""
+    # Building the mark queryset may read the grade bands from the database.
+    queries = await sync_to_async(_result_queries)(student)
+    marks, summaries = await fetch_all(*queries)
+    if _summaries_stale(marks, summaries):
+        await sync_to_async(rebuild_summaries)([student.pk])
+        (summaries,) = await fetch_all(_result_queries(student)[1])
+    return _exams(marks, summaries)
+
+
+def _exams(marks, summaries):
+    exams = {}
+    for summary in sorted(summaries, key=lambda summary: summary.exam.name):
+        exams[summary.exam.name] = {
+            "marks": [],
+            "total_score": summary.total_score,
+            "max_total": summary.max_total,
+            "percent": summary.percent,
+            "grade": summary.grade,
+        }
+    for m in marks:
+        # subject_percent/subject_grade are computed by the database
+        exams[m.exam.name]["marks"].append(m)
+    return exams
+
+
+def get_exam_results(student):
+    """Return ``(exams, version)``, building the exams only on a cache miss."""
+    version = results_version(student.pk)
+    key = f"results:{student.pk}:{version}"
+    exams = cache.get(key)
+    if exams is None:
+        exams = build_exam_results(student)
+        cache.set(key, exams, RESULTS_CACHE_TIMEOUT)
+    return exams, version
+
+
+async def aget_exam_results(student):
+    """Async :func:`get_exam_results`."""
+    version = await aresults_version(student.pk)
+    key = f"results:{student.pk}:{version}"
+    exams = await cache.aget(key)
+    if exams is None:
+        exams = await abuild_exam_results(student)
+        await cache.aset(key, exams, RESULTS_CACHE_TIMEOUT)
+    return exams, version
@@ -0,0 +1,193 @@
+"""Name and identifier search for students and teachers.
+
+``icontains`` filters over several columns turn every search into a full
+table scan. Instead each record is indexed as a set of normalized tokens
+(lower-cased, accents and punctuation stripped) and a query matches records
+having, for every query term, a token that starts with it.
+
+On SQLite with FTS5 the tokens live in the ``student_search_fts`` virtual
+table (created by migration 0013); elsewhere they are ``SearchToken`` rows
+and a prefix becomes a range scan on the (kind, token) index. Both are
+kept in sync by the Student/Teacher signals; code writing those models in
+bulk must call :func:`index_objects` itself, and ``manage.py
+rebuild_search_index`` rebuilds everything.
+"""
+
+import re
+import unicodedata
+
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+
+from .models import SearchToken, Student, Teacher
+
+FTS_TABLE = "student_search_fts"
+MAX_TOKEN_LENGTH = 64
+MAX_QUERY_TERMS = 8
+
+# kind -> (model, indexed fields, rowid offset in the FTS table)
+SEARCH_KINDS = {
+    "student": (
+        Student,
+        ("first_name", "last_name", "student_id", "admission_number"),
+        0,
+    ),
+    "teacher": (Teacher, ("first_name", "last_name", "teacher_id", "email"), 1),
+}
+_WORD_RE = re.compile(r"[^\W_]+")
+
+_fts_available = {}
+
+
+def _kind_for(model):
+    for kind, (kind_model, _, _) in SEARCH_KINDS.items():
+        if issubclass(model, kind_model):
+            return kind
+    raise ValueError(f"{model.__name__} is not searchable.")
+
+
+def _rowid(kind, pk):
+    # One FTS table serves both kinds, so row ids interleave them.
+    return pk * len(SEARCH_KINDS) + SEARCH_KINDS[kind][2]
+
+
+def normalize(value):
+    """Return the words of ``value``, lower-cased and without accents."""
+    value = unicodedata.normalize("NFKD", str(value or ""))
+    value = "".join(char for char in value if not unicodedata.combining(char))
+    return _WORD_RE.findall(value.lower())
+
+
+def tokens_for(obj, fields):
+    """Return the search tokens of ``obj``.
+
+    Besides each word, every tail of a multi-word value is indexed run
+    together, so ``ADM/2024/15`` matches ``adm2024``, ``2024/15`` and ``15``.
+    """
+    tokens = set()
+    for field in fields:
+        words = normalize(getattr(obj, field))
+        for start in range(len(words)):
+            tokens.add("".join(words[start:])[:MAX_TOKEN_LENGTH])
+            tokens.add(words[start][:MAX_TOKEN_LENGTH])
+    return tokens
+
+
+def query_terms(query):
+    """Split a search query into normalized terms (``jane.doe@`` -> ``janedoe``)."""
+    terms = ["".join(normalize(part)) for part in str(query).split()]
+    return [term[:MAX_TOKEN_LENGTH] for term in terms if term][:MAX_QUERY_TERMS]
+
+
+def fts_available():
+    alias = connection.alias
+    if alias not in _fts_available:
+        _fts_available[alias] = (
+            connection.vendor == "sqlite"
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_available[alias]
+
+
+def remove_objects(kind, pks):
+    pks = list(pks)
+    if not pks:
+        return
+    if fts_available():
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s",
+                [(_rowid(kind, pk),) for pk in pks],
+            )
+    else:
+        SearchToken.objects.filter(kind=kind, object_id__in=pks).delete()
+
+
+def index_objects(kind, objects):
+    """(Re)index saved ``objects`` of one kind."""
+    objects = list(objects)
+    if not objects:
+        return
+    fields = SEARCH_KINDS[kind][1]
+    with transaction.atomic():
+        remove_objects(kind, [obj.pk for obj in objects])
+        if fts_available():
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f"INSERT INTO {FTS_TABLE} (rowid, kind, body, object_id) "
+                    "VALUES (%s, %s, %s, %s)",
+                    [
+                        (
+                            _rowid(kind, obj.pk),
+                            kind,
+                            " ".join(sorted(tokens_for(obj, fields))),
+                            obj.pk,
+                        )
+                        for obj in objects
+                    ],
+                )
+        else:
+            SearchToken.objects.bulk_create(
+                (
+                    SearchToken(kind=kind, object_id=obj.pk, token=token)
+                    for obj in objects
+                    for token in tokens_for(obj, fields)
+                ),
+                batch_size=1000,
+            )
+
+
+def rebuild_index(kinds=None, batch_size=1000):
+    """Re-index every record of ``kinds`` (all kinds by default)."""
+    counts = {}
+    for kind in kinds or SEARCH_KINDS:
+        model, fields, _ = SEARCH_KINDS[kind]
+        with transaction.atomic():
+            if fts_available():
+                with connection.cursor() as cursor:
+                    cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE kind = %s", [kind])
+            else:
+                SearchToken.objects.filter(kind=kind).delete()
+            batch = []
+            counts[kind] = 0
+            for obj in model.objects.only("pk", *fields).iterator(
+                chunk_size=batch_size
+            ):
+                batch.append(obj)
+                if len(batch) >= batch_size:
+                    index_objects(kind, batch)
+                    counts[kind] += len(batch)
+                    batch = []
+            index_objects(kind, batch)
+            counts[kind] += len(batch)
+    return counts
+
+
+def search(queryset, query):
+    """Narrow a Student or Teacher ``queryset`` to records matching ``query``.
+
+    Every term of the query must prefix-match one of the record's tokens.
+    A query without any searchable characters leaves ``queryset`` as is.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return queryset
+    kind = _kind_for(queryset.model)
+    if fts_available():
+        # Terms only contain letters and digits, so quoting them is enough.
+        match = " AND ".join(
+            [f"kind : {kind}"] + [f'body : "{term}"*' for term in terms]
+        )
+        return queryset.filter(
+            pk__in=RawSQL(
+                f"SELECT object_id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+                [match],
+            )
+        )
+    for term in terms:
+        queryset = queryset.filter(
+            pk__in=SearchToken.objects.filter(
+                kind=kind, token__gte=term, token__lt=term + "\U0010ffff"
+            ).values("object_id")
+        )
+    return queryset
@@ -0,0 +1,199 @@
+"""Signal handlers that keep caches and derived data in sync with the models."""
+
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_init,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from home_auth.usercontext import invalidate_user_context
+
+from .dashboard import invalidate_dashboard, invalidate_department_dashboards
+from .grading import invalidate_grade_bands
+from .marks import invalidate_mark_grid
+from .metrics import invalidate_department_metrics
+from .rankings import mark_rankings_stale
+from .models import (
+    Assignment,
+    AssignmentSubmission,
+    AssignmentTarget,
+    Exam,
+    GradeBand,
+    GradingScale,
+    Mark,
+    Student,
+    Subject,
+    Teacher,
+)
+from .results import invalidate_results
+from .search import index_objects, remove_objects
+from .summaries import refresh_summaries, regrade_summaries
+
+
+@receiver(post_save, sender=Mark)
+@receiver(post_delete, sender=Mark)
+def mark_changed(sender, instance, **kwargs):
+    department_id = (
+        Student.objects.filter(pk=instance.student_id)
+        .values_list("department_id", flat=True)
+        .first()
+    )
+    invalidate_mark_grid(department_id)
+    invalidate_department_metrics(department_id)
+    invalidate_results([instance.student_id])
+    invalidate_dashboard([instance.student_id])
+
+    # Refresh the summary of the mark's exam, plus the one it was loaded with
+    # in case the edit moved it to another exam.
+    exam_ids = {instance.exam_id}
+    loaded_exam = getattr(instance, "_loaded_exam", None)
+    if loaded_exam:
+        exam_ids.add(loaded_exam)
+    refresh_summaries(instance.student_id, exam_ids)
+    instance._loaded_exam = instance.exam_id
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def grid_structure_changed(sender, instance, **kwargs):
+    invalidate_mark_grid(instance.department_id, structure=True)
+    invalidate_department_metrics(structure=True)
+    if sender is Subject:
+        # Subject names are shown on every student's results.
+        invalidate_results()
+        invalidate_dashboard()
+    else:
+        # The department decides the student's subject count.
+        invalidate_dashboard([instance.pk])
+
+
+@receiver(post_save, sender=Student)
+@receiver(pre_delete, sender=Student)
+def student_cohort_changed(sender, instance, **kwargs):
+    # Class, section or department may have changed, or the student leaves.
+    mark_rankings_stale(instance.result_summaries.values("exam_id"))
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Teacher)
+def search_record_saved(sender, instance, **kwargs):
+    index_objects(sender.__name__.lower(), [instance])
+
+
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Teacher)
+def search_record_deleted(sender, instance, **kwargs):
+    remove_objects(sender.__name__.lower(), [instance.pk])
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+@receiver(post_save, sender=Teacher)
+@receiver(post_delete, sender=Teacher)
+def profile_changed(sender, instance, **kwargs):
+    # Which profiles a user has is cached (home_auth/usercontext.py); refresh
+    # it for the profile's user before and after this change.
+    owners = _profile_owners(instance) | instance._loaded_owners
+    invalidate_user_context(
+        user_ids=[value for kind, value in owners if kind == "user"],
+        usernames=[value for kind, value in owners if kind == "username"],
+    )
+    instance._loaded_owners = _profile_owners(instance)
+
+
+def _profile_owners(instance):
+    """The user id and admission number a profile resolves for, if loaded."""
+    owners = set()
+    if instance.__dict__.get("user_id"):
+        owners.add(("user", instance.__dict__["user_id"]))
+    if instance.__dict__.get("admission_number"):
+        owners.add(("username", instance.__dict__["admission_number"]))
+    return owners
+
+
+@receiver(post_init, sender=Student)
+@receiver(post_init, sender=Teacher)
+def profile_loaded(sender, instance, **kwargs):
+    instance._loaded_owners = _profile_owners(instance)
+
+
+@receiver(post_save, sender=Exam)
+@receiver(post_delete, sender=Exam)
+def exam_changed(sender, instance, **kwargs):
+    invalidate_department_metrics(structure=True)
+    invalidate_results()
+    invalidate_dashboard()
+
+
+@receiver(post_save, sender=Assignment)
+@receiver(pre_delete, sender=Assignment)
+def assignment_changed(sender, instance, **kwargs):
+    invalidate_department_metrics(instance.department_id)
+    invalidate_department_dashboards(
+        instance.targets.values_list("department_id", flat=True)
+    )
+    invalidate_dashboard(instance.assigned_students.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=AssignmentTarget)
+@receiver(post_delete, sender=AssignmentTarget)
+def assignment_target_changed(sender, instance, **kwargs):
+    # The target reaches students of its department, and of the one it was
+    # loaded with in case the edit moved it.
+    departments = {instance.department_id}
+    if hasattr(instance, "_loaded_department"):
+        departments.add(instance._loaded_department)
+    invalidate_department_dashboards(departments)
+    instance._loaded_department = instance.department_id
+    invalidate_department_metrics(
+        Assignment.objects.filter(pk=instance.assignment_id)
+        .values_list("department_id", flat=True)
+        .first()
+    )
+
+
+@receiver(m2m_changed, sender=Assignment.assigned_students.through)
+def assignment_students_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if reverse:
+        # Changed from the student side: instance is the Student.
+        invalidate_dashboard([instance.pk])
+        invalidate_department_metrics(structure=True)
+        return
+    invalidate_department_metrics(instance.department_id)
+    if action == "pre_clear":
+        invalidate_dashboard(instance.assigned_students.values_list("pk", flat=True))
+    else:
+        invalidate_dashboard(pk_set)
+
+
+@receiver(post_save, sender=AssignmentSubmission)
+@receiver(post_delete, sender=AssignmentSubmission)
+def submission_changed(sender, instance, **kwargs):
+    # The inbox counts are cached under the dashboard's version.
+    invalidate_dashboard([instance.student_id])
+
+
+@receiver(post_save, sender=GradingScale)
+@receiver(post_delete, sender=GradingScale)
+@receiver(post_save, sender=GradeBand)
+@receiver(post_delete, sender=GradeBand)
+def grading_scale_changed(sender, instance, **kwargs):
+    invalidate_grade_bands()
+    # Saving a scale with its bands in the admin fires this once per row; the
+    # table-wide regrade runs once, after the commit releases the write lock.
+    pending = transaction.get_connection().run_on_commit
+    if not any(func is _regrade for _, func, _ in pending):
+        transaction.on_commit(_regrade)
+
+
+def _regrade():
+    regrade_summaries()
+    invalidate_results()
@@ -0,0 +1,63 @@
+"""Slug allocation shared by model saves and bulk inserts.
+
+A slug is ``<first name>-<identifier>``; when that is taken the first free
+``<base>-1``, ``<base>-2``, ... is used. Instead of probing each candidate
+with its own ``exists()`` query, the taken slugs for a base are fetched with
+a single prefix query and the free one is picked in memory.
+"""
+
+from django.db.models import Q
+from django.utils.text import slugify
+
+
+def slug_base(first_name, identifier, default):
+    return slugify(f"{first_name}-{identifier}") or default
+
+
+def _first_free(base, taken):
+    slug, counter = base, 0
+    while slug in taken:
+        counter += 1
+        slug = f"{base}-{counter}"
+    return slug
+
+
+def allocate_slug(model, base, exclude_pk=None, field="slug"):
+    """Return a free slug for ``base`` using one query."""
+    taken = model._default_manager.filter(
+        Q(**{field: base}) | Q(**{f"{field}__startswith": f"{base}-"})
+    )
+    if exclude_pk is not None:
+        taken = taken.exclude(pk=exclude_pk)
+    return _first_free(base, set(taken.values_list(field, flat=True)))
+
+
+def allocate_slugs(model, bases, field="slug"):
+    """Return one free slug per entry of ``bases`` (in order) for bulk inserts.
+
+    One query finds which bases are already taken; only those bases, and
+    bases repeated within ``bases``, need a prefix query for their numbered
+    variants. Slugs handed out here are also reserved against each other.
+    """
+    bases = list(bases)
+    manager = model._default_manager
+    taken = set(
+        manager.filter(**{f"{field}__in": set(bases)}).values_list(field, flat=True)
+    )
+    counts = {}
+    for base in bases:
+        counts[base] = counts.get(base, 0) + 1
+    for base, count in counts.items():
+        if base in taken or count > 1:
+            taken.update(
+                manager.filter(**{f"{field}__startswith": f"{base}-"}).values_list(
+                    field, flat=True
+                )
+            )
+
+    slugs = []
+    for base in bases:
+        slug = _first_free(base, taken)
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
@@ -0,0 +1,99 @@
+"""Materialized result summaries.
+
+``StudentResultSummary`` (per student and exam) holds the totals,
+percentage and grade that the results page and the rankings read, so they
+use one precomputed row per exam instead of re-aggregating every ``Mark``.
+
+Single mark saves and deletes refresh only the affected exam (see
+``student.signals``). Code that writes marks in bulk, bypassing the
+signals, must call :func:`rebuild_summaries` for the students it touched.
+
+There is no per-subject table: the student dashboard is the only page with
+per-subject figures, and it already loads the student's marks for its
+cards, history and activity chart. Its subject averages and trends are
+rolled up from those (``student.dashboard.subject_values``) and cached
+with the rest of the payload, so a table would only add a query and a
+write per mark.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+
+from .grading import get_grade_bands, grade_expression, letter_grade, percent
+from .models import Mark, StudentResultSummary
+from .rankings import mark_rankings_stale
+
+
+def _exam_values(marks, bands=None):
+    total_score = sum(mark.score for mark in marks)
+    max_total = sum(mark.max_score for mark in marks)
+    exam_percent = percent(total_score, max_total)
+    return {
+        "subject_count": len(marks),
+        "passed_count": sum(
+            1 for mark in marks if mark.max_score and mark.score >= 0.5 * mark.max_score
+        ),
+        "total_score": total_score,
+        "max_total": max_total,
+        "percent": exam_percent,
+        "grade": letter_grade(exam_percent, bands) or "N/A",
+    }
+
+
+def refresh_summaries(student_id, exam_ids=()):
+    """Recompute the summaries of one student for the given exams."""
+    marks = Mark.objects.filter(student_id=student_id)
+    for exam_id in set(exam_ids):
+        exam_marks = list(marks.filter(exam_id=exam_id))
+        if exam_marks:
+            StudentResultSummary.objects.update_or_create(
+                student_id=student_id,
+                exam_id=exam_id,
+                defaults=_exam_values(exam_marks),
+            )
+        else:
+            StudentResultSummary.objects.filter(
+                student_id=student_id, exam_id=exam_id
+            ).delete()
+    if exam_ids:
+        mark_rankings_stale(exam_ids)
+
+
+def rebuild_summaries(student_ids):
+    """Rebuild every summary row of ``student_ids`` from their marks."""
+    student_ids = list(student_ids)
+    if not student_ids:
+        return
+    by_exam = defaultdict(list)
+    marks = Mark.objects.filter(student_id__in=student_ids).order_by("student_id")
+    for mark in marks.iterator(chunk_size=2000):
+        by_exam[(mark.student_id, mark.exam_id)].append(mark)
+
+    bands = get_grade_bands()
+    with transaction.atomic():
+        # Exams losing a summary need new rankings too, not only the rebuilt.
+        mark_rankings_stale(
+            {exam_id for _, exam_id in by_exam}
+            | set(
+                StudentResultSummary.objects.filter(
+                    student_id__in=student_ids
+                ).values_list("exam_id", flat=True)
+            )
+        )
+        StudentResultSummary.objects.filter(student_id__in=student_ids).delete()
+        StudentResultSummary.objects.bulk_create(
+            StudentResultSummary(
+                student_id=student_id,
+                exam_id=exam_id,
+                **_exam_values(group, bands),
+            )
+            for (student_id, exam_id), group in by_exam.items()
+        )
+
+
+def regrade_summaries():
+    """Recompute stored exam grades in SQL after the grading scale changed."""
+    StudentResultSummary.objects.update(
+        grade=grade_expression("percent", default="N/A")
+    )
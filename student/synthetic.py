@@ -0,0 +1,300 @@
+"""Synthetic school data for load tests and benchmarks.
+
+:func:`generate_school` fills the database with departments, subjects,
+exams, teachers, parents, students, marks and assignments of configurable
+sizes. Everything is written with ``bulk_create`` in batches, so tens of
+thousands of students take seconds rather than minutes, and the same
+``seed`` always produces the same school.
+
+Derived data that the model signals would normally maintain (result
+summaries, search index, cached grids) is rebuilt once at the end.
+"""
+
+import random
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from home_auth.usercontext import invalidate_user_context
+
+from .dashboard import invalidate_dashboard
+from .marks import invalidate_mark_grid
+from .metrics import invalidate_department_metrics
+from .models import (
+    Assignment,
+    Department,
+    Exam,
+    Mark,
+    Parent,
+    Student,
+    Subject,
+    Teacher,
+)
+from .rankings import deferred_refresh
+from .results import invalidate_results
+from .search import rebuild_index
+from .slugs import allocate_slugs, slug_base
+from .summaries import rebuild_summaries
+
+BATCH_SIZE = 2000
+DEFAULT_PASSWORD = "school-bench"
+
+FIRST_NAMES = [
+    "Amina", "Ben", "Chen", "Diego", "Eva", "Farah", "George", "Hana", "Ivan",
+    "Jia", "Kofi", "Lena", "Malik", "Nora", "Omar", "Priya", "Quinn", "Rosa",
+    "Sami", "Tara", "Umar", "Vera", "Wei", "Yara", "Zane",
+]  # fmt: skip
+LAST_NAMES = [
+    "Adams", "Baker", "Costa", "Diaz", "Evans", "Fischer", "Garcia", "Haddad",
+    "Ito", "Jensen", "Khan", "Lopez", "Mensah", "Novak", "Okafor", "Patel",
+    "Rossi", "Silva", "Tanaka", "Usman", "Weber", "Yilmaz", "Zhou",
+]  # fmt: skip
+SECTIONS = ["A", "B", "C", "D"]
+
+
+def _batched(iterable, size=BATCH_SIZE):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _bulk_create(model, objects):
+    created = 0
+    for batch in _batched(objects):
+        model.objects.bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+def _with_slugs(model, objects, identifier_field, default):
+    bases = [
+        slug_base(obj.first_name, getattr(obj, identifier_field), default)
+        for obj in objects
+    ]
+    for obj, slug in zip(objects, allocate_slugs(model, bases)):
+        obj.slug = slug
+    return objects
+
+
+def _create_users(prefix, kind, count, password_hash, **flags):
+    User = get_user_model()
+    users = [
+        User(
+            username=f"{prefix.lower()}-{kind}{n}@school.test",
+            email=f"{prefix.lower()}-{kind}{n}@school.test",
+            password=password_hash,
+            **flags,
+        )
+        for n in range(count)
+    ]
+    _bulk_create(User, users)
+    return users
+
+
+def generate_school(
+    prefix="GEN",
+    departments=4,
+    subjects_per_department=6,
+    exams=3,
+    teachers=40,
+    students=2000,
+    assignments_per_department=10,
+    with_users=False,
+    password=DEFAULT_PASSWORD,
+    seed=0,
+    log=None,
+):
+    """Create a synthetic school and return ``{model name: rows created}``.
+
+    Identifiers, names and emails all start with ``prefix`` so several
+    generated schools can coexist. With ``with_users`` every teacher and
+    student gets a login ``<prefix>-teacher<n>@school.test`` /
+    ``<prefix>-student<n>@school.test`` with ``password``.
+    """
+    rng = random.Random(seed)
+    log = log or (lambda message: None)
+    counts = {}
+    started = time.perf_counter()
+
+    def step(name, count):
+        counts[name] = count
+        log(f"{name}: {count} ({time.perf_counter() - started:.1f}s)")
+
+    with transaction.atomic():
+        depts = [
+            Department(name=f"{prefix} Department {d}", code=f"{prefix}-D{d}")
+            for d in range(departments)
+        ]
+        step("departments", _bulk_create(Department, depts))
+
+        subjects = [
+            Subject(
+                name=f"{prefix} Subject {d}.{s}",
+                code=f"{prefix}-S{d}.{s}",
+                department=dept,
+            )
+            for d, dept in enumerate(depts)
+            for s in range(subjects_per_department)
+        ]
+        step("subjects", _bulk_create(Subject, subjects))
+        subjects_by_dept = {dept.pk: [] for dept in depts}
+        for subject in subjects:
+            subjects_by_dept[subject.department_id].append(subject)
+
+        exam_rows = [
+            Exam(name=f"{prefix} Exam {e}", date=date(2024, 1, 15) + timedelta(90 * e))
+            for e in range(exams)
+        ]
+        step("exams", _bulk_create(Exam, exam_rows))
+
+        password_hash = make_password(password) if with_users else None
+        teacher_users = (
+            _create_users(prefix, "teacher", teachers, password_hash, is_teacher=True)
+            if with_users
+            else [None] * teachers
+        )
+        teacher_rows = _with_slugs(
+            Teacher,
+            [
+                Teacher(
+                    user=teacher_users[t],
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=rng.choice(LAST_NAMES),
+                    teacher_id=f"{prefix}-T{t:05d}",
+                    email=f"{prefix.lower()}-teacher{t}@school.test",
+                    gender=rng.choice(["Male", "Female"]),
+                    department=depts[t % departments] if departments else None,
+                )
+                for t in range(teachers)
+            ],
+            "teacher_id",
+            "teacher",
+        )
+        step("teachers", _bulk_create(Teacher, teacher_rows))
+        Through = Teacher.subjects.through
+        _bulk_create(
+            Through,
+            (
+                Through(teacher_id=teacher.pk, subject_id=subject.pk)
+                for teacher in teacher_rows
+                if teacher.department_id
+                for subject in rng.sample(
+                    subjects_by_dept[teacher.department_id],
+                    min(2, subjects_per_department),
+                )
+            ),
+        )
+
+        # Roughly three parents for every four students (siblings share).
+        parents = [
+            Parent(
+                father_name=f"{rng.choice(FIRST_NAMES)} {last}",
+                father_occupation="Engineer",
+                father_mobile=f"07{p:08d}",
+                father_email=f"{prefix.lower()}-father{p}@school.test",
+                mother_name=f"{rng.choice(FIRST_NAMES)} {last}",
+                mother_occupation="Doctor",
+                mother_mobile=f"08{p:08d}",
+                mother_email=f"{prefix.lower()}-mother{p}@school.test",
+                present_address=f"{p} Example Street",
+            )
+            for p, last in (
+                (p, rng.choice(LAST_NAMES)) for p in range(max(students * 3 // 4, 1))
+            )
+        ]
+        step("parents", _bulk_create(Parent, parents))
+
+        student_users = (
+            _create_users(prefix, "student", students, password_hash, is_student=True)
+            if with_users
+            else [None] * students
+        )
+        student_rows = []
+        for n in range(students):
+            parent = rng.choice(parents)
+            student_rows.append(
+                Student(
+                    user=student_users[n],
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=parent.father_name.split()[-1],
+                    student_id=f"{prefix}-{n:06d}",
+                    admission_number=f"{prefix[:4]}{n:06d}",
+                    gender=rng.choice(["Male", "Female"]),
+                    date_of_birth=date(2008, 1, 1) + timedelta(rng.randrange(3650)),
+                    student_class=str(rng.randint(1, 12)),
+                    section=rng.choice(SECTIONS),
+                    joining_date=date(2020, 9, 1),
+                    mobile_number=parent.father_mobile,
+                    department=depts[n % departments] if departments else None,
+                    parent=parent,
+                )
+            )
+        _with_slugs(Student, student_rows, "student_id", "student")
+        step("students", _bulk_create(Student, student_rows))
+
+        marks = (
+            Mark(
+                student_id=student.pk,
+                subject_id=subject.pk,
+                exam_id=exam.pk,
+                score=min(100, max(0, int(rng.gauss(65, 15)))),
+                max_score=100,
+            )
+            for student in student_rows
+            if student.department_id
+            for exam in exam_rows
+            for subject in subjects_by_dept[student.department_id]
+        )
+        step("marks", _bulk_create(Mark, marks))
+
+        students_by_dept = {dept.pk: [] for dept in depts}
+        for student in student_rows:
+            if student.department_id:
+                students_by_dept[student.department_id].append(student.pk)
+        assignment_rows = [
+            Assignment(
+                title=f"{prefix} Assignment {d}.{a}",
+                description="Generated assignment.",
+                department=dept,
+                due_date=date(2024, 9, 1) + timedelta(7 * a),
+            )
+            for d, dept in enumerate(depts)
+            for a in range(assignments_per_department)
+        ]
+        step("assignments", _bulk_create(Assignment, assignment_rows))
+        Through = Assignment.assigned_students.through
+        _bulk_create(
+            Through,
+            (
+                Through(assignment_id=assignment.pk, student_id=student_pk)
+                for assignment in assignment_rows
+                for student_pk in rng.sample(
+                    students_by_dept[assignment.department_id],
+                    min(30, len(students_by_dept[assignment.department_id])),
+                )
+            ),
+        )
+
+    # bulk_create bypasses the signals: rebuild the derived data once.
+    student_pks = [student.pk for student in student_rows]
+    with deferred_refresh():
+        for batch in _batched(student_pks, 500):
+            rebuild_summaries(batch)
+        log(f"summaries rebuilt ({time.perf_counter() - started:.1f}s)")
+    log(f"rankings rebuilt ({time.perf_counter() - started:.1f}s)")
+    rebuild_index()
+    log(f"search index rebuilt ({time.perf_counter() - started:.1f}s)")
+    invalidate_mark_grid(structure=True)
+    invalidate_department_metrics(structure=True)
+    invalidate_results()
+    invalidate_dashboard()
+    invalidate_user_context()
+    return counts
@@ -1,3 +1,1262 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+from datetime import date, datetime, timedelta
+from unittest import mock, skipIf
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.http import HttpRequest
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from home_auth.models import CustomUser
+from home_auth.usercontext import resolve_user_context
+
+from .assignments import add_target, assignment_counts, submit_assignment
+from .checks import LOCMEM_BACKEND, check_shared_cache
+from .dashboard import dashboard_version, get_dashboard
+from .exports import XLSX_CONTENT_TYPE
+from .grading import letter_grade
+from .importers import StudentImporter, import_students
+from .metrics import department_metrics
+from .models import (
+    Assignment,
+    AssignmentSubmission,
+    AssignmentTarget,
+    CohortStatistics,
+    Department,
+    Exam,
+    GradeBand,
+    GradingScale,
+    Mark,
+    Parent,
+    SearchToken,
+    Student,
+    StudentResultSummary,
+    Subject,
+    Teacher,
+)
+from .pagination import paginate_keyset_nulls_last
+from .querybudget import get_budgets, query_budget
+from .rankings import exam_rankings
+from .search import fts_available, rebuild_index, search
+from .slugs import allocate_slug, allocate_slugs
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+STUDENTS = 8
+
+
+class QueryBudgetTests(TestCase):
+    """Every budgeted view stays within its QUERY_BUDGETS entry.
+
+    The school has several students, subjects and marks, so a query run once
+    per row shows up as a repeat (see student/querybudget.py).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        # Runs the ranking refresh the marks schedule for their commit.
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.create_school()
+
+    @classmethod
+    def create_school(cls):
+        cls.department = Department.objects.create(name="Science", code="SCI")
+        cls.subjects = [
+            Subject.objects.create(
+                name=name, code=name[:3], department=cls.department, is_approved=True
+            )
+            for name in ("Physics", "Chemistry", "Biology")
+        ]
+        cls.exam = Exam.objects.create(name="Midterm", date=date(2024, 3, 1))
+        parent = Parent.objects.create(
+            father_name="F",
+            father_occupation="O",
+            father_mobile="1",
+            father_email="f@school.test",
+            mother_name="M",
+            mother_occupation="O",
+            mother_mobile="2",
+            mother_email="m@school.test",
+            present_address="Street 1",
+        )
+        cls.student_user = CustomUser.objects.create_user(
+            "student@school.test", "student@school.test", "pw", is_student=True
+        )
+        cls.students = [
+            Student.objects.create(
+                user=cls.student_user if i == 0 else None,
+                first_name=f"Student{i}",
+                last_name="Test",
+                student_id=f"S{i}",
+                gender="Male",
+                student_class="9",
+                section="A" if i % 2 else "B",
+                mobile_number=f"555{i}",
+                department=cls.department,
+                parent=parent,
+            )
+            for i in range(STUDENTS)
+        ]
+        for i, student in enumerate(cls.students):
+            for subject in cls.subjects:
+                Mark.objects.create(
+                    student=student,
+                    subject=subject,
+                    exam=cls.exam,
+                    score=40 + i * 5,
+                    max_score=100,
+                )
+        cls.teacher_user = CustomUser.objects.create_user(
+            "teacher@school.test", "teacher@school.test", "pw", is_teacher=True
+        )
+        cls.teacher = Teacher.objects.create(
+            user=cls.teacher_user,
+            first_name="Tess",
+            last_name="Teacher",
+            teacher_id="T1",
+            email="teacher@school.test",
+            department=cls.department,
+        )
+        cls.admin = CustomUser.objects.create_superuser(
+            "admin@school.test", "admin@school.test", "pw"
+        )
+        for offset in (-2, 3, 7):
+            assignment = Assignment.objects.create(
+                title=f"Homework {offset}",
+                due_date=date.today() + timedelta(days=offset),
+                department=cls.department,
+                created_by=cls.teacher_user,
+            )
+            add_target(assignment, department=cls.department)
+        cls.assignment = assignment
+
+    def setUp(self):
+        # Budgets hold for cold caches.
+        cache.clear()
+
+    def login(self, user):
+        """Log in with the user context already cached, as it is from the
+        second request of a visit on."""
+        self.client.force_login(user)
+        request = HttpRequest()
+        request.user = user
+        resolve_user_context(request)
+
+    def request(self, name, user, kwargs=None, query="", method="get", **extra):
+        self.login(user)
+        url = reverse(name, kwargs=kwargs) + query
+        # Work deferred to the commit (e.g. ranking refreshes) counts too.
+        with query_budget(name), self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(url, **extra)
+        self.assertLess(response.status_code, 400, f"{name}: {response.status_code}")
+        return response
+
+    def test_every_budget_is_covered(self):
+        covered = {
+            name
+            for name in dir(self)
+            if name.startswith("test_") and name != "test_every_budget_is_covered"
+        }
+        missing = [name for name in get_budgets() if f"test_{name}" not in covered]
+        self.assertEqual(missing, [])
+
+    def test_student_list(self):
+        self.request("student_list", self.admin)
+
+    def test_student_list_api(self):
+        self.request("student_list_api", self.admin)
+
+    def test_student_list_api_is_for_teachers_and_admins(self):
+        url = reverse("student_list_api")
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.student_user)
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.teacher_user)
+        self.assertEqual(len(self.client.get(url).json()["results"]), STUDENTS)
+
+    def test_student_dashboard(self):
+        self.request("student_dashboard", self.student_user)
+
+    def test_teacher_dashboard(self):
+        self.request("teacher_dashboard", self.teacher_user)
+
+    def test_teacher_dashboard_api(self):
+        self.request("teacher_dashboard_api", self.teacher_user)
+
+    def test_student_details(self):
+        self.request("student_details", self.admin, {"pk": self.students[0].pk})
+
+    def test_update_mark(self):
+        self.request(
+            "update_mark",
+            self.teacher_user,
+            {"student_id": self.students[0].pk},
+            f"?subject={self.subjects[0].name}&exam={self.exam.name}",
+        )
+
+    def test_student_results(self):
+        self.request("student_results", self.student_user)
+
+    def test_edit_student(self):
+        self.request("edit_student", self.admin, {"slug": self.students[0].slug})
+
+    def test_teacher_list(self):
+        self.request("teacher_list", self.admin)
+
+    def test_teacher_list_api(self):
+        self.request("teacher_list_api", self.admin)
+
+    def test_teacher_details(self):
+        self.request("teacher_details", self.admin, {"pk": self.teacher.pk})
+
+    def test_edit_teacher(self):
+        self.request("edit_teacher", self.admin, {"slug": self.teacher.slug})
+
+    def test_teacher_marks(self):
+        self.request("teacher_marks", self.teacher_user)
+
+    def test_bulk_update_marks(self):
+        scores = [
+            {"student": student.pk, "subject": subject.pk, "score": 75}
+            for student in self.students
+            for subject in self.subjects
+        ]
+        self.request(
+            "bulk_update_marks",
+            self.teacher_user,
+            method="post",
+            data=json.dumps({"exam_name": self.exam.name, "scores": scores}),
+            content_type="application/json",
+        )
+        self.assertEqual(
+            Mark.objects.filter(exam=self.exam, score=75).count(),
+            STUDENTS * len(self.subjects),
+        )
+        # The rankings were rebuilt once the marks were committed.
+        self.exam.refresh_from_db()
+        self.assertFalse(self.exam.rankings_stale)
+        self.assertEqual(
+            set(self.exam.rankings.values_list("school_rank", flat=True)), {1}
+        )
+
+    def test_department_list(self):
+        self.request("department_list", self.teacher_user)
+
+    def test_subject_list(self):
+        self.request("subject_list", self.teacher_user)
+
+    def test_teachers_in_department(self):
+        self.request("teachers_in_department", self.teacher_user)
+
+    def test_teacher_details_public(self):
+        self.request(
+            "teacher_details_public", self.teacher_user, {"slug": self.teacher.slug}
+        )
+
+    def test_create_assignment(self):
+        self.request("create_assignment", self.teacher_user)
+
+    def test_create_assignment_for_teacher(self):
+        self.request(
+            "create_assignment_for_teacher",
+            self.teacher_user,
+            {"slug": self.teacher.slug},
+        )
+
+    def test_my_assignments(self):
+        self.request("my_assignments", self.student_user)
+
+    def test_my_assignments_api(self):
+        self.request("my_assignments_api", self.student_user)
+
+    def test_submit_my_assignment(self):
+        self.request(
+            "submit_my_assignment",
+            self.student_user,
+            {"pk": self.assignment.pk},
+            method="post",
+        )
+
+    def test_exam_rankings_api(self):
+        self.request("exam_rankings_api", self.teacher_user, {"exam_id": self.exam.pk})
+
+    def test_export_students(self):
+        self.request("export_students", self.admin)
+
+    def test_export_exam_marks(self):
+        self.request("export_exam_marks", self.admin, {"exam_id": self.exam.pk})
+
+    def test_export_department_results(self):
+        self.request(
+            "export_department_results",
+            self.admin,
+            {"department_id": self.department.pk},
+        )
+
+
+class GradingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name="Arts", code="ART")
+        cls.subject = Subject.objects.create(
+            name="Music", code="MUS", department=department
+        )
+        cls.exam = Exam.objects.create(name="Final")
+        cls.student = Student.objects.create(
+            first_name="Sam",
+            last_name="Test",
+            student_id="G1",
+            gender="Female",
+            student_class="10",
+            department=department,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_python_and_sql_grades_agree_below_every_band(self):
+        # No band starts at 0, so 10% is below all of them.
+        bands = [(80, "A"), (40, "P")]
+        for score, max_score in [(90, 100), (50, 100), (10, 100), (5, 0)]:
+            Mark.objects.update_or_create(
+                student=self.student,
+                subject=self.subject,
+                exam=self.exam,
+                defaults={"score": score, "max_score": max_score},
+            )
+            mark = Mark.objects.with_grades(bands).get()
+            self.assertEqual(mark.grade, letter_grade(mark.percent, bands))
+
+    def test_scale_change_regrades_once_after_commit(self):
+        Mark.objects.create(
+            student=self.student, subject=self.subject, exam=self.exam, score=85
+        )
+        self.assertEqual(StudentResultSummary.objects.get().grade, "A")
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            scale = GradingScale.objects.get(is_default=True)
+            scale.bands.all().delete()
+            GradeBand.objects.create(scale=scale, letter="P", min_percent=50)
+            GradeBand.objects.create(scale=scale, letter="F", min_percent=0)
+            self.assertEqual(StudentResultSummary.objects.get().grade, "A")
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(StudentResultSummary.objects.get().grade, "P")
+
+
+class RankingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name="Languages", code="LAN")
+        cls.subject = Subject.objects.create(
+            name="French", code="FRE", department=department
+        )
+        cls.exam = Exam.objects.create(name="Oral")
+        cls.marks = {}
+        with cls.captureOnCommitCallbacks(execute=True):
+            for name, student_class, score in [
+                ("a", "5", 90),
+                ("b", "5", 80),
+                ("c", "6", 80),
+                ("d", "6", 60),
+                ("e", "6", 40),
+            ]:
+                student = Student.objects.create(
+                    first_name=name,
+                    last_name="Test",
+                    student_id=f"K{name}",
+                    gender="Other",
+                    student_class=student_class,
+                    department=department,
+                )
+                cls.marks[name] = Mark.objects.create(
+                    student=student, subject=cls.subject, exam=cls.exam, score=score
+                )
+
+    def ranks(self, *fields):
+        rankings = self.exam.rankings.order_by("student__first_name")
+        return {
+            ranking.student.first_name: tuple(getattr(ranking, f) for f in fields)
+            for ranking in rankings.select_related("student")
+        }
+
+    def test_ties_share_a_rank_and_percentiles_count_those_below(self):
+        self.assertEqual(
+            self.ranks("school_rank", "school_percentile", "class_rank"),
+            {
+                "a": (1, 100.0, 1),
+                "b": (2, 50.0, 2),
+                "c": (2, 50.0, 1),
+                "d": (4, 25.0, 2),
+                "e": (5, 0.0, 3),
+            },
+        )
+
+    def test_cohort_statistics(self):
+        school, _ = exam_rankings(self.exam)
+        self.assertEqual(
+            (school.count, school.mean, school.median, school.stddev),
+            (5, 70.0, 80.0, 17.89),
+        )
+        self.assertEqual(
+            (school.minimum, school.maximum, school.pass_rate), (40, 90, 80)
+        )
+        sixth, rankings = exam_rankings(
+            self.exam, CohortStatistics.CLASS, {"student_class": "6"}
+        )
+        self.assertEqual((sixth.count, sixth.mean), (3, 60.0))
+        self.assertEqual([r.student.first_name for r in rankings], ["c", "d", "e"])
+
+    def test_mark_change_refreshes_the_exam_on_commit(self):
+        mark = self.marks["e"]
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            mark.score = 95
+            mark.save()
+            self.assertEqual(self.ranks("school_rank")["e"], (5,))
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.ranks("school_rank")["e"], (1,))
+        self.exam.refresh_from_db()
+        self.assertFalse(self.exam.rankings_stale)
+
+
+class InboxPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name="History", code="HIS")
+        cls.student = Student.objects.create(
+            first_name="Ida",
+            last_name="Test",
+            student_id="P1",
+            gender="Female",
+            student_class="8",
+            department=department,
+        )
+        due_dates = [date(2024, 5, day) for day in (3, 1, 2, 2)] + [None] * 3
+        for i, due_date in enumerate(due_dates):
+            assignment = Assignment.objects.create(title=f"A{i}", due_date=due_date)
+            add_target(assignment, department=department)
+        inbox = Assignment.objects.inbox(cls.student)
+        cls.expected = list(
+            inbox.order_by("due_key", "pk").values_list("pk", flat=True)
+        )
+
+    def pages(self, **cursor):
+        inbox = Assignment.objects.inbox(self.student)
+        return paginate_keyset_nulls_last(inbox, "due_date", page_size=3, **cursor)
+
+    def test_pages_run_through_undated_assignments_and_back(self):
+        forward, page = [], self.pages()
+        while True:
+            forward.append([a.pk for a in page])
+            if not page.has_next:
+                break
+            page = self.pages(after=page.next_cursor)
+        self.assertEqual(sum(forward, []), self.expected)
+        self.assertEqual(len(forward), 3)
+
+        backward = []
+        while page.has_previous:
+            page = self.pages(before=page.previous_cursor)
+            backward.insert(0, [a.pk for a in page])
+        self.assertEqual(backward, forward[:-1])
+
+    def test_dated_assignments_are_read_along_the_due_date_index(self):
+        dated = Assignment.objects.inbox(self.student).filter(due_date__isnull=False)
+        plan = dated.order_by("due_date", "pk").explain()
+        self.assertIn("assignment_due_idx", plan)
+
+
+class AssignmentTargetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.science = Department.objects.create(name="Physics", code="PHY")
+        cls.arts = Department.objects.create(name="Drama", code="DRA")
+        groups = {
+            "9A": (cls.science, "9", "A"),
+            "9B": (cls.science, "9", "B"),
+            "10A": (cls.science, "10", "A"),
+            "arts": (cls.arts, "9", "A"),
+        }
+        cls.students = {
+            name: Student.objects.create(
+                first_name=name,
+                last_name="Test",
+                student_id=f"R{name}",
+                gender="Other",
+                department=department,
+                student_class=student_class,
+                section=section,
+            )
+            for name, (department, student_class, section) in groups.items()
+        }
+
+    def setUp(self):
+        cache.clear()
+
+    def targeted(self, **target):
+        assignment = Assignment.objects.create(title="Essay")
+        add_target(assignment, **target)
+        return {
+            name
+            for name, student in self.students.items()
+            if Assignment.objects.for_student(student).filter(pk=assignment.pk)
+        }
+
+    def test_targets_match_department_class_and_section(self):
+        self.assertEqual(self.targeted(), {"9A", "9B", "10A", "arts"})
+        self.assertEqual(self.targeted(department=self.science), {"9A", "9B", "10A"})
+        self.assertEqual(
+            self.targeted(department=self.science, student_class="9"), {"9A", "9B"}
+        )
+        self.assertEqual(
+            self.targeted(department=self.science, student_class="9", section="A"),
+            {"9A"},
+        )
+
+    def test_inbox_carries_the_submission_state(self):
+        student = self.students["9A"]
+        today = date.today()
+        assignments = {}
+        for name, due_date in [
+            ("pending", today + timedelta(days=1)),
+            ("overdue", today - timedelta(days=1)),
+            ("submitted", today - timedelta(days=1)),
+            ("graded", None),
+        ]:
+            assignments[name] = Assignment.objects.create(title=name, due_date=due_date)
+            add_target(assignments[name], department=self.science)
+        submit_assignment(assignments["submitted"], student)
+        graded = submit_assignment(assignments["graded"], student)
+        graded.status, graded.grade = AssignmentSubmission.GRADED, "A"
+        graded.save()
+
+        inbox = Assignment.objects.inbox(student)
+        self.assertEqual(
+            dict(inbox.values_list("title", "status")),
+            {name: name for name in assignments},
+        )
+        self.assertEqual(assignment_counts(student), dict.fromkeys(assignments, 1))
+        # Handing in again after grading keeps the grade.
+        submit_assignment(assignments["graded"], student)
+        self.assertEqual(inbox.get(title="graded").grade, "A")
+
+    def test_target_change_invalidates_only_its_department(self):
+        science, arts = self.students["9A"], self.students["arts"]
+        arts_version = dashboard_version(arts)
+        self.assertEqual(assignment_counts(science)[Assignment.PENDING], 0)
+
+        assignment = Assignment.objects.create(title="Lab report")
+        target = add_target(assignment, department=self.science)
+
+        self.assertEqual(assignment_counts(science)[Assignment.PENDING], 1)
+        self.assertEqual(dashboard_version(arts), arts_version)
+
+        # Retargeting drops the assignment from the old department too.
+        target = AssignmentTarget.objects.get(pk=target.pk)
+        target.department = self.arts
+        target.save()
+        self.assertEqual(assignment_counts(science)[Assignment.PENDING], 0)
+        self.assertEqual(assignment_counts(arts)[Assignment.PENDING], 1)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for first_name, last_name, student_id in [
+            ("Zoë", "Ångström", "ADM/2024/15"),
+            ("Zack", "Smith", "ADM/2023/7"),
+            ("Amir", "Zoller", "ADM/2024/16"),
+        ]:
+            Student.objects.create(
+                first_name=first_name,
+                last_name=last_name,
+                student_id=student_id,
+                gender="Other",
+                student_class="9",
+            )
+        Teacher.objects.create(
+            first_name="Zoe",
+            last_name="Taylor",
+            teacher_id="T7",
+            email="zoe.taylor@school.test",
+        )
+
+    def names(self, query, queryset=None):
+        queryset = (
+            Student.objects.order_by("first_name") if queryset is None else queryset
+        )
+        return [record.first_name for record in search(queryset, query)]
+
+    def check_queries(self):
+        # Every term must prefix-match a token, ignoring case and accents.
+        self.assertEqual(self.names("zo"), ["Amir", "Zoë"])
+        self.assertEqual(self.names("ZOE ang"), ["Zoë"])
+        self.assertEqual(self.names("zack angstrom"), [])
+        # Identifiers match by any tail of their parts.
+        self.assertEqual(self.names("adm2024"), ["Amir", "Zoë"])
+        self.assertEqual(self.names("2024/15"), ["Zoë"])
+        self.assertEqual(self.names("7"), ["Zack"])
+        # Teachers are indexed apart from students.
+        self.assertEqual(self.names("taylor"), [])
+        self.assertEqual(self.names("zoe.taylor@", Teacher.objects.all()), ["Zoe"])
+        # Matches come in the order of the list searched, not by relevance.
+        self.assertEqual(
+            self.names("z", Student.objects.order_by("-first_name")),
+            ["Zoë", "Zack", "Amir"],
+        )
+        self.assertEqual(self.names("./-"), ["Amir", "Zack", "Zoë"])
+
+    def test_fts_index(self):
+        if not fts_available():
+            self.skipTest("SQLite without FTS5")
+        self.check_queries()
+
+    def test_token_rows(self):
+        with mock.patch("student.search.fts_available", return_value=False):
+            rebuild_index()
+            self.assertTrue(SearchToken.objects.exists())
+            self.check_queries()
+
+    def test_renamed_record_is_reindexed(self):
+        student = Student.objects.get(first_name="Zack")
+        student.first_name = "Quentin"
+        student.save()
+
+        self.assertEqual(self.names("zack"), [])
+        self.assertEqual(self.names("quen"), ["Quentin"])
+
+
+class SlugTests(TestCase):
+    def student(self, first_name, student_id, **extra):
+        return Student.objects.create(
+            first_name=first_name,
+            last_name="Test",
+            student_id=student_id,
+            gender="Male",
+            **extra,
+        )
+
+    def test_taken_slugs_get_the_first_free_number(self):
+        self.student("Kim", "7")
+        self.student("Kim", "7", slug="kim-7-2")
+        # Only the exact base and its numbered variants count as taken.
+        self.student("Kim", "70")
+
+        self.assertEqual(self.student("Kim", "7").slug, "kim-7-1")
+        self.assertEqual(self.student("Kim", "7").slug, "kim-7-3")
+
+    def test_records_without_identifier_use_their_primary_key(self):
+        student = self.student("Kim", "")
+        self.assertEqual(student.slug, f"kim-{student.pk}")
+        self.assertEqual(Student.objects.get(pk=student.pk).slug, student.slug)
+
+    def test_batch_slugs_are_reserved_against_each_other(self):
+        self.student("Kim", "7")
+        bases = ["kim-7", "kim-7", "lee-8", "lee-8", "max-9"]
+
+        with self.assertNumQueries(3):
+            slugs = allocate_slugs(Student, bases)
+
+        self.assertEqual(slugs, ["kim-7-1", "kim-7-2", "lee-8", "lee-8-1", "max-9"])
+
+    def test_single_slug_is_one_query(self):
+        self.student("Kim", "7")
+        with self.assertNumQueries(1):
+            self.assertEqual(allocate_slug(Student, "kim-7"), "kim-7-1")
+
+
+def admission(student_id, first_name="Ann", father="Bob", mother="Cat", **extra):
+    """One import row, with a parent unless ``father`` is empty."""
+    row = {
+        "first_name": first_name,
+        "last_name": "Test",
+        "student_id": student_id,
+        "gender": "Female",
+        "student_class": "6",
+    }
+    if father:
+        row.update(
+            father_name=father,
+            mother_name=mother,
+            father_mobile=f"{father}-1",
+            mother_mobile=f"{mother}-2",
+        )
+    return {**row, **extra}
+
+
+class StudentImportTests(TestCase):
+    def run_import(self, rows, batch_size=500):
+        return StudentImporter(batch_size=batch_size).import_rows(rows)
+
+    def test_parents_are_shared_within_the_file_and_with_the_database(self):
+        existing = Parent.objects.create(
+            father_name="Dan",
+            mother_name="Eve",
+            father_mobile="Dan-1",
+            mother_mobile="Eve-2",
+        )
+        report = self.run_import(
+            [
+                admission("I1"),
+                # Names match case-insensitively.
+                admission("I2", father="bob", father_mobile="Bob-1"),
+                admission("I3", father="Dan", mother="Eve"),
+                admission("I4", father=""),
+            ],
+            batch_size=2,
+        )
+
+        self.assertEqual(report.errors, [])
+        self.assertEqual((report.parents_created, report.parents_reused), (1, 2))
+        parents = dict(Student.objects.values_list("student_id", "parent__father_name"))
+        self.assertEqual(parents, {"I1": "Bob", "I2": "Bob", "I3": "Dan", "I4": None})
+        self.assertEqual(Parent.objects.count(), 2)
+        self.assertEqual(existing.students.get().student_id, "I3")
+
+    def test_duplicate_student_ids_are_rejected(self):
+        Student.objects.create(
+            first_name="Old", last_name="Test", student_id="D1", gender="Male"
+        )
+        report = self.run_import(
+            [admission("D1"), admission("D2"), admission("D2"), admission("D2")],
+            batch_size=3,
+        )
+
+        self.assertEqual(
+            report.errors,
+            [
+                (2, "student_id: 'D1' already exists."),
+                (4, "student_id: 'D2' repeated in the file."),
+                # The next chunk finds it committed.
+                (5, "student_id: 'D2' already exists."),
+            ],
+        )
+        self.assertEqual(Student.objects.filter(student_id="D2").count(), 1)
+
+    def test_failed_chunk_is_rolled_back_alone(self):
+        rows = [
+            admission("F1"),
+            admission("F2", father="Gil"),
+            admission("F3", father="Hal"),
+            admission("F4", father="Hal"),
+            admission("F5", father="Hal"),
+            admission("F3"),
+        ]
+        # The second chunk fails after its rows were inserted.
+        with mock.patch(
+            "student.importers.index_objects",
+            side_effect=[None, DatabaseError("disk I/O error"), None],
+        ):
+            report = self.run_import(rows, batch_size=2)
+
+        self.assertEqual([row for row, _ in report.errors], [4, 5], report.errors)
+        self.assertIn("batch rolled back: disk I/O error", report.errors[0][1])
+        # Later chunks insert the rolled back parent again and may reuse the
+        # rolled back student IDs.
+        self.assertEqual(
+            sorted(Student.objects.values_list("student_id", flat=True)),
+            ["F1", "F2", "F3", "F5"],
+        )
+        self.assertEqual(Parent.objects.filter(father_name="Hal").count(), 1)
+        self.assertEqual(report.students_created, 4)
+
+    def test_slugs_are_allocated_against_the_table_and_the_batch(self):
+        Student.objects.create(
+            first_name="Ann", last_name="Test", student_id="X-1", gender="Female"
+        )
+        self.run_import([admission("x-1"), admission("X 1"), admission("X2")])
+
+        self.assertEqual(
+            dict(Student.objects.values_list("student_id", "slug")),
+            {
+                "X-1": "ann-x-1",
+                "x-1": "ann-x-1-1",
+                "X 1": "ann-x-1-2",
+                "X2": "ann-x2",
+            },
+        )
+
+    header = ["First_Name", "last_name", "student_id", "gender", "student_class"]
+
+    def imported(self, fileobj, name):
+        report = import_students(fileobj, name)
+        self.assertEqual((report.rows, report.errors), (1, []))
+        return Student.objects.values_list("student_id", "date_of_birth").get()
+
+    def test_csv_file(self):
+        lines = [
+            [*self.header, "date_of_birth"],
+            ["Cy", "Test", "C1", "Male", "6", "2012-04-05"],
+        ]
+        csv_file = io.BytesIO("\n".join(",".join(line) for line in lines).encode())
+
+        self.assertEqual(self.imported(csv_file, "in.csv"), ("C1", date(2012, 4, 5)))
+
+    @skipIf(openpyxl is None, "openpyxl is not installed")
+    def test_xlsx_file(self):
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append([*self.header, "date_of_birth"])
+        sheet.append(["Xa", "Test", "X1", "Female", 7, datetime(2013, 1, 2)])
+        sheet.append([None] * 6)  # blank rows are skipped
+        xlsx_file = io.BytesIO()
+        workbook.save(xlsx_file)
+        xlsx_file.seek(0)
+
+        self.assertEqual(self.imported(xlsx_file, "in.xlsx"), ("X1", date(2013, 1, 2)))
+
+
+class CachedPageTestCase(TestCase):
+    """Two departments with a student, subject and mark each."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.exam = Exam.objects.create(name="Term 1", date=date(2024, 2, 1))
+        cls.departments, cls.students, cls.marks = [], [], []
+        for code in ("ENG", "GEO"):
+            department = Department.objects.create(name=code.title(), code=code)
+            subject = Subject.objects.create(
+                name=f"{code} 1", code=code, department=department, is_approved=True
+            )
+            student = Student.objects.create(
+                first_name=code.title(),
+                last_name="Test",
+                student_id=f"C{code}",
+                gender="Other",
+                student_class="8",
+                department=department,
+            )
+            cls.departments.append(department)
+            cls.students.append(student)
+            cls.marks.append(
+                Mark.objects.create(
+                    student=student, subject=subject, exam=cls.exam, score=60
+                )
+            )
+        cls.assignment = Assignment.objects.create(
+            title="Map", due_date=date.today(), department=cls.departments[0]
+        )
+        add_target(cls.assignment, department=cls.departments[0])
+
+    def setUp(self):
+        cache.clear()
+
+    def assertCached(self, read):
+        with self.assertNumQueries(0):
+            return read()
+
+    def assertRebuilt(self, read):
+        with CaptureQueriesContext(connection) as queries:
+            result = read()
+        self.assertTrue(queries, "expected a rebuild, read from the cache")
+        return result
+
+    def tomorrow(self):
+        return mock.patch(
+            "django.utils.timezone.localdate",
+            return_value=date.today() + timedelta(days=1),
+        )
+
+
+class DashboardCacheTests(CachedPageTestCase):
+    def dashboard(self, index):
+        return get_dashboard(self.students[index])[0]
+
+    def average(self, index):
+        return self.dashboard(index)["performance_trends"][0]["latest_score"]
+
+    def test_mark_change_shows_on_the_next_read(self):
+        self.assertEqual((self.average(0), self.average(1)), (60, 60))
+        self.marks[0].score = 85
+        self.marks[0].save()
+
+        self.assertEqual(self.assertRebuilt(lambda: self.average(0)), 85)
+        self.assertEqual(self.assertCached(lambda: self.average(1)), 60)
+
+    def test_subject_and_exam_changes_reach_every_student(self):
+        subject = Subject.objects.get(code="GEO")
+        subject.name = "Maps"
+        for instance in (subject, self.exam):
+            self.dashboard(0), self.dashboard(1)
+            instance.save()
+            self.assertRebuilt(lambda: self.dashboard(0))
+            self.assertRebuilt(lambda: self.dashboard(1))
+        self.assertEqual(self.dashboard(1)["performance_trends"][0]["subject"], "Maps")
+
+    def test_date_rolls_pending_assignments_over(self):
+        cards = self.dashboard(0)["student_cards"]
+        self.assertEqual(cards["assignments_pending"], 1)
+
+        with self.tomorrow():
+            cards = self.assertRebuilt(lambda: self.dashboard(0))["student_cards"]
+        self.assertEqual(
+            (cards["assignments_pending"], cards["assignments_overdue"]), (0, 1)
+        )
+
+
+class DepartmentMetricsCacheTests(CachedPageTestCase):
+    def metrics(self, index=None):
+        department = None if index is None else self.departments[index]
+        return department_metrics(department)
+
+    def average(self, index=None):
+        coverage = self.metrics(index)["mark_coverage"]
+        return [row["average_percent"] for row in coverage]
+
+    def test_mark_change_bumps_only_its_department(self):
+        self.assertEqual((self.average(0), self.average(1)), ([60], [60]))
+        self.assertEqual(self.average(), [60, 60])
+        self.marks[0].score = 90
+        self.marks[0].save()
+
+        self.assertEqual(self.assertRebuilt(lambda: self.average(0)), [90])
+        self.assertEqual(self.assertCached(lambda: self.average(1)), [60])
+        # The school-wide view covers every department.
+        self.assertEqual(self.assertRebuilt(self.average), [90, 60])
+
+    def test_student_subject_and_exam_changes_bump_structure(self):
+        for instance in (self.students[0], self.marks[0].subject, self.exam):
+            self.metrics(0), self.metrics(1)
+            instance.save()
+            self.assertRebuilt(lambda: self.metrics(0))
+            self.assertRebuilt(lambda: self.metrics(1))
+
+    def test_date_rolls_upcoming_over(self):
+        upcoming = self.metrics(0)["upcoming_assignments"]
+        self.assertEqual([row["title"] for row in upcoming], ["Map"])
+
+        with self.tomorrow():
+            metrics = self.assertRebuilt(lambda: self.metrics(0))
+        self.assertEqual(metrics["upcoming_assignments"], [])
+
+
+@override_settings(ROOT_URLCONF="Home.asgi_urls")
+class AsyncViewTests(CachedPageTestCase):
+    """The async views Home.asgi_urls routes render what the sync ones do."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.student_user = CustomUser.objects.create_user(
+            "pupil@school.test", "pupil@school.test", "pw", is_student=True
+        )
+        Student.objects.filter(pk=cls.students[0].pk).update(user=cls.student_user)
+        cls.teacher_user = CustomUser.objects.create_user(
+            "tess@school.test", "tess@school.test", "pw", is_teacher=True
+        )
+        Teacher.objects.create(
+            user=cls.teacher_user,
+            first_name="Tess",
+            last_name="Teacher",
+            teacher_id="T1",
+            email="tess@school.test",
+            department=cls.departments[0],
+        )
+
+    def get_async(self, user, name):
+        async_to_sync(self.async_client.aforce_login)(user)
+        return async_to_sync(self.async_client.get)(reverse(name))
+
+    def get_sync(self, user, name):
+        cache.clear()
+        self.client.force_login(user)
+        with override_settings(ROOT_URLCONF="Home.urls"):
+            response = self.client.get(reverse(name))
+            self.assertEqual(response.resolver_match.func.__name__, name)
+        return response
+
+    def assertSameContext(self, user, name, keys):
+        response = self.get_async(user, name)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.resolver_match.func.__name__, f"{name}_async")
+        expected = self.get_sync(user, name)
+        for key in keys:
+            with self.subTest(key=key):
+                self.assertEqual(response.context[key], expected.context[key])
+        return response
+
+    def test_student_dashboard(self):
+        response = self.assertSameContext(
+            self.student_user,
+            "student_dashboard",
+            [
+                "student_cards",
+                "performance_trends",
+                "learning_history",
+                "calendar_events",
+                "learning_activity_scores",
+            ],
+        )
+        self.assertEqual(response.context["student_cards"]["assignments"], 1)
+
+    def test_teacher_dashboard(self):
+        response = self.assertSameContext(
+            self.teacher_user, "teacher_dashboard", ["department", "metrics"]
+        )
+        self.assertEqual(response.context["metrics"]["students"], 1)
+
+    def test_student_results(self):
+        response = self.assertSameContext(
+            self.student_user, "student_results", ["exams", "rankings"]
+        )
+        self.assertEqual(list(response.context["exams"]), ["Term 1"])
+
+    def test_redirects_users_without_a_profile(self):
+        for user, name in [
+            (self.student_user, "teacher_dashboard"),
+            (self.teacher_user, "student_results"),
+        ]:
+            with self.subTest(name=name):
+                response = self.get_async(user, name)
+                self.assertRedirects(
+                    response,
+                    reverse("student_dashboard"),
+                    fetch_redirect_response=False,
+                )
+
+
+class RootUrlconfTests(SimpleTestCase):
+    def root_urlconf(self, module, **environ):
+        env = {
+            key: value
+            for key, value in os.environ.items()
+            if key not in ("DJANGO_ROOT_URLCONF", "DJANGO_SETTINGS_MODULE")
+        }
+        code = (
+            f"import {module}; from django.conf import settings; "
+            "print(settings.ROOT_URLCONF)"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=settings.BASE_DIR,
+            env={**env, **environ},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return result.stdout.strip()
+
+    def test_asgi_serves_the_async_urlconf(self):
+        self.assertEqual(self.root_urlconf("Home.asgi"), "Home.asgi_urls")
+        self.assertEqual(self.root_urlconf("Home.wsgi"), "Home.urls")
+
+    def test_environment_overrides_the_urlconf(self):
+        self.assertEqual(
+            self.root_urlconf("Home.asgi", DJANGO_ROOT_URLCONF="Home.urls"),
+            "Home.urls",
+        )
+        self.assertEqual(
+            self.root_urlconf("Home.wsgi", DJANGO_ROOT_URLCONF="Home.asgi_urls"),
+            "Home.asgi_urls",
+        )
+
+
+class MarkEntryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name="Maths", code="MAT")
+        cls.subject = Subject.objects.create(
+            name="Algebra", code="ALG", department=department, is_approved=True
+        )
+        cls.student = Student.objects.create(
+            first_name="Lee",
+            last_name="Test",
+            student_id="U1",
+            gender="Male",
+            student_class="7",
+            department=department,
+        )
+        user = CustomUser.objects.create_user(
+            "algebra@school.test", "algebra@school.test", "pw", is_teacher=True
+        )
+        Teacher.objects.create(
+            user=user,
+            first_name="Ada",
+            last_name="Teacher",
+            teacher_id="T9",
+            email="algebra@school.test",
+            department=department,
+        )
+        cls.teacher_user = user
+
+    def post(self, score):
+        self.client.force_login(self.teacher_user)
+        url = reverse("update_mark", kwargs={"student_id": self.student.pk})
+        return self.client.post(
+            f"{url}?subject=Algebra&exam=Quiz 1", {"score": score, "max_score": 100}
+        )
+
+    def test_invalid_mark_does_not_create_the_exam(self):
+        response = self.post(150)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Exam.objects.filter(name="Quiz 1").exists())
+
+    def test_valid_mark_creates_the_exam(self):
+        response = self.post(80)
+
+        self.assertRedirects(response, reverse("teacher_marks"))
+        mark = Mark.objects.get(student=self.student)
+        self.assertEqual((mark.exam.name, mark.score), ("Quiz 1", 80))
+
+    def test_bulk_update_rejects_duplicate_cells(self):
+        self.client.force_login(self.teacher_user)
+        cell = {"student": self.student.pk, "subject": self.subject.pk}
+        response = self.client.post(
+            reverse("bulk_update_marks"),
+            json.dumps(
+                {
+                    "exam_name": "Quiz 2",
+                    "scores": [{**cell, "score": 40}, {**cell, "score": 90}],
+                }
+            ),
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(f"{self.student.pk}-{self.subject.pk}", response.json()["errors"])
+        self.assertFalse(Mark.objects.exists())
+
+
+class DepartmentParameterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser(
+            "head@school.test", "head@school.test", "pw"
+        )
+        cls.exam = Exam.objects.create(name="Mock")
+
+    def test_non_numeric_department_is_rejected(self):
+        self.client.force_login(self.admin)
+        urls = {
+            reverse("teacher_dashboard_api"): 404,
+            reverse("export_students"): 404,
+            reverse("export_exam_marks", kwargs={"exam_id": self.exam.pk}): 404,
+            reverse("exam_rankings_api", kwargs={"exam_id": self.exam.pk}): 400,
+        }
+        for url, status in urls.items():
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, {"department": "x1", "scope": "department"}
+                )
+                self.assertEqual(response.status_code, status)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser(
+            "head@school.test", "head@school.test", "pw"
+        )
+        cls.exam = Exam.objects.create(name="Term 1")
+        department = Department.objects.create(name="Science", code="SCI")
+        for index, name in enumerate(["Physics", "Biology"]):
+            subject = Subject.objects.create(
+                name=name, code=name[:3], department=department
+            )
+            for student_id, score in [("S1", 40 + index * 10), ("S2", 70)]:
+                student, _ = Student.objects.get_or_create(
+                    student_id=student_id,
+                    defaults={
+                        "first_name": "Ada" if student_id == "S1" else "Ben",
+                        "last_name": "Lee",
+                        "gender": "Other",
+                        "student_class": "9",
+                        "department": department,
+                    },
+                )
+                Mark.objects.create(
+                    student=student, subject=subject, exam=cls.exam, score=score
+                )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def export(self, **params):
+        url = reverse("export_exam_marks", kwargs={"exam_id": self.exam.pk})
+        return self.client.get(url, params)
+
+    def test_csv_mark_sheet(self):
+        response = self.export()
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn('.csv"', response["Content-Disposition"])
+        body = b"".join(response.streaming_content).decode("utf-8-sig")
+        rows = [row[:8] for row in csv.reader(io.StringIO(body))]
+        self.assertEqual(
+            rows,
+            [
+                ["Student ID", "First name", "Last name", "Class", "Section"]
+                + ["Biology", "Physics", "Total"],
+                ["S1", "Ada", "Lee", "9", "", "50", "40", "90"],
+                ["S2", "Ben", "Lee", "9", "", "70", "70", "140"],
+            ],
+        )
+
+    @skipIf(openpyxl is None, "openpyxl is not installed")
+    def test_xlsx_mark_sheet(self):
+        response = self.export(format="xlsx")
+
+        self.assertEqual(response["Content-Type"], XLSX_CONTENT_TYPE)
+        self.assertIn(".xlsx", response["Content-Disposition"])
+        workbook = openpyxl.load_workbook(io.BytesIO(b"".join(response)))
+        rows = [list(row) for row in workbook.active.iter_rows(values_only=True)]
+        self.assertEqual(
+            rows[1:],
+            [
+                ["S1", "Ada", "Lee", "9", None, 50, 40, 90, 200, 45, "F"],
+                ["S2", "Ben", "Lee", "9", None, 70, 70, 140, 200, 70, "B"],
+            ],
+        )
+        self.assertEqual(workbook.active.title, "marks-term-1")
+
+    def test_unknown_format_is_not_found(self):
+        self.assertEqual(self.export(format="pdf").status_code, 404)
+
+    def test_xlsx_without_openpyxl_is_not_found(self):
+        with mock.patch.dict("sys.modules", {"openpyxl": None}):
+            self.assertEqual(self.export(format="xlsx").status_code, 404)
+
+
+class SharedCacheCheckTests(TestCase):
+    locmem = {"default": {"BACKEND": LOCMEM_BACKEND}}
+
+    def test_local_memory_cache_with_several_workers_fails(self):
+        with self.settings(CACHES=self.locmem, WEB_WORKERS=3):
+            self.assertEqual(
+                [error.id for error in check_shared_cache(None)], ["student.E001"]
+            )
+
+    def test_single_worker_or_shared_cache_passes(self):
+        shared = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"}}
+        with self.settings(CACHES=self.locmem, WEB_WORKERS=1):
+            self.assertEqual(check_shared_cache(None), [])
+        with self.settings(CACHES=shared, WEB_WORKERS=3):
+            self.assertEqual(check_shared_cache(None), [])
+
+    def test_local_memory_session_cache_with_several_workers_fails(self):
+        caches = {
+            "default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"},
+            "sessions": {"BACKEND": LOCMEM_BACKEND},
+        }
+        cached_db = "django.contrib.sessions.backends.cached_db"
+        with self.settings(CACHES=caches, WEB_WORKERS=3, SESSION_ENGINE=cached_db):
+            self.assertEqual(
+                [error.id for error in check_shared_cache(None)], ["student.E001"]
+            )
+        db = "django.contrib.sessions.backends.db"
+        with self.settings(CACHES=caches, WEB_WORKERS=3, SESSION_ENGINE=db):
+            self.assertEqual(check_shared_cache(None), [])
@@ -8,8 +8,14 @@ from . import views
 
 urlpatterns = [
     path("", views.student_list, name="student_list"),
+    path("api/students/", views.student_list_api, name="student_list_api"),
     path("dashboard/", views.student_dashboard, name="student_dashboard"),
     path("teacher/dashboard/", views.teacher_dashboard, name="teacher_dashboard"),
+    path(
+        "api/teacher/dashboard/",
+        views.teacher_dashboard_api,
+        name="teacher_dashboard_api",
+    ),
     path("add/", views.add_student, name="add_student"),
     path("<int:pk>/", views.student_details, name="student_details"),
     path("marks/<int:student_id>/update/", views.update_mark, name="update_mark"),
@@ -20,11 +26,13 @@ urlpatterns = [
     # Teacher CRUD
     path("teachers/", views.teacher_list, name="teacher_list"),
     path("teachers/add/", views.add_teacher, name="add_teacher"),
+    path("api/teachers/", views.teacher_list_api, name="teacher_list_api"),
     path("teachers/<int:pk>/", views.teacher_details, name="teacher_details"),
     path("teachers/edit/<str:slug>/", views.edit_teacher, name="edit_teacher"),
     path("teachers/delete/<str:slug>/", views.delete_teacher, name="delete_teacher"),
     # Teacher Operations
     path("teacher/marks/", views.teacher_marks, name="teacher_marks"),
+    path("teacher/marks/bulk/", views.bulk_update_marks, name="bulk_update_marks"),
     path("teacher/departments/", views.department_list, name="department_list"),
     path("teacher/departments/add/", views.add_department, name="add_department"),
     path("teacher/subjects/", views.subject_list, name="subject_list"),
@@ -46,4 +54,63 @@ urlpatterns = [
     ),
     path("assignments/create/", views.create_assignment, name="create_assignment"),
     path("my-assignments/", views.my_assignments, name="my_assignments"),
+    path(
+        "my-assignments/<int:pk>/submit/",
+        views.submit_my_assignment,
+        name="submit_my_assignment",
+    ),
+    path("api/my-assignments/", views.my_assignments_api, name="my_assignments_api"),
+    path(
+        "api/exams/<int:exam_id>/rankings/",
+        views.exam_rankings_api,
+        name="exam_rankings_api",
+    ),
+    # Streaming CSV and Excel exports
+    path("export/students/", views.export_students, name="export_students"),
+    path(
+        "export/exams/<int:exam_id>/marks/",
+        views.export_exam_marks,
+        name="export_exam_marks",
+    ),
+    path(
+        "export/departments/<int:department_id>/results/",
+        views.export_department_results,
+        name="export_department_results",
+    ),
 ]
+
+# SQL query budgets per URL name, checked by QueryBudgetMiddleware and the
+# query_budget() test helper (see student/querybudget.py). Counts include the
+# session and user lookups; list views must not grow with the number of rows.
+QUERY_BUDGETS = {
+    "student_list": 6,
+    "student_list_api": 5,
+    "student_dashboard": 6,
+    "teacher_dashboard": 12,
+    "teacher_dashboard_api": 12,
+    "student_details": 6,
+    "update_mark": 12,
+    "student_results": 8,
+    "edit_student": 6,
+    "teacher_list": 6,
+    "teacher_list_api": 5,
+    "teacher_details": 6,
+    "edit_teacher": 8,
+    "teacher_marks": 8,
+    # Includes rebuilding the exam rankings after the commit.
+    "bulk_update_marks": 32,
+    "department_list": 6,
+    "subject_list": 6,
+    "teachers_in_department": 6,
+    "teacher_details_public": 6,
+    "create_assignment": 12,
+    "create_assignment_for_teacher": 12,
+    "my_assignments": 6,
+    "my_assignments_api": 6,
+    "submit_my_assignment": 10,
+    "exam_rankings_api": 8,
+    # Exports stream their rows after the view returns; this covers the setup.
+    "export_students": 5,
+    "export_exam_marks": 6,
+    "export_department_results": 6,
+}
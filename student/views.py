@@ -1,40 +1,64 @@
 from urllib import request
+import asyncio
 import json
 from collections import OrderedDict
 
-from django.http import HttpResponseForbidden
+from asgiref.sync import sync_to_async
+
+from django.http import Http404, HttpResponseForbidden, JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib import messages
 from django.db import models as django_models
+from django.db import transaction
 from django.db.models import Q
 from django.utils import timezone
 
-from .models import Parent, Student, Mark, Teacher, Department, Subject, Course
+from .models import Parent, Student, Mark, Teacher, Department, Subject, Course, Exam
+from .models import CohortStatistics
 from .forms import MarkForm, TeacherForm, TeacherMarkForm
 from .models import Teacher, Student, Assignment
 from .forms import AssignmentForm, AssignmentAssignForm
-
-
-# Permission helper functions (must be defined before use in decorators)
-def _is_teacher(user):
-    """Check if user is a teacher (not admin/staff)"""
-    if not user.is_authenticated:
-        return False
-    return getattr(user, "is_teacher", False) and not user.is_superuser
-
-
-def _is_admin(user):
-    """Check if user is admin/superuser"""
-    if not user.is_authenticated:
-        return False
-    return user.is_superuser or getattr(user, "is_admin", False)
+from .assignments import add_target, assign_students, assignment_counts
+from .assignments import submit_assignment
+from .dashboard import aget_dashboard, get_dashboard
+from .exports import EXPORT_FORMATS, department_results, export_response
+from .exports import exam_mark_sheet, roster_rows
+from .marks import get_mark_grid, grid_querysets, save_mark_matrix
+from .metrics import adepartment_metrics, department_metrics
+from .pagination import InvalidCursor, paginate_keyset, paginate_keyset_nulls_last
+from .rankings import exam_rankings, student_rankings
+from .results import aget_exam_results, get_exam_results
+from .search import search
+
+from home_auth.usercontext import is_admin, is_teacher_or_admin
+
+
+def _scoped_department(request):
+    """Department a teacher view or export covers, or None for the whole school.
+
+    Admins may pick one with ``?department=<id>`` (404 for an unknown or
+    non-numeric id); teachers always get their own. Raises
+    ``PermissionError`` for a teacher without a department.
+    """
+    if request.user_context.is_admin:
+        department_id = request.GET.get("department")
+        if department_id:
+            if not department_id.isdigit():
+                raise Http404("Unknown department.")
+            return get_object_or_404(Department, pk=department_id)
+        return None
+    teacher = request.user_context.teacher
+    if not teacher or not teacher.department_id:
+        raise PermissionError
+    return teacher.department
 
 
 # Restored minimal student views so `student.urls` can import them.
 @login_required
-@user_passes_test(_is_admin)
+@user_passes_test(is_admin)
 def add_student(request):
     """Render the add-student form (placeholder)."""
     if request.method == "POST":
@@ -115,35 +139,132 @@ def student_details(request, pk):
     """Render a student's detail page with data from database."""
     student = get_object_or_404(Student.objects.select_related("parent"), pk=pk)
     # Get all marks for this student
-    marks = student.marks.all().order_by("exam_name", "subject")
+    marks = student.marks.select_related("subject", "exam").order_by(
+        "exam__name", "subject__name"
+    )
     context = {"student": student, "marks": marks}
     return render(request, "Students/student-details.html", context)
 
 
-def student_list(request):
-    """Render the student listing page with data from database."""
-    students = Student.objects.select_related("parent", "department").all()
+# Orderings offered by the student list. Each ends with ``pk`` so keyset
+# pagination can resume from the last row of the previous page.
+STUDENT_LIST_ORDERINGS = {
+    "name": ("last_name", "first_name", "pk"),
+    "-name": ("-last_name", "-first_name", "-pk"),
+    "class": ("student_class", "section", "last_name", "first_name", "pk"),
+    "-class": ("-student_class", "-section", "-last_name", "-first_name", "-pk"),
+}
+# Query parameter -> Student field used for server-side filtering.
+STUDENT_LIST_FILTERS = {
+    "class": "student_class",
+    "section": "section",
+    "department": "department_id",
+    "gender": "gender",
+}
+
+
+def _student_list_page(request):
+    """Filter, sort and paginate the student list from ``request.GET``."""
+    students = Student.objects.select_related("parent", "department")
 
     # If the current user is a teacher (and not admin), show only students
     # from the teacher's department.
-    user = request.user
-    if (
-        getattr(user, "is_authenticated", False)
-        and getattr(user, "is_teacher", False)
-        and not _is_admin(user)
-    ):
-        my_teacher = getattr(user, "teacher_profile", None)
+    user_context = request.user_context
+    if user_context.is_teacher and not user_context.is_admin:
+        my_teacher = user_context.teacher
         if my_teacher and my_teacher.department:
             students = students.filter(department=my_teacher.department)
         else:
             students = Student.objects.none()
 
-    context = {"student_list": students}
+    filters = {}
+    for param, field in STUDENT_LIST_FILTERS.items():
+        value = request.GET.get(param, "").strip()
+        if value:
+            filters[param] = value
+            students = students.filter(**{field: value})
+
+    # Name / student ID / admission number search through the search index.
+    query = request.GET.get("q", "").strip()
+    if query:
+        filters["q"] = query
+        students = search(students, query)
+
+    sort = request.GET.get("sort", "name")
+    if sort not in STUDENT_LIST_ORDERINGS:
+        sort = "name"
+    page = paginate_keyset(
+        students,
+        STUDENT_LIST_ORDERINGS[sort],
+        after=request.GET.get("after"),
+        before=request.GET.get("before"),
+        page_size=request.GET.get("page_size") or None,
+    )
+    return page, filters, sort
+
+
+def student_list(request):
+    """Render one page of the student listing with data from database."""
+    try:
+        page, filters, sort = _student_list_page(request)
+    except (InvalidCursor, ValueError):
+        messages.error(request, "Invalid page requested.")
+        return redirect("student_list")
+
+    context = {
+        "student_list": page.object_list,
+        "page": page,
+        "filters": filters,
+        "sort": sort,
+        "departments": Department.objects.order_by("name"),
+    }
     return render(request, "Students/students.html", context)
 
 
 @login_required
-@user_passes_test(_is_admin)
+@user_passes_test(is_teacher_or_admin)
+def student_list_api(request):
+    """JSON variant of ``student_list`` accepting the same parameters.
+
+    Limited to teachers and admins: it includes contact and parent details.
+    """
+    try:
+        page, filters, sort = _student_list_page(request)
+    except (InvalidCursor, ValueError) as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    results = []
+    for student in page.object_list:
+        parent = student.parent
+        results.append(
+            {
+                "id": student.pk,
+                "slug": student.slug,
+                "student_id": student.student_id,
+                "first_name": student.first_name,
+                "last_name": student.last_name,
+                "gender": student.gender,
+                "student_class": student.student_class,
+                "section": student.section,
+                "admission_number": student.admission_number,
+                "mobile_number": student.mobile_number,
+                "department": (student.department.name if student.department else None),
+                "parent": str(parent) if parent else None,
+            }
+        )
+    return JsonResponse(
+        {
+            "results": results,
+            "next": page.next_cursor,
+            "previous": page.previous_cursor,
+            "filters": filters,
+            "sort": sort,
+        }
+    )
+
+
+@login_required
+@user_passes_test(is_admin)
 def edit_student(request, slug):
     student = get_object_or_404(Student, slug=slug)
     parent = student.parent if hasattr(student, "parent") else None
@@ -259,7 +380,7 @@ def edit_student(request, slug):
 
 
 @login_required
-@user_passes_test(_is_admin)
+@user_passes_test(is_admin)
 def delete_student(request, slug):
     if request.method == "POST":
         student = get_object_or_404(Student, slug=slug)
@@ -270,15 +391,7 @@ def delete_student(request, slug):
     return HttpResponseForbidden()
 
 
-@login_required
-def student_dashboard(request):
-    """Render the student dashboard page with real student insights."""
-    # Try to find the Student linked to the current user
-    student = getattr(request.user, "student_profile", None)
-    if student is None:
-        # No direct link found — try a fallback by admission_number == username
-        student = Student.objects.filter(admission_number=request.user.username).first()
-
+def _dashboard_context(student, payload=None, dashboard_version=None):
     context = {
         "student": student,
         "student_cards": {},
@@ -289,156 +402,41 @@ def student_dashboard(request):
         "learning_activity_scores": json.dumps([]),
         "performance_trends": [],
     }
-
-    if student:
-        marks_qs = student.marks.all().order_by("-updated_at")
-        marks_list = list(marks_qs)
-        assignments_qs = (
-            getattr(student, "assignments", Assignment.objects.none())
-            .all()
-            .order_by("due_date")
+    if payload is not None:
+        context.update(payload)
+        context["dashboard_version"] = dashboard_version
+        context["learning_activity_labels"] = json.dumps(
+            payload["learning_activity_labels"]
         )
-        subjects_qs = (
-            Subject.objects.filter(department=student.department, is_approved=True)
-            if getattr(student, "department", None)
-            else Subject.objects.none()
+        context["learning_activity_scores"] = json.dumps(
+            payload["learning_activity_scores"]
         )
+    return context
 
-        tests_attended = len(marks_list)
-        tests_passed = sum(
-            1
-            for mark in marks_list
-            if mark.max_score and mark.score >= 0.5 * mark.max_score
-        )
-
-        context["student_cards"] = {
-            "subjects": subjects_qs.count(),
-            "assignments": assignments_qs.count(),
-            "tests_attended": tests_attended,
-            "tests_passed": tests_passed,
-        }
 
-        # Build per-subject progress to populate "Today's Lesson" widgets
-        subject_progress = {}
-        for mark in reversed(marks_list):
-            if not mark.max_score:
-                continue
-            key = mark.subject
-            subject_progress.setdefault(key, {"scores": [], "count": 0, "labels": []})
-            subject_progress[key]["scores"].append(mark.score / mark.max_score * 100)
-            subject_progress[key]["count"] += 1
-            subject_progress[key]["labels"].append(
-                mark.exam_name
-                or (mark.updated_at.strftime("%b %d") if mark.updated_at else "Exam")
-            )
+@login_required
+def student_dashboard(request):
+    """Render the student dashboard page with real student insights."""
+    # The linked Student, else the one whose admission number is the username
+    student = request.user_context.student
 
-        lessons_today = []
-        for subject, stats in sorted(
-            subject_progress.items(),
-            key=lambda item: sum(item[1]["scores"]) / len(item[1]["scores"]),
-            reverse=True,
-        )[:2]:
-            average = round(sum(stats["scores"]) / len(stats["scores"]), 1)
-            lessons_today.append(
-                {
-                    "title": subject,
-                    "progress": average,
-                    "lessons": stats["count"],
-                    "minutes": stats["count"] * 45,
-                    "assignments": stats["count"],
-                }
-            )
-        context["lessons_today"] = lessons_today
-
-        # Performance trends data per subject
-        performance_trends = []
-        for subject, stats in subject_progress.items():
-            scores = [round(score, 2) for score in stats["scores"]]
-            performance_trends.append(
-                {
-                    "subject": subject,
-                    "labels": stats["labels"],
-                    "scores": scores,
-                    "latest_score": scores[-1] if scores else 0,
-                }
-            )
-        context["performance_trends"] = performance_trends
-
-        # Learning history combines latest assignments and marks
-        history_entries = []
-        today = timezone.now().date()
-        for assignment in assignments_qs[:5]:
-            status = (
-                "Completed"
-                if assignment.due_date and assignment.due_date < today
-                else "In Progress"
-            )
-            history_entries.append(
-                {
-                    "label": (
-                        assignment.due_date.strftime("%b %d, %I%p")
-                        if assignment.due_date
-                        else "No due date"
-                    ),
-                    "title": assignment.title,
-                    "status": status,
-                }
-            )
-        for mark in marks_list[:5]:
-            history_entries.append(
-                {
-                    "label": (
-                        mark.updated_at.strftime("%b %d, %I:%M %p")
-                        if mark.updated_at
-                        else "N/A"
-                    ),
-                    "title": f"{mark.subject} ({mark.exam_name})",
-                    "status": f"{mark.score}/{mark.max_score}",
-                }
-            )
-        context["learning_history"] = history_entries[:5]
-
-        # Calendar events sourced from upcoming assignments
-        palette = ["blue", "violet", "red", "orange", "green", "indigo"]
-        calendar_events = []
-        for idx, assignment in enumerate(assignments_qs[:4]):
-            calendar_events.append(
-                {
-                    "title": assignment.title,
-                    "time_range": (
-                        assignment.due_date.strftime("%b %d")
-                        if assignment.due_date
-                        else "TBD"
-                    ),
-                    "color": palette[idx % len(palette)],
-                }
-            )
-        context["calendar_events"] = calendar_events
-
-        # Learning activity chart: monthly average mark percentages
-        month_buckets = OrderedDict()
-        for mark in marks_list:
-            if not mark.updated_at or not mark.max_score:
-                continue
-            label = mark.updated_at.strftime("%b")
-            key = (mark.updated_at.year, mark.updated_at.month, label)
-            month_buckets.setdefault(key, []).append(mark.score / mark.max_score * 100)
-
-        if month_buckets:
-            sorted_items = sorted(
-                month_buckets.items(), key=lambda item: (item[0][0], item[0][1])
-            )
-            last_items = sorted_items[-6:]
-            labels = [item[0][2] for item in last_items]
-            scores = [round(sum(values) / len(values), 2) for _, values in last_items]
-        else:
-            labels = ["Jan", "Feb", "Mar", "Apr", "May", "Jun"]
-            scores = [0, 0, 0, 0, 0, 0]
+    payload = dashboard_version = None
+    if student:
+        # Built from three queries and cached per student until one of their
+        # marks or assignments changes (see student/dashboard.py).
+        payload, dashboard_version = get_dashboard(student)
+    context = _dashboard_context(student, payload, dashboard_version)
+    return render(request, "Students/student-dashboard.html", context)
 
-        context["learning_activity_labels"] = json.dumps(labels)
-        context["learning_activity_scores"] = json.dumps(scores)
 
-    return render(request, "Students/student-dashboard.html", context)
+def _teacher_dashboard_context(user, department, metrics):
+    return {
+        "display_name": getattr(user, "first_name", "")
+        or user.get_full_name()
+        or user.username,
+        "department": department,
+        "metrics": metrics,
+    }
 
 
 @login_required
@@ -449,14 +447,27 @@ def teacher_dashboard(request):
         messages.error(request, "You do not have access to the teacher dashboard.")
         return redirect("student_dashboard")
 
-    context = {
-        "display_name": getattr(user, "first_name", "")
-        or user.get_full_name()
-        or user.username,
-    }
+    teacher = request.user_context.teacher
+    department = teacher.department if teacher else None
+    # Aggregated and cached per department (see student/metrics.py).
+    metrics = department_metrics(department) if department else None
+    context = _teacher_dashboard_context(user, department, metrics)
     return render(request, "Teachers/teacher-dashboard.html", context)
 
 
+@login_required
+@user_passes_test(is_teacher_or_admin)
+def teacher_dashboard_api(request):
+    """JSON metrics of the teacher's department (admins: any, or the school)."""
+    try:
+        department = _scoped_department(request)
+    except PermissionError:
+        return JsonResponse(
+            {"error": "You are not assigned to a department."}, status=403
+        )
+    return JsonResponse(department_metrics(department))
+
+
 # @csrf_exempt
 # def public_results(request):
 #     """Public (unauthenticated) entry to view results by admission number.
@@ -603,83 +614,95 @@ def student_results(request):
     """Allow a logged-in student to view their marks.
 
     If the logged-in User is linked to a Student via `Student.user`, the view
-    will gather marks grouped by `exam_name` and compute totals and percentage
+    will gather marks grouped by exam name and compute totals and percentage
     for each exam. If no linked Student is found, show a helpful message.
     """
-    # Try to find the Student linked to the current user
-    student = getattr(request.user, "student_profile", None)
-    if student is None:
-        # No direct link found — try a fallback by admission_number == username
-        student = Student.objects.filter(admission_number=request.user.username).first()
+    # The linked Student, else the one whose admission number is the username
+    student = request.user_context.student
 
     if not student:
         messages.error(request, "No student profile linked to your account.")
         return redirect("student_dashboard")
 
-    # Gather marks and group by exam
-    marks = student.marks.all().order_by("exam_name", "subject")
-    exams = {}
-    for m in marks:
-        ex = m.exam_name
-        exams.setdefault(ex, {"marks": [], "total_score": 0, "max_total": 0})
-        exams[ex]["marks"].append(m)
-        exams[ex]["total_score"] += m.score
-        exams[ex]["max_total"] += m.max_score
-
-    # Compute percent per exam and grade
-    for ex, info in exams.items():
-        if info["max_total"]:
-            info["percent"] = round(info["total_score"] * 100.0 / info["max_total"], 2)
-            # Calculate grade based on percentage
-            percent = info["percent"]
-            if percent >= 90:
-                info["grade"] = "A+"
-            elif percent >= 80:
-                info["grade"] = "A"
-            elif percent >= 70:
-                info["grade"] = "B"
-            elif percent >= 60:
-                info["grade"] = "C"
-            elif percent >= 50:
-                info["grade"] = "D"
-            else:
-                info["grade"] = "F"
-        else:
-            info["percent"] = None
-            info["grade"] = "N/A"
-        # Annotate each mark with per-subject percent and grade for template
-        for m in info["marks"]:
-            if m.max_score:
-                subj_pct = round(m.score * 100.0 / m.max_score, 2)
-            else:
-                subj_pct = None
-            # attach attributes to the model instance (safe for template use)
-            setattr(m, "subject_percent", subj_pct)
-            if subj_pct is None:
-                setattr(m, "subject_grade", None)
-            elif subj_pct >= 90:
-                setattr(m, "subject_grade", "A+")
-            elif subj_pct >= 80:
-                setattr(m, "subject_grade", "A")
-            elif subj_pct >= 70:
-                setattr(m, "subject_grade", "B")
-            elif subj_pct >= 60:
-                setattr(m, "subject_grade", "C")
-            elif subj_pct >= 50:
-                setattr(m, "subject_grade", "D")
-            else:
-                setattr(m, "subject_grade", "F")
+    # Served from the cache until one of the student's marks changes.
+    exams, results_version = get_exam_results(student)
 
-    context = {"student": student, "exams": exams}
+    context = {
+        "student": student,
+        "exams": exams,
+        "results_version": results_version,
+        # Ranks move when other students' marks change, so they are read
+        # from the ranking snapshot rather than cached with the results.
+        "rankings": student_rankings(student),
+    }
     return render(request, "Students/results.html", context)
 
 
+# Async variants of the dashboards and the results page, routed in place of
+# the views above when the site runs under ASGI (see Home/asgi_urls.py).
+# They read through the async ORM, which keeps the event loop free but runs
+# the queries one after another (see student/asyncqueries.py); the template
+# is rendered in a worker thread since it may still touch the database
+# lazily.
+
+
+@login_required
+async def student_dashboard_async(request):
+    """Async ``student_dashboard``."""
+    student = (await request.auser_context()).student
+    payload = dashboard_version = None
+    if student:
+        payload, dashboard_version = await aget_dashboard(student)
+    context = _dashboard_context(student, payload, dashboard_version)
+    return await sync_to_async(render)(
+        request, "Students/student-dashboard.html", context
+    )
+
+
+@login_required
+async def teacher_dashboard_async(request):
+    """Async ``teacher_dashboard``."""
+    user_context = await request.auser_context()
+    user = user_context.user
+    if not getattr(user, "is_teacher", False):
+        messages.error(request, "You do not have access to the teacher dashboard.")
+        return redirect("student_dashboard")
+
+    teacher = user_context.teacher
+    department = teacher.department if teacher else None
+    metrics = await adepartment_metrics(department) if department else None
+    context = _teacher_dashboard_context(user, department, metrics)
+    return await sync_to_async(render)(
+        request, "Teachers/teacher-dashboard.html", context
+    )
+
+
+@login_required
+async def student_results_async(request):
+    """Async ``student_results``."""
+    student = (await request.auser_context()).student
+    if not student:
+        messages.error(request, "No student profile linked to your account.")
+        return redirect("student_dashboard")
+
+    (exams, results_version), rankings = await asyncio.gather(
+        aget_exam_results(student), sync_to_async(student_rankings)(student)
+    )
+    context = {
+        "student": student,
+        "exams": exams,
+        "results_version": results_version,
+        "rankings": rankings,
+    }
+    return await sync_to_async(render)(request, "Students/results.html", context)
+
+
 @login_required
-@user_passes_test(lambda u: _is_teacher(u) or _is_admin(u))
+@user_passes_test(is_teacher_or_admin)
 def update_mark(request, student_id):
     student = get_object_or_404(Student, pk=student_id)
     user = request.user
-    is_admin = _is_admin(user)
+    is_admin = request.user_context.is_admin
 
     initial_subject = request.GET.get("subject", "")
     initial_exam = request.GET.get("exam", "")
@@ -692,7 +715,7 @@ def update_mark(request, student_id):
     # can only edit marks for students in their department and only for
     # subjects that belong to their department and are approved.
     if not is_admin:
-        my_teacher = getattr(user, "teacher_profile", None)
+        my_teacher = request.user_context.teacher
         if not my_teacher or not getattr(my_teacher, "department", None):
             messages.error(request, "You are not assigned to a department.")
             return redirect("teacher_marks")
@@ -713,28 +736,45 @@ def update_mark(request, student_id):
                 request, "Invalid subject for your department or subject not approved."
             )
             return redirect("teacher_marks")
+    else:
+        subject_obj = Subject.objects.filter(name=initial_subject).first()
+        if not subject_obj:
+            messages.error(request, "Invalid subject.")
+            return redirect("teacher_marks")
 
-    existing = Mark.objects.filter(
-        student=student, subject=initial_subject, exam_name=initial_exam
-    ).first()
+    exam_obj = Exam.objects.filter(name=initial_exam).first()
+    existing = (
+        Mark.objects.filter(student=student, subject=subject_obj, exam=exam_obj).first()
+        if exam_obj
+        else None
+    )
 
     if request.method == "POST":
         # For teachers, use TeacherMarkForm (only score and max_score)
         # For admins, use full MarkForm
         if is_admin:
-            form = MarkForm(request.POST, instance=existing)
+            data = request.POST.copy()
+            data.setdefault("subject", subject_obj.pk)
+            if exam_obj:
+                data.setdefault("exam", exam_obj.pk)
+            form = MarkForm(data, instance=existing)
+            # A new exam name is only created once the mark is valid.
+            form.fields["exam"].required = exam_obj is not None
         else:
             form = TeacherMarkForm(request.POST, instance=existing)
 
         if form.is_valid():
-            mark = form.save(commit=False)
-            mark.student = student
-            # Only set subject and exam_name if creating new mark (for teachers)
-            if not existing:
-                mark.subject = initial_subject
-                mark.exam_name = initial_exam
-            mark.updated_by = request.user
-            mark.save()
+            with transaction.atomic():
+                mark = form.save(commit=False)
+                mark.student = student
+                # Only set subject and exam if creating new mark (for teachers)
+                if not existing:
+                    if exam_obj is None:
+                        exam_obj, _ = Exam.objects.get_or_create(name=initial_exam)
+                    mark.subject = subject_obj
+                    mark.exam = exam_obj
+                mark.updated_by = request.user
+                mark.save()
             messages.success(request, "Marks updated successfully.")
             return redirect("teacher_marks")
         messages.error(request, "Please correct the errors below.")
@@ -742,10 +782,9 @@ def update_mark(request, student_id):
         # Use TeacherMarkForm for teachers, MarkForm for admins
         if is_admin:
             form = MarkForm(instance=existing)
-            if initial_subject:
-                form.fields["subject"].initial = initial_subject
-            if initial_exam:
-                form.fields["exam_name"].initial = initial_exam
+            form.fields["subject"].initial = subject_obj
+            if exam_obj:
+                form.fields["exam"].initial = exam_obj
         else:
             form = TeacherMarkForm(instance=existing)
 
@@ -767,13 +806,12 @@ def teacher_details(request, pk):
         Teacher.objects.select_related("department", "user"), pk=pk
     )
 
-    user = request.user
-    is_admin = _is_admin(user)
-    is_own_profile = (
-        hasattr(user, "teacher_profile") and user.teacher_profile.pk == teacher.pk
-    )
+    user_context = request.user_context
+    is_admin = user_context.is_admin
+    my_teacher = user_context.teacher
+    is_own_profile = my_teacher is not None and my_teacher.pk == teacher.pk
 
-    if not (is_admin or is_own_profile or _is_teacher(user)):
+    if not (user_context.is_teacher_or_admin or is_own_profile):
         messages.error(
             request, "You don't have permission to view this teacher's profile."
         )
@@ -783,49 +821,102 @@ def teacher_details(request, pk):
     return render(request, "Teachers/teacher-details.html", context)
 
 
-@login_required
-def teacher_list(request):
+def _visible_teachers(context):
+    """Return ``(teachers, is_teacher_user, current_department)``.
+
+    ``context`` is the ``request.user_context`` of the requesting user.
+    """
     # Select related to avoid extra queries for department and linked user
     teachers = Teacher.objects.select_related("department", "user").all()
     # If the current user is a teacher (and not admin), restrict the list
     # to teachers in the same department to match requested behavior.
-    user = request.user
-    is_teacher_user = (
-        getattr(user, "is_authenticated", False)
-        and getattr(user, "is_teacher", False)
-        and not _is_admin(user)
-    )
+    is_teacher_user = context.is_teacher and not context.is_admin
     current_department = None
     if is_teacher_user:
-        my_teacher = getattr(user, "teacher_profile", None)
+        my_teacher = context.teacher
         if my_teacher and my_teacher.department:
             current_department = my_teacher.department
             teachers = teachers.filter(department=current_department)
         else:
             # Not assigned to a department -> show empty list
             teachers = Teacher.objects.none()
+    return teachers, is_teacher_user, current_department
 
-    # search query (kept for admins / developers but optional)
+
+@login_required
+def teacher_list(request):
+    teachers, is_teacher_user, current_department = _visible_teachers(
+        request.user_context
+    )
+
+    # search query (kept for admins / developers but optional), answered
+    # from the search index instead of icontains scans
     search_query = request.GET.get("search", "")
     if search_query:
-        teachers = teachers.filter(
-            Q(first_name__icontains=search_query)
-            | Q(last_name__icontains=search_query)
-            | Q(teacher_id__icontains=search_query)
-            | Q(email__icontains=search_query)
-        )
+        teachers = search(teachers, search_query)
 
     context = {
         "teacher_list": teachers,
-        "is_admin": _is_admin(request.user),
+        "is_admin": request.user_context.is_admin,
         "is_teacher_user": is_teacher_user,
         "current_department": current_department,
     }
     return render(request, "Teachers/teachers.html", context)
 
 
+# Orderings offered by the teacher search API (see STUDENT_LIST_ORDERINGS).
+TEACHER_LIST_ORDERINGS = {
+    "name": ("first_name", "last_name", "pk"),
+    "-name": ("-first_name", "-last_name", "-pk"),
+}
+
+
 @login_required
-@user_passes_test(_is_admin)
+def teacher_list_api(request):
+    """Paginated teacher search: ``?q=...&sort=name&after=<cursor>``."""
+    teachers, _, _ = _visible_teachers(request.user_context)
+    query = request.GET.get("q", "").strip()
+    if query:
+        teachers = search(teachers, query)
+    sort = request.GET.get("sort", "name")
+    if sort not in TEACHER_LIST_ORDERINGS:
+        sort = "name"
+    try:
+        page = paginate_keyset(
+            teachers,
+            TEACHER_LIST_ORDERINGS[sort],
+            after=request.GET.get("after"),
+            before=request.GET.get("before"),
+            page_size=request.GET.get("page_size") or None,
+        )
+    except (InvalidCursor, ValueError) as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    results = [
+        {
+            "id": teacher.pk,
+            "slug": teacher.slug,
+            "teacher_id": teacher.teacher_id,
+            "first_name": teacher.first_name,
+            "last_name": teacher.last_name,
+            "email": teacher.email,
+            "department": (teacher.department.name if teacher.department else None),
+        }
+        for teacher in page.object_list
+    ]
+    return JsonResponse(
+        {
+            "results": results,
+            "next": page.next_cursor,
+            "previous": page.previous_cursor,
+            "q": query,
+            "sort": sort,
+        }
+    )
+
+
+@login_required
+@user_passes_test(is_admin)
 def add_teacher(request):
     """Add new teacher (Admin only)"""
     if request.method == "POST":
@@ -851,11 +942,9 @@ def edit_teacher(request, slug):
     teacher = get_object_or_404(Teacher, slug=slug)
 
     # Check permissions
-    user = request.user
-    is_admin = _is_admin(user)
-    is_own_profile = (
-        hasattr(user, "teacher_profile") and user.teacher_profile.pk == teacher.pk
-    )
+    is_admin = request.user_context.is_admin
+    my_teacher = request.user_context.teacher
+    is_own_profile = my_teacher is not None and my_teacher.pk == teacher.pk
 
     if not (is_admin or is_own_profile):
         messages.error(request, "You don't have permission to edit this teacher.")
@@ -879,7 +968,7 @@ def edit_teacher(request, slug):
 
 
 @login_required
-@user_passes_test(_is_admin)
+@user_passes_test(is_admin)
 def delete_teacher(request, slug):
     """Delete teacher (Admin only)"""
     if request.method == "POST":
@@ -895,74 +984,31 @@ def delete_teacher(request, slug):
 
 
 @login_required
-@user_passes_test(lambda u: _is_teacher(u) or _is_admin(u))
+@user_passes_test(is_teacher_or_admin)
 def teacher_marks(request):
     """Teacher view to see all students with all subjects and update marks."""
     user = request.user
-    is_admin = _is_admin(user)
+    is_admin = request.user_context.is_admin
 
     # Get teacher profile and department for non-admin users
     my_teacher = None
     teacher_department = None
     if not is_admin:
-        my_teacher = getattr(user, "teacher_profile", None)
+        my_teacher = request.user_context.teacher
         if my_teacher:
             teacher_department = my_teacher.department
 
-    # Get students - filter by teacher's department if not admin
-    if is_admin:
-        students = (
-            Student.objects.select_related("department")
-            .all()
-            .order_by("first_name", "last_name")
-        )
-        subjects = Subject.objects.filter(is_approved=True).order_by("name")
-    else:
-        # For teachers, only show students and subjects from their department
-        if my_teacher and my_teacher.department:
-            students = Student.objects.filter(
-                department=my_teacher.department
-            ).order_by("first_name", "last_name")
-            subjects = Subject.objects.filter(
-                department=my_teacher.department, is_approved=True
-            ).order_by("name")
-        else:
-            students = Student.objects.none()
-            subjects = Subject.objects.none()
-
-    # Get all existing marks for these students
-    existing_marks = Mark.objects.filter(student__in=students).select_related(
-        "student", "updated_by"
+    # Build one page of the grid; marks are grouped once per page and the
+    # result is cached per department (see student/marks.py).
+    page_obj, students_with_subjects = get_mark_grid(
+        department=teacher_department,
+        all_departments=is_admin,
+        page_number=request.GET.get("page"),
     )
 
-    # Create a dictionary for quick mark lookup: (student_id, subject_name, exam_name) -> mark
-    marks_dict = {}
-    for mark in existing_marks:
-        key = (mark.student.pk, mark.subject, mark.exam_name)
-        marks_dict[key] = mark
-
-    # Build students_with_subjects: list of dicts with student and their subjects
-    students_with_subjects = []
-    for student in students:
-        student_subjects = []
-        for subject in subjects:
-            # Get all marks for this student-subject combination
-            subject_marks = []
-            for mark in existing_marks:
-                if mark.student.pk == student.pk and mark.subject == subject.name:
-                    subject_marks.append(mark)
-            student_subjects.append(
-                {
-                    "subject": subject,
-                    "marks": sorted(subject_marks, key=lambda x: x.exam_name),
-                }
-            )
-        students_with_subjects.append(
-            {"student": student, "subjects": student_subjects}
-        )
-
     context = {
         "students_with_subjects": students_with_subjects,
+        "page_obj": page_obj,
         "is_admin": is_admin,
         "teacher_department": teacher_department,
         "my_teacher": my_teacher,
@@ -970,8 +1016,129 @@ def teacher_marks(request):
     return render(request, "Teachers/teacher-marks.html", context)
 
 
+def _read_mark_matrix(request):
+    """Return ``(exam_name, cells)`` from a JSON body or the grid form.
+
+    Cells are ``(student_pk, subject_pk, score, max_score)`` tuples with the
+    raw submitted values. The grid form posts ``score-<student>-<subject>``
+    inputs, an optional ``max_score-<student>-<subject>`` per cell and a
+    ``max_score`` default; empty score inputs are skipped.
+    """
+    if request.content_type == "application/json":
+        payload = json.loads(request.body or b"{}")
+        default_max = payload.get("max_score", 100)
+        cells = [
+            (
+                cell.get("student"),
+                cell.get("subject"),
+                cell.get("score"),
+                cell.get("max_score", default_max),
+            )
+            for cell in payload.get("scores", [])
+        ]
+        return str(payload.get("exam_name", "")).strip(), cells
+
+    default_max = request.POST.get("max_score", "").strip() or 100
+    cells = []
+    for key, value in request.POST.items():
+        if not key.startswith("score-") or not value.strip():
+            continue
+        _, student_pk, subject_pk = (key.split("-", 2) + ["", ""])[:3]
+        max_score = request.POST.get(f"max_score-{student_pk}-{subject_pk}", "")
+        cells.append((student_pk, subject_pk, value.strip(), max_score or default_max))
+    return request.POST.get("exam_name", "").strip(), cells
+
+
+@login_required
+@user_passes_test(is_teacher_or_admin)
+def bulk_update_marks(request):
+    """Save a whole matrix of scores from the marks grid in one transaction.
+
+    Accepts the grid form or a JSON body ``{"exam_name", "max_score",
+    "scores": [{"student", "subject", "score", "max_score"}]}`` where
+    ``student`` and ``subject`` are primary keys. Every cell is validated
+    with the same form rules as ``update_mark``; if any cell is invalid
+    nothing is saved.
+    """
+    if request.method != "POST":
+        return redirect("teacher_marks")
+
+    user = request.user
+    is_admin = request.user_context.is_admin
+    wants_json = request.content_type == "application/json"
+    try:
+        exam_name, cells = _read_mark_matrix(request)
+    except (ValueError, AttributeError, TypeError):
+        return JsonResponse({"errors": {"__all__": ["Invalid JSON body."]}}, status=400)
+
+    # Same restrictions as update_mark: teachers only grade students and
+    # approved subjects of their own department.
+    students, subjects = grid_querysets(
+        department=getattr(request.user_context.teacher, "department", None),
+        all_departments=is_admin,
+    )
+    student_pks = set()
+    subject_pks = set()
+    for student_pk, subject_pk, _, _ in cells:
+        if str(student_pk).isdigit() and str(subject_pk).isdigit():
+            student_pks.add(int(student_pk))
+            subject_pks.add(int(subject_pk))
+    students = students.in_bulk(student_pks)
+    subjects = subjects.in_bulk(subject_pks)
+
+    errors = {}
+    valid_cells = []
+    seen = set()
+    if not exam_name:
+        errors["exam_name"] = ["Exam name is required."]
+
+    for student_pk, subject_pk, score, max_score in cells:
+        key = f"{student_pk}-{subject_pk}"
+        student = students.get(int(student_pk)) if str(student_pk).isdigit() else None
+        subject = subjects.get(int(subject_pk)) if str(subject_pk).isdigit() else None
+        if student is None or subject is None:
+            errors[key] = ["You don't have permission to edit this mark."]
+            continue
+        if (student.pk, subject.pk) in seen:
+            errors[key] = ["This mark is entered more than once."]
+            continue
+        seen.add((student.pk, subject.pk))
+        # Subject and exam are resolved above, only the scores need checking.
+        form = TeacherMarkForm({"score": score, "max_score": max_score})
+        if not form.is_valid():
+            errors[key] = [
+                e for field_errors in form.errors.values() for e in field_errors
+            ]
+            continue
+        valid_cells.append(
+            (
+                student.pk,
+                subject.pk,
+                form.cleaned_data["score"],
+                form.cleaned_data["max_score"],
+            )
+        )
+
+    if errors:
+        if wants_json:
+            return JsonResponse({"errors": errors}, status=400)
+        messages.error(
+            request, f"No marks saved: {len(errors)} entries need to be corrected."
+        )
+    else:
+        exam, _ = Exam.objects.get_or_create(name=exam_name)
+        saved = save_mark_matrix(students, valid_cells, exam, user)
+        if wants_json:
+            return JsonResponse({"saved": saved, "exam_name": exam_name})
+        messages.success(request, f"{saved} marks saved for {exam_name}.")
+
+    page = request.POST.get("page", "")
+    url = reverse("teacher_marks")
+    return redirect(f"{url}?page={page}" if page.isdigit() else url)
+
+
 @login_required
-@user_passes_test(lambda u: _is_teacher(u) or _is_admin(u))
+@user_passes_test(is_teacher_or_admin)
 def department_list(request):
     """List all departments."""
     departments = Department.objects.all().order_by("name")
@@ -980,7 +1147,7 @@ def department_list(request):
 
 
 @login_required
-@user_passes_test(lambda u: _is_teacher(u) or _is_admin(u))
+@user_passes_test(is_teacher_or_admin)
 def add_department(request):
     """Add a new department."""
     if request.method == "POST":
@@ -1008,17 +1175,17 @@ def add_department(request):
 
 
 @login_required
-@user_passes_test(lambda u: _is_teacher(u) or _is_admin(u))
+@user_passes_test(is_teacher_or_admin)
 def subject_list(request):
     """List all subjects."""
     subjects = Subject.objects.select_related("department").all().order_by("name")
-    is_admin = _is_admin(request.user)
+    is_admin = request.user_context.is_admin
 
     # Get teacher profile and department for non-admin users
     my_teacher = None
     teacher_department = None
     if not is_admin:
-        my_teacher = getattr(request.user, "teacher_profile", None)
+        my_teacher = request.user_context.teacher
         if my_teacher:
             teacher_department = my_teacher.department
             if teacher_department:
@@ -1038,7 +1205,7 @@ def subject_list(request):
 
 
 @login_required
-@user_passes_test(lambda u: _is_teacher(u) or _is_admin(u))
+@user_passes_test(is_teacher_or_admin)
 def add_subject(request):
     """Add a new subject."""
     if request.method == "POST":
@@ -1059,13 +1226,9 @@ def add_subject(request):
                     department = Department.objects.filter(pk=department_id).first()
                 else:
                     # try to default to the teacher's department for non-admins
-                    user = request.user
-                    if (
-                        getattr(user, "is_authenticated", False)
-                        and getattr(user, "is_teacher", False)
-                        and not _is_admin(user)
-                    ):
-                        my_teacher = getattr(user, "teacher_profile", None)
+                    user_context = request.user_context
+                    if user_context.is_teacher and not user_context.is_admin:
+                        my_teacher = user_context.teacher
                         if my_teacher and my_teacher.department:
                             department = my_teacher.department
 
@@ -1073,11 +1236,9 @@ def add_subject(request):
                 # approved immediately; subjects created by ordinary
                 # teachers should require admin approval.
                 is_approved_flag = True
-                current_user = request.user
                 if (
-                    getattr(current_user, "is_authenticated", False)
-                    and getattr(current_user, "is_teacher", False)
-                    and not _is_admin(current_user)
+                    request.user_context.is_teacher
+                    and not request.user_context.is_admin
                 ):
                     is_approved_flag = False
 
@@ -1107,15 +1268,11 @@ def add_subject(request):
     return render(request, "Teachers/add-subject.html", context)
 
 
-def _is_teacher(user):
-    return getattr(user, "is_teacher", False) or user.is_superuser
-
-
 @login_required
-@user_passes_test(_is_teacher)
+@user_passes_test(is_teacher_or_admin)
 def teachers_in_department(request):
     """List teachers in the same department as the logged-in teacher."""
-    teacher = getattr(request.user, "teacher_profile", None)
+    teacher = request.user_context.teacher
     if not teacher or not teacher.department:
         messages.info(request, "You are not assigned to a department.")
         # Option: show empty list or redirect
@@ -1142,12 +1299,9 @@ def teacher_detail(request, slug):
     if request.user.is_superuser:
         allowed = True
     else:
-        my_teacher = getattr(request.user, "teacher_profile", None)
-        allowed = (
-            my_teacher is not None and my_teacher.department == t.department
-        ) or (
-            getattr(request.user, "teacher_profile", None)
-            and t == request.user.teacher_profile
+        my_teacher = request.user_context.teacher
+        allowed = my_teacher is not None and (
+            my_teacher.department == t.department or t == my_teacher
         )
     if not allowed:
         return HttpResponseForbidden("You are not allowed to view this teacher.")
@@ -1156,14 +1310,14 @@ def teacher_detail(request, slug):
 
 
 @login_required
-@user_passes_test(_is_teacher)
+@user_passes_test(is_teacher_or_admin)
 def create_assignment(request, slug=None):
     """
     Create an assignment and assign it to students.
     If slug provided, use that teacher's department to pre-filter students.
     Otherwise use the current teacher's department.
     """
-    my_teacher = getattr(request.user, "teacher_profile", None)
+    my_teacher = request.user_context.teacher
     if not my_teacher and not request.user.is_superuser:
         return HttpResponseForbidden("Only teachers can create assignments.")
 
@@ -1176,41 +1330,31 @@ def create_assignment(request, slug=None):
 
     if request.method == "POST":
         form = AssignmentForm(request.POST)
-        assign_form = AssignmentAssignForm(request.POST)
-        # set the queryset for students dynamically
-        if department:
-            assign_form.fields["students"].queryset = Student.objects.filter(
-                student_class__isnull=False,  # optional
-            ).filter(
-                # choose filter: by department if Student has department link; if not, you may use student_class/section mapping
-                # For this project, we'll assume Student doesn't have department; adjust as needed.
-                # If Student has department FK, use: Student.objects.filter(department=department)
-                # Here we filter by a placeholder, change to your schema.
-            )
-        else:
-            assign_form.fields["students"].queryset = Student.objects.none()
-
+        assign_form = AssignmentAssignForm(request.POST, department=department)
         if form.is_valid() and assign_form.is_valid():
             assignment = form.save(commit=False)
             assignment.created_by = request.user
             assignment.department = department
             assignment.save()
-            assignment.assigned_students.set(assign_form.cleaned_data["students"])
+            target = assign_form.cleaned_data["target"]
+            if target == AssignmentAssignForm.STUDENTS:
+                assign_students(
+                    assignment,
+                    assign_form.cleaned_data["students"].values_list("pk", flat=True),
+                )
+            else:
+                # One rule row, matched when students read their assignments.
+                add_target(
+                    assignment,
+                    department,
+                    assign_form.cleaned_data["student_class"],
+                    assign_form.cleaned_data["section"],
+                )
             messages.success(request, "Assignment created and students assigned.")
             return redirect("teacher_dashboard")
     else:
         form = AssignmentForm()
-        assign_form = AssignmentAssignForm()
-        if department:
-            # If Student model had department FK: Student.objects.filter(department=department)
-            # Here we try Student.objects.filter(student_class=...) but adjust according to your schema.
-            # Best is: Student.objects.filter(department=department)
-            try:
-                assign_form.fields["students"].queryset = Student.objects.filter(
-                    department=department
-                )
-            except Exception:
-                assign_form.fields["students"].queryset = Student.objects.none()
+        assign_form = AssignmentAssignForm(department=department)
 
     return render(
         request,
@@ -1223,16 +1367,243 @@ def create_assignment(request, slug=None):
     )
 
 
+def _inbox_page(request, student):
+    """Filter by ``?status=`` and paginate a student's assignment inbox."""
+    assignments = Assignment.objects.inbox(student)
+    status = request.GET.get("status", "").strip()
+    if status in Assignment.STATUSES:
+        assignments = assignments.filter(status=status)
+    else:
+        status = ""
+    # Soonest due first, undated assignments last, read along assignment_due_idx.
+    page = paginate_keyset_nulls_last(
+        assignments,
+        "due_date",
+        after=request.GET.get("after"),
+        before=request.GET.get("before"),
+        page_size=request.GET.get("page_size") or None,
+    )
+    return page, status
+
+
+def _student_or_none(request):
+    if not request.user_context.is_student:
+        return None
+    return request.user_context.student
+
+
 @login_required
 def my_assignments(request):
-    """List assignments assigned to the logged-in student."""
+    """List the logged-in student's assignments, one page at a time."""
     if not getattr(request.user, "is_student", False):
         return HttpResponseForbidden("Only students can view their assignments.")
 
-    student = getattr(request.user, "student_profile", None)
+    student = request.user_context.student
     if not student:
         messages.error(request, "No student profile linked to your account.")
         return redirect("student_dashboard")
 
-    assignments = student.assignments.all().order_by("-created_at")
-    return render(request, "Students/my_assignments.html", {"assignments": assignments})
+    try:
+        page, status = _inbox_page(request, student)
+    except (InvalidCursor, ValueError):
+        messages.error(request, "Invalid page requested.")
+        return redirect("my_assignments")
+
+    context = {
+        "assignments": page.object_list,
+        "page": page,
+        "status": status,
+        "counts": assignment_counts(student),
+    }
+    return render(request, "Students/my_assignments.html", context)
+
+
+@login_required
+def my_assignments_api(request):
+    """JSON variant of ``my_assignments`` with the per-status counts."""
+    student = _student_or_none(request)
+    if student is None:
+        return JsonResponse({"error": "Student profile required."}, status=403)
+    try:
+        page, status = _inbox_page(request, student)
+    except (InvalidCursor, ValueError) as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    results = [
+        {
+            "id": assignment.pk,
+            "title": assignment.title,
+            "description": assignment.description,
+            "due_date": assignment.due_date,
+            "status": assignment.status,
+            "submitted_at": assignment.submitted_at,
+            "grade": assignment.grade,
+        }
+        for assignment in page.object_list
+    ]
+    return JsonResponse(
+        {
+            "results": results,
+            "next": page.next_cursor,
+            "previous": page.previous_cursor,
+            "status": status,
+            "counts": assignment_counts(student),
+        }
+    )
+
+
+@login_required
+def submit_my_assignment(request, pk):
+    """Mark one of the logged-in student's assignments as handed in."""
+    if request.method != "POST":
+        return redirect("my_assignments")
+    student = _student_or_none(request)
+    if student is None:
+        return HttpResponseForbidden("Only students can submit assignments.")
+    assignment = get_object_or_404(Assignment.objects.for_student(student), pk=pk)
+    submit_assignment(assignment, student)
+    messages.success(request, f"'{assignment.title}' submitted.")
+    return redirect("my_assignments")
+
+
+def _statistics_json(stats):
+    if stats is None:
+        return None
+    fields = ("count", "mean", "median", "stddev", "minimum", "maximum", "pass_rate")
+    return {field: getattr(stats, field) for field in fields}
+
+
+@login_required
+@user_passes_test(is_teacher_or_admin)
+def exam_rankings_api(request, exam_id):
+    """Ranks and statistics of one exam for the school, a class or a department.
+
+    ``?scope=school|class|department``; the class scope takes ``class`` and
+    ``section``, the department scope ``department`` (a teacher's own by
+    default). Teachers only see their own department's students.
+    """
+    exam = get_object_or_404(Exam, pk=exam_id)
+    scope = request.GET.get("scope", CohortStatistics.SCHOOL)
+    if scope not in dict(CohortStatistics.SCOPE_CHOICES):
+        return JsonResponse({"error": f"Unknown scope '{scope}'."}, status=400)
+    try:
+        limit = min(max(int(request.GET.get("limit", 50)), 1), 500)
+        offset = max(int(request.GET.get("offset", 0)), 0)
+    except ValueError:
+        return JsonResponse({"error": "limit and offset must be integers."}, status=400)
+
+    department_id = request.GET.get("department")
+    if department_id and not department_id.isdigit():
+        return JsonResponse({"error": "department must be an integer."}, status=400)
+    if not request.user_context.is_admin:
+        teacher = request.user_context.teacher
+        if not teacher or not teacher.department_id:
+            return HttpResponseForbidden("You are not assigned to a department.")
+        if scope == CohortStatistics.SCHOOL:
+            # Teachers get the school-wide figures but only their students.
+            department_id = None
+        elif department_id and department_id != str(teacher.department_id):
+            return HttpResponseForbidden("You can only see your own department.")
+        else:
+            department_id = teacher.department_id
+
+    stats, rankings = exam_rankings(
+        exam,
+        scope,
+        {
+            "student_class": request.GET.get("class", ""),
+            "section": request.GET.get("section", ""),
+            "department": department_id,
+        },
+    )
+    if not request.user_context.is_admin:
+        rankings = rankings.filter(student__department_id=teacher.department_id)
+    rank_field = {
+        CohortStatistics.SCHOOL: "school",
+        CohortStatistics.CLASS: "class",
+        CohortStatistics.DEPARTMENT: "department",
+    }[scope]
+    results = [
+        {
+            "student": ranking.student.pk,
+            "student_id": ranking.student.student_id,
+            "name": str(ranking.student),
+            "student_class": ranking.student_class,
+            "section": ranking.section,
+            "percent": ranking.percent,
+            "rank": getattr(ranking, f"{rank_field}_rank"),
+            "percentile": getattr(ranking, f"{rank_field}_percentile"),
+            "school_rank": ranking.school_rank,
+        }
+        for ranking in rankings[offset : offset + limit]
+    ]
+    return JsonResponse(
+        {
+            "exam": exam.name,
+            "scope": scope,
+            # Snapshot time; "stale" while newer results await the refresh.
+            "refreshed_at": (
+                exam.rankings_refreshed_at.isoformat()
+                if exam.rankings_refreshed_at
+                else None
+            ),
+            "stale": exam.rankings_stale,
+            "statistics": _statistics_json(stats),
+            "results": results,
+        }
+    )
+
+
+# CSV and Excel exports (streamed, see student/exports.py)
+def _export(request, rows, filename):
+    """Send ``rows`` in the format picked with ``?format=csv|xlsx`` (CSV default).
+
+    An unknown format, or xlsx without openpyxl installed, is a 404.
+    """
+    file_format = request.GET.get("format") or "csv"
+    if file_format not in EXPORT_FORMATS:
+        raise Http404("Unknown export format.")
+    try:
+        return export_response(rows, filename, file_format)
+    except ImportError as exc:
+        raise Http404(str(exc)) from exc
+
+
+@login_required
+@user_passes_test(is_teacher_or_admin)
+def export_students(request):
+    """Student roster with parent and department details."""
+    try:
+        department = _scoped_department(request)
+    except PermissionError:
+        return HttpResponseForbidden("You are not assigned to a department.")
+    students = Student.objects.all()
+    if department is not None:
+        students = students.filter(department=department)
+    return _export(request, roster_rows(students), "students")
+
+
+@login_required
+@user_passes_test(is_teacher_or_admin)
+def export_exam_marks(request, exam_id):
+    """Mark sheet of one exam: a row per student, a column per subject."""
+    exam = get_object_or_404(Exam, pk=exam_id)
+    try:
+        department = _scoped_department(request)
+    except PermissionError:
+        return HttpResponseForbidden("You are not assigned to a department.")
+    rows = exam_mark_sheet(exam, department)
+    return _export(request, rows, f"marks-{exam.name}")
+
+
+@login_required
+@user_passes_test(is_teacher_or_admin)
+def export_department_results(request, department_id):
+    """Every exam result of a department's students, one row per exam."""
+    department = get_object_or_404(Department, pk=department_id)
+    if not request.user_context.is_admin:
+        teacher = request.user_context.teacher
+        if not teacher or teacher.department_id != department.pk:
+            return HttpResponseForbidden("You can only export your own department.")
+    name = department.code or department.name
+    return _export(request, department_results(department), f"results-{name}")